@@ -0,0 +1 @@
+"""Microbenchmarks for the CPU-bound stages (run with `python -m benchmarks.run`)."""
@@ -0,0 +1,165 @@
+"""
+Deterministic synthetic corpus for the CPU benchmarks.
+
+Everything is generated from a seeded RNG so two runs (and the baseline)
+measure exactly the same inputs: resumes from 1 to 50 pages, job
+descriptions with 5 to 200 skills, adversarial texts aimed at the regexes
+and substring scans, and PDF/DOCX renderings of the resumes.
+"""
+import io
+import random
+from typing import Dict, List, Tuple
+
+from docx import Document as DocxDocument
+
+from src.core.taxonomy import get_taxonomy
+
+# Roughly one printed page of resume text
+CHARS_PER_PAGE = 3000
+LINES_PER_PDF_PAGE = 50
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Smith", "Nguyen", "Garcia", "Khan", "Rossi"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Tech", "Soylent"]
+ROLES = ["Software Engineer", "Backend Developer", "Data Engineer", "Tech Lead", "DevOps Engineer", "Full-Stack Developer"]
+VERBS = ["Built", "Designed", "Led", "Migrated", "Optimized", "Automated", "Delivered", "Reduced", "Improved", "Maintained"]
+OBJECTS = ["REST APIs", "data pipelines", "CI/CD workflows", "microservices", "dashboards", "billing system",
+           "search service", "mobile backend", "ETL jobs", "monitoring stack"]
+DEGREES = ["B.S. Computer Science", "M.S. Software Engineering", "MBA", "PhD in Machine Learning", "Bachelor of Arts"]
+SOFT = ["communication", "leadership", "teamwork", "problem solving", "mentoring"]
+FILLER = ("collaborated with product and design teams to ship features on schedule while keeping "
+          "quality high and documentation up to date").split()
+
+
+def skill_vocabulary() -> List[str]:
+    """Every skill spelling the matcher knows about, plus generic extras up to 200+."""
+    taxonomy = get_taxonomy()
+    variants = taxonomy.skill_variants
+    skills = sorted(set(taxonomy.aliases["tech"]) | {v for vs in variants.values() for v in vs} | set(variants))
+    extras = [f"framework-{i}" for i in range(max(0, 220 - len(skills)))]
+    return skills + extras
+
+
+def resume_text(pages: int, seed: int = 0) -> str:
+    """A plausible resume of about pages * CHARS_PER_PAGE characters."""
+    rng = random.Random(seed)
+    skills = skill_vocabulary()
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    parts = [
+        name,
+        f"{name.split()[0].lower()}@example.com | +33 6 12 34 56 78 | Paris, France",
+        "",
+        "SUMMARY",
+        f"{rng.choice(ROLES)} with {rng.randint(1, 20)} years of experience in "
+        + ", ".join(rng.sample(skills[:80], 5)) + ".",
+        "",
+        "SKILLS",
+        ", ".join(rng.sample(skills, 25)),
+        "Soft skills: " + ", ".join(rng.sample(SOFT, 3)),
+        "",
+        "EXPERIENCE",
+    ]
+    target = pages * CHARS_PER_PAGE
+    year = 2024
+    while sum(len(p) + 1 for p in parts) < target:
+        start = year - rng.randint(1, 4)
+        parts.append(f"{rng.choice(ROLES)}, {rng.choice(COMPANIES)} — {rng.randint(1, 12):02d}/{start} - {rng.randint(1, 12):02d}/{year}")
+        for _ in range(rng.randint(3, 6)):
+            parts.append(
+                f"• {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {rng.choice(skills)} and {rng.choice(skills)}, "
+                f"{' '.join(rng.sample(FILLER, 8))} ({rng.randint(5, 60)}% faster)"
+            )
+        parts.append("")
+        year = start
+    parts += ["EDUCATION", *rng.sample(DEGREES, 2), "", "LANGUAGES", "English, French"]
+    return "\n".join(parts)
+
+
+def job_description(skill_count: int, seed: int = 0) -> Tuple[str, List[str]]:
+    """A job description listing skill_count skills; returns (text, skills)."""
+    rng = random.Random(seed)
+    skills = rng.sample(skill_vocabulary(), min(skill_count, len(skill_vocabulary())))
+    lines = [
+        f"Senior {rng.choice(ROLES)}",
+        f"{rng.choice(COMPANIES)} is hiring.",
+        "",
+        "Responsibilities:",
+        *[f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} with {rng.choice(skills)}" for _ in range(8)],
+        "",
+        "Requirements:",
+        *[f"- Experience with {s}" for s in skills],
+    ]
+    return "\n".join(lines), skills
+
+
+def adversarial_texts() -> Dict[str, str]:
+    """Inputs that stress the regexes and substring scans in the hot paths."""
+    return {
+        # One giant line: no newlines for the line-based checks to split on
+        "single_line_100k": " ".join(["python developer"] * 6000),
+        # Almost-dates everywhere: DATE_RANGE and the year scans backtrack on these
+        "date_noise": " ".join(f"{i % 13}/{1900 + i % 200} - {i % 12}.{2000 + i % 30} -" for i in range(8000)),
+        # Whitespace runs and bullets for the clean_text substitutions
+        "whitespace_bullets": ("•    \t  ·  ◦\n\n\n\n" * 20000),
+        # Long repeated skill with no word boundaries
+        "no_boundaries": "pythonjavadockerkubernetes" * 4000,
+        # Many short lines and first-person pronouns for safety_scan / ATS structure checks
+        "many_short_lines": "\n".join(f"i did {i} things in {1990 + i % 35}" for i in range(20000)),
+        # Non-Latin text and combining characters
+        "unicode_mix": ("Développeur confirmé — 日本語のテキスト — café́ naïve résumé " * 3000),
+    }
+
+
+def _pdf_escape(line: str) -> str:
+    return line.encode("latin-1", "replace").decode("latin-1").replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_to_pdf(text: str) -> bytes:
+    """Render text as a minimal multi-page PDF (Helvetica, one text line per line)."""
+    lines = text.splitlines() or [""]
+    pages = [lines[i:i + LINES_PER_PDF_PAGE] for i in range(0, len(lines), LINES_PER_PDF_PAGE)]
+    objects: List[bytes] = []
+
+    def add(obj: bytes) -> int:
+        objects.append(obj)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    pages_id = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for page_lines in pages:
+        body = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(l[:120])}) '" for l in page_lines) + " ET"
+        stream = body.encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % p for p in page_ids), len(page_ids)
+    )
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, obj))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+    return out.getvalue()
+
+
+def text_to_docx(text: str) -> bytes:
+    """Render text as a DOCX document with one paragraph per line."""
+    doc = DocxDocument()
+    for line in text.splitlines():
+        doc.add_paragraph(line)
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
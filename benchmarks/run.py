@@ -0,0 +1,257 @@
+"""
+Microbenchmarks for the CPU-bound stages of the pipeline.
+
+Usage:
+    python -m benchmarks.run                      # full corpus
+    python -m benchmarks.run --quick              # smaller corpus, shorter runs
+    python -m benchmarks.run --filter contains_skill
+    python -m benchmarks.run --output bench.json --baseline benchmarks/baseline.json
+
+Each case is warmed up, then called repeatedly until a minimum wall time
+and call count are reached. Results report latency percentiles, calls per
+second and input throughput. With --baseline, p50 latencies are compared
+against a previous JSON run and the exit code is 1 when any case regresses
+by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from src.core.batch_matcher import BatchMatcher
+from src.core.evidence_index import EvidenceIndex, evidence_lines
+from src.core.matcher import match_and_score
+from src.core.resume_index import ResumeIndex
+from src.parsers.fast import fast_parse_cv, fast_parse_jd
+from src.utils.utils import (
+    clean_text,
+    contains_skill,
+    load_text_from_docx,
+    load_text_from_pdf,
+    safety_scan,
+    validate_education_extraction,
+)
+from src.validators.ats_validator import ATSValidator
+
+from . import corpus
+
+RESULTS_VERSION = 1
+
+
+@dataclass
+class Case:
+    """One benchmarked call: a zero-argument callable and the size of its input."""
+    name: str
+    fn: Callable[[], object]
+    input_bytes: int
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(case: Case, min_time: float, min_calls: int, warmup: int, max_time: float) -> Dict[str, float]:
+    """
+    Time case.fn until both min_time seconds and min_calls calls have elapsed.
+
+    Pathological inputs can take seconds per call, so sampling also stops
+    once max_time is exceeded (after at least one timed call).
+    """
+    for _ in range(warmup):
+        case.fn()
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < min_calls or time.perf_counter() - started < min_time:
+        if samples and time.perf_counter() - started >= max_time:
+            break
+        t0 = time.perf_counter_ns()
+        case.fn()
+        samples.append((time.perf_counter_ns() - t0) / 1e6)
+    samples.sort()
+    mean_ms = statistics.fmean(samples)
+    return {
+        "calls": len(samples),
+        "p50_ms": round(_percentile(samples, 0.50), 4),
+        "p90_ms": round(_percentile(samples, 0.90), 4),
+        "p99_ms": round(_percentile(samples, 0.99), 4),
+        "mean_ms": round(mean_ms, 4),
+        "max_ms": round(samples[-1], 4),
+        "ops_per_sec": round(1000.0 / mean_ms, 2) if mean_ms else 0.0,
+        "mb_per_sec": round(case.input_bytes / 1e6 / (mean_ms / 1000.0), 2) if mean_ms else 0.0,
+        "input_bytes": case.input_bytes,
+    }
+
+
+def build_cases(quick: bool, workdir: str) -> List[Case]:
+    """Generate the corpus and wrap every function under test in Cases."""
+    page_counts = [1, 5] if quick else [1, 5, 20, 50]
+    skill_counts = [5, 50] if quick else [5, 50, 200]
+    validator = ATSValidator()
+    cases: List[Case] = []
+
+    resumes = {pages: corpus.resume_text(pages, seed=pages) for pages in page_counts}
+    jds = {n: corpus.job_description(n, seed=n) for n in skill_counts}
+    adversarial = corpus.adversarial_texts()
+
+    for n, (jd_text, _) in jds.items():
+        cases.append(Case(f"fast_parse_jd/{n}skills", lambda t=jd_text: fast_parse_jd(t), len(jd_text.encode("utf-8"))))
+
+    for pages, text in resumes.items():
+        size = len(text.encode("utf-8"))
+        cases.append(Case(f"clean_text/resume_{pages}p", lambda t=text: clean_text(t), size))
+
+        pdf_path = os.path.join(workdir, f"resume_{pages}p.pdf")
+        docx_path = os.path.join(workdir, f"resume_{pages}p.docx")
+        with open(pdf_path, "wb") as f:
+            f.write(corpus.text_to_pdf(text))
+        with open(docx_path, "wb") as f:
+            f.write(corpus.text_to_docx(text))
+        cases.append(Case(f"load_text_from_pdf/resume_{pages}p", lambda p=pdf_path: load_text_from_pdf(p), os.path.getsize(pdf_path)))
+        cases.append(Case(f"load_text_from_docx/resume_{pages}p", lambda p=docx_path: load_text_from_docx(p), os.path.getsize(docx_path)))
+
+        # Uncached: the other resume cases reuse the index get_resume_index keeps for the text
+        cases.append(Case(f"resume_index/resume_{pages}p", lambda t=text: ResumeIndex(t), size))
+        cases.append(Case(f"evidence_index/resume_{pages}p", lambda t=text: EvidenceIndex(evidence_lines(t)), size))
+
+        cases.append(Case(f"fast_parse_cv/resume_{pages}p", lambda t=text: fast_parse_cv(t), size))
+        cv = fast_parse_cv(text)
+        cases.append(Case(
+            f"validate_education_extraction/resume_{pages}p",
+            lambda c=cv, t=text: validate_education_extraction(c.education + ["PhD in Astrophysics"], t),
+            size,
+        ))
+        cases.append(Case(f"safety_scan/resume_{pages}p", lambda t=text: safety_scan(t[: len(t) // 2], t), size))
+        cases.append(Case(f"ats_validate_resume/resume_{pages}p", lambda t=text: validator.validate_resume(t), size))
+
+        for n, (jd_text, skills) in jds.items():
+            jd = fast_parse_jd(jd_text)
+            jd.must_have_skills = skills
+            cases.append(Case(
+                f"contains_skill/resume_{pages}p_{n}skills",
+                lambda t=text, s=skills: [contains_skill(t, k) for k in s],
+                size,
+            ))
+            cases.append(Case(
+                f"match_and_score/resume_{pages}p_{n}skills",
+                lambda j=jd, c=cv, t=text: match_and_score(j, c, t),
+                size,
+            ))
+            cases.append(Case(
+                f"ats_validate_resume/resume_{pages}p_{n}keywords",
+                lambda t=text, s=skills: validator.validate_resume(t, s),
+                size,
+            ))
+
+    # Bulk scoring: a pool of parsed resumes repeated up to the batch size, against many jobs
+    candidate_count, job_count = (2000, 20) if quick else (10000, 100)
+    pool = [(fast_parse_cv(text), text) for text in (corpus.resume_text(1, seed=100 + i) for i in range(100))]
+    candidates = [pool[i % len(pool)] for i in range(candidate_count)]
+    jobs = []
+    for seed in range(job_count):
+        jd_text, job_skills = corpus.job_description(20, seed=1000 + seed)
+        jd = fast_parse_jd(jd_text)
+        jd.must_have_skills = job_skills
+        jobs.append(jd)
+    matcher = BatchMatcher(jobs)
+    batch = matcher.encode(candidates)
+    pool_bytes = sum(len(text.encode("utf-8")) for _, text in pool)
+    cases.append(Case(f"batch_matcher_encode/{len(pool)}x{job_count}", lambda m=matcher, p=pool: m.encode(p), pool_bytes))
+    cases.append(Case(f"batch_matcher_score/{candidate_count}x{job_count}", lambda m=matcher, b=batch: m.score(b), batch.skills.nbytes))
+
+    _, skills = jds[skill_counts[-1]]
+    for label, text in adversarial.items():
+        size = len(text.encode("utf-8"))
+        cases.append(Case(f"clean_text/adversarial_{label}", lambda t=text: clean_text(t), size))
+        cases.append(Case(f"contains_skill/adversarial_{label}", lambda t=text: [contains_skill(t, k) for k in skills], size))
+        cases.append(Case(f"safety_scan/adversarial_{label}", lambda t=text: safety_scan(t, t[: len(t) // 2]), size))
+        cases.append(Case(f"ats_validate_resume/adversarial_{label}", lambda t=text: validator.validate_resume(t, skills), size))
+    return cases
+
+
+def environment() -> Dict[str, str]:
+    """Machine details stored next to the results so baselines stay comparable."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Print p50 changes against a baseline; return the names of regressed cases."""
+    regressions = []
+    print(f"\n{'case':<60} {'base p50':>10} {'p50':>10} {'change':>9}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("p50_ms"):
+            print(f"{name:<60} {'-':>10} {result['p50_ms']:>10.3f} {'new':>9}")
+            continue
+        change = (result["p50_ms"] - base["p50_ms"]) / base["p50_ms"]
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:<60} {base['p50_ms']:>10.3f} {result['p50_ms']:>10.3f} {change:>+8.1%}{marker}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the CPU-bound resume matcher stages.")
+    parser.add_argument("--quick", action="store_true", help="smaller corpus and shorter runs")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this substring")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare p50 latencies against this JSON results file")
+    parser.add_argument("--threshold", type=float, default=0.20, help="allowed p50 slowdown vs baseline (default 0.20)")
+    parser.add_argument("--min-time", type=float, default=None, help="minimum seconds per case")
+    args = parser.parse_args(argv)
+
+    min_time = args.min_time if args.min_time is not None else (0.2 if args.quick else 1.0)
+    min_calls = 5 if args.quick else 20
+    results: Dict[str, Dict] = {}
+
+    with tempfile.TemporaryDirectory(prefix="resume-bench-") as workdir:
+        cases = [c for c in build_cases(args.quick, workdir) if args.filter in c.name]
+        print(f"{'case':<60} {'p50 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'MB/s':>8}")
+        for case in cases:
+            result = measure(case, min_time=min_time, min_calls=min_calls, warmup=1, max_time=10 * min_time)
+            results[case.name] = result
+            print(f"{case.name:<60} {result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f} "
+                  f"{result['ops_per_sec']:>10.1f} {result['mb_per_sec']:>8.2f}")
+
+    if args.output:
+        payload = {
+            "version": RESULTS_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "quick": args.quick,
+            "environment": environment(),
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != environment():
+            print("\nWarning: baseline was recorded on a different environment; comparisons are indicative only.")
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
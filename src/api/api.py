@@ -2,26 +2,52 @@
 FastAPI routes and endpoints for the resume-job matcher.
 """
 import os
+import asyncio
+import hashlib
+import hmac
+import itertools
+import zipfile
 import tempfile
 import shutil
 import logging
-from typing import Optional
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Depends
+import time
+from typing import IO, Any, AsyncIterator, Awaitable, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Response, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
+from starlette.routing import Match
 import traceback
 
 from ..core.models import SuperOutput
-from ..core.config import OPENAI_API_KEY
-from ..core.pipeline import run_pipeline
+from ..core.config import OPENAI_API_KEY, LLM_PROVIDER, BATCH_MAX_JOBS, RANK_MAX_RESUMES, RANK_DEFAULT_TOP_K, ADMIN_TOKEN, TIKTOKEN_LOAD_TIMEOUT
+from ..core.pipeline import (
+    run_pipeline_async, stream_pipeline, stream_batch_pipeline, stream_rank_pipeline, parse_fields,
+    EXTRACTION_MODES, needs_llm
+)
+from ..core.cache import llm_cache
+from ..core.llm import llm_registry
+from ..core.prompt_budget import load_encodings
+from ..core.structured import structured_stats
+from ..core.metrics import metrics, http_requests_total, http_request_seconds, http_in_flight, upload_size_bytes
+from ..core.scheduler import llm_flow
+from ..core.routing import model_routes, parse_stage_models
+from ..core.taxonomy import TaxonomyError, get_taxonomy, install_reload_signal, reload_taxonomy
+from ..core.idempotency import (
+    request_coalescer, request_fingerprint, IdempotencyConflict, MAX_IDEMPOTENCY_KEY_LENGTH
+)
 from ..auth.routes import router as auth_router
 from ..auth.history_routes import router as history_router
 from ..auth.dependencies import get_current_active_user
 from ..auth.init_db import create_tables
 from ..auth.models import User, AnalysisHistory
+from ..auth.service import HistoryService
+from ..jobs.queue import job_queue, job_to_response
+from ..jobs.schemas import JobResponse
+from ..jobs.webhooks import WebhookURLError, check_webhook_url
+from ..utils.utils import load_text_auto
 from sqlalchemy.orm import Session
-from ..auth.database import get_db
+from ..auth.database import SessionLocal, get_db
 import json
 
 # Configure logging
@@ -48,12 +74,99 @@ app.include_router(history_router)
 # Initialize database tables
 create_tables()
 
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Start draining the background job queue."""
+    job_queue.start()
+
+
+@app.on_event("startup")
+async def load_taxonomy():
+    """Compile the skill taxonomy before the first request and reload it on SIGHUP."""
+    get_taxonomy()
+    install_reload_signal()
+
+
+@app.on_event("startup")
+async def load_token_encodings():
+    """Load the tiktoken encodings of the routed models in a worker thread, since they may be downloaded."""
+    routed = {m for chain in model_routes.describe().values() for m in chain}
+    try:
+        await asyncio.wait_for(asyncio.to_thread(load_encodings, routed), TIKTOKEN_LOAD_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning(f"tiktoken encodings not loaded after {TIKTOKEN_LOAD_TIMEOUT}s; estimating token counts until they are")
+
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    """Stop the background job workers."""
+    await job_queue.stop()
+
+
+def _route_template(scope) -> str:
+    """Route path template for a request (e.g. /jobs/{job_id}), keeping metric labels bounded."""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Count HTTP requests and time them until the last body chunk, so SSE streams are covered."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route, method = _route_template(scope), scope["method"]
+        status = {"code": 500}
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        http_in_flight.inc(route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec(route=route)
+            http_request_seconds.observe(time.perf_counter() - start, route=route, method=method)
+            http_requests_total.inc(route=route, method=method, status=status["code"])
+
+
+class LLMFlowMiddleware:
+    """Tag each HTTP request as its own flow so the LLM scheduler queues requests fairly."""
+    
+    def __init__(self, app):
+        self.app = app
+        self._ids = itertools.count(1)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = llm_flow.set(f"http-{next(self._ids)}")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            llm_flow.reset(token)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(LLMFlowMiddleware)
 
 # Global exception handlers
 @app.exception_handler(RequestValidationError)
@@ -73,17 +186,132 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
 
 
-@app.post("/match/upload", response_model=SuperOutput)
+# Accepted resume formats and per-file size limit
+ALLOWED_RESUME_EXTENSIONS = {'.pdf', '.docx', '.txt'}
+MAX_RESUME_SIZE = 10 * 1024 * 1024  # 10MB
+
+
+def _check_openai_key() -> None:
+    """Fail fast when the OpenAI API key is missing (the fake provider needs none)."""
+    if not OPENAI_API_KEY and LLM_PROVIDER != "fake":
+        logger.error("OpenAI API key not configured")
+        raise HTTPException(
+            status_code=500,
+            detail="OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
+        )
+
+
+def _save_resume_upload(resume_file: UploadFile) -> str:
+    """Validate an uploaded resume and copy it to a temporary file, returning its path."""
+    # Validate file types
+    resume_ext = os.path.splitext(resume_file.filename)[1].lower()
+    
+    if resume_ext not in ALLOWED_RESUME_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported resume file type: {resume_ext}. Supported types: PDF, DOCX, TXT"
+        )
+    
+    # Check file sizes (10MB limit)
+    if resume_file.size and resume_file.size > MAX_RESUME_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Resume file too large: {resume_file.size} bytes. Maximum size: 10MB"
+        )
+    
+    # Create temporary file for resume
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{resume_file.filename}") as resume_temp:
+        shutil.copyfileobj(resume_file.file, resume_temp)
+        upload_size_bytes.observe(resume_temp.tell(), file_type=resume_ext.lstrip("."))
+        return resume_temp.name
+
+
+def _file_sha256(path: str) -> str:
+    """Hash a saved upload in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _remove_temp_file(path: Optional[str]) -> None:
+    """Delete a temporary upload, logging instead of raising on failure."""
+    if path and os.path.exists(path):
+        try:
+            os.unlink(path)
+        except Exception as e:
+            logger.warning(f"Failed to delete resume temp file: {e}")
+
+
+def _save_analysis_history(db: Session, user_id: int, job_description: str, result: SuperOutput) -> None:
+    """Persist an analysis to the user's history without failing the request."""
+    try:
+        logger.info(f"Saving analysis to history for user_id: {user_id}")
+        analysis_history = HistoryService.save_analysis(db, user_id, job_description, result)
+        logger.info(f"Analysis saved to history with ID: {analysis_history.id}")
+    except Exception as e:
+        logger.error(f"Failed to save analysis to history: {str(e)}")
+        # Don't fail the request if history save fails
+        db.rollback()
+
+
+def _parse_fields_param(fields: Optional[str]):
+    """Parse the fields form value, mapping unknown names to a 400."""
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _parse_models_param(models: Optional[str]):
+    """Parse the per-stage models form value, mapping unknown stages to a 400."""
+    try:
+        return parse_stage_models(models)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_mode_param(mode: str) -> None:
+    """Reject unknown extraction modes with a 400."""
+    if mode not in EXTRACTION_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown mode '{mode}', expected one of: {', '.join(EXTRACTION_MODES)}"
+        )
+
+
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/match/upload", response_model=SuperOutput, response_model_exclude_unset=True)
 async def match_upload(
+    response: Response,
     resume_file: UploadFile = File(..., description="Resume file (PDF, DOCX, or TXT)"),
     job_description: str = Form(..., description="Job description text"),
-    model: str = Form(default="gpt-4o-mini", description="OpenAI model to use"),
+    model: Optional[str] = Form(None, description="OpenAI model for every LLM stage (default: the per-stage routing table)"),
+    models: Optional[str] = Form(None, description="Per-stage model overrides, e.g. 'parse_jd=gpt-4o-mini,tailor=gpt-4o'"),
     user_id: Optional[int] = Form(None, description="User ID (optional, for saving to history)"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Form(None, description="Comma-separated response fields or a preset ('score', 'all'); stages for unrequested fields are skipped"),
+    include_ats: bool = Form(True, description="Run ATS validation on the tailored resume"),
+    mode: str = Form("standard", description="Extraction mode: 'standard' (separate JD and CV calls), 'combined' (one call) or 'fast' (rule-based, no LLM)"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", description="Client-chosen key; retries with the same key replay the first result")
 ):
     """
     Run the matching pipeline with uploaded resume file and job description text.
     If user_id is provided, the analysis will be saved to the user's history.
+    If fields is provided, only those fields are returned and the tailoring,
+    safety and ATS stages run only when their outputs were requested.
+    mode='combined' extracts the job description and CV in one LLM call and
+    mode='fast' extracts them locally; with fields='score' a fast request
+    makes no LLM call at all.
+    
+    Identical requests (same resume content, job text, model and options)
+    share one pipeline run while it is in flight and replay its stored
+    result afterwards, as do retries with the same Idempotency-Key; the
+    X-Idempotency-Status header says which happened.
     """
     logger.info(f"File upload request received - Resume: {resume_file.filename}, Model: {model}, User ID: {user_id}")
     
@@ -91,59 +319,57 @@ async def match_upload(
     
     try:
         # Check if OpenAI API key is available
-        if not OPENAI_API_KEY:
-            logger.error("OpenAI API key not configured")
-            raise HTTPException(
-                status_code=500,
-                detail="OpenAI API key not configured. Please set OPENAI_API_KEY environment variable."
-            )
-        
-        # Validate file types
-        allowed_extensions = {'.pdf', '.docx', '.txt'}
-        resume_ext = os.path.splitext(resume_file.filename)[1].lower()
-        
-        if resume_ext not in allowed_extensions:
+        requested_fields = _parse_fields_param(fields)
+        stage_models = _parse_models_param(models)
+        _check_mode_param(mode)
+        if needs_llm(mode, requested_fields):
+            _check_openai_key()
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= MAX_IDEMPOTENCY_KEY_LENGTH:
             raise HTTPException(
                 status_code=400,
-                detail=f"Unsupported resume file type: {resume_ext}. Supported types: PDF, DOCX, TXT"
+                detail=f"Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters"
             )
+        resume_path = _save_resume_upload(resume_file)
         
-        # Check file sizes (10MB limit)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if resume_file.size and resume_file.size > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Resume file too large: {resume_file.size} bytes. Maximum size: 10MB"
-            )
-        
-        # Create temporary file for resume
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{resume_file.filename}") as resume_temp:
-            shutil.copyfileobj(resume_file.file, resume_temp)
-            resume_path = resume_temp.name
+        fingerprint = request_fingerprint(
+            await asyncio.to_thread(_file_sha256, resume_path), job_description, model,
+            fields=sorted(requested_fields) if requested_fields is not None else None,
+            include_ats=include_ats, mode=mode, user_id=user_id, models=stage_models
+        )
         
-        logger.info("Starting file processing")
-        result = run_pipeline(None, job_description, resume_path, None, model, include_ats_validation=True)
-        logger.info(f"File processing completed successfully - Score: {result.score}")
-        
-        # Save to history if user_id is provided
-        if user_id:
+        async def execute(path: str) -> SuperOutput:
             try:
-                logger.info(f"Saving analysis to history for user_id: {user_id}")
-                analysis_history = AnalysisHistory(
-                    user_id=user_id,
-                    tailored_resume=result.tailored_resume_text,
-                    job_text=job_description,
-                    score=result.score,
-                    analysis_result=json.dumps(result.model_dump())
+                logger.info("Starting file processing")
+                result = await run_pipeline_async(
+                    None, job_description, path, None, model,
+                    include_ats_validation=include_ats, fields=requested_fields, mode=mode, models=stage_models
                 )
-                db.add(analysis_history)
-                db.commit()
-                db.refresh(analysis_history)
-                logger.info(f"Analysis saved to history with ID: {analysis_history.id}")
-            except Exception as e:
-                logger.error(f"Failed to save analysis to history: {str(e)}")
-                # Don't fail the request if history save fails
-                db.rollback()
+            finally:
+                _remove_temp_file(path)
+            logger.info(f"File processing completed successfully - Score: {result.score}")
+            
+            # Save to history if user_id is provided (once, by the request that ran the pipeline),
+            # in a session of its own since the execution may outlive the request
+            if user_id:
+                with SessionLocal() as session:
+                    _save_analysis_history(session, user_id, job_description, result)
+            return result
+        
+        def start_execution() -> Awaitable[SuperOutput]:
+            # The execution outlives the request if the client disconnects, so it takes over the temp file
+            nonlocal resume_path
+            path, resume_path = resume_path, None
+            return execute(path)
+        
+        try:
+            result, outcome = await request_coalescer.run(
+                request_coalescer.make_key(fingerprint, idempotency_key, user_id), fingerprint, start_execution
+            )
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if outcome != "executed":
+            logger.info(f"Request {outcome} from an identical request - Score: {result.score}")
+        response.headers["X-Idempotency-Status"] = outcome
         
         return result
         
@@ -153,12 +379,369 @@ async def match_upload(
         logger.error(f"Error in match_upload: {str(e)}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Error processing files: {str(e)}")
     finally:
-        # Clean up temporary files
-        if resume_path and os.path.exists(resume_path):
+        # Clean up the temporary file unless the pipeline execution took it over
+        _remove_temp_file(resume_path)
+
+
+@app.post("/match/stream")
+async def match_stream(
+    resume_file: UploadFile = File(..., description="Resume file (PDF, DOCX, or TXT)"),
+    job_description: str = Form(..., description="Job description text"),
+    model: Optional[str] = Form(None, description="OpenAI model for every LLM stage (default: the per-stage routing table)"),
+    models: Optional[str] = Form(None, description="Per-stage model overrides, e.g. 'parse_jd=gpt-4o-mini,tailor=gpt-4o'"),
+    user_id: Optional[int] = Form(None, description="User ID (optional, for saving to history)"),
+    fields: Optional[str] = Form(None, description="Comma-separated response fields or a preset ('score', 'all'); stages for unrequested fields are skipped"),
+    include_ats: bool = Form(True, description="Run ATS validation on the tailored resume"),
+    mode: str = Form("standard", description="Extraction mode: 'standard' (separate JD and CV calls), 'combined' (one call) or 'fast' (rule-based, no LLM)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Run the matching pipeline and stream each stage as a Server-Sent Event.
+    
+    Events: extracted, jd_parsed, cv_parsed, scored, tailored_section (one
+    per tailored resume section, as soon as the LLM has written it),
+    tailored, safety, ats, result (the full SuperOutput) and error.
+    """
+    logger.info(f"Stream request received - Resume: {resume_file.filename}, Model: {model}, User ID: {user_id}")
+    
+    requested_fields = _parse_fields_param(fields)
+    stage_models = _parse_models_param(models)
+    _check_mode_param(mode)
+    if needs_llm(mode, requested_fields):
+        _check_openai_key()
+    resume_path = _save_resume_upload(resume_file)
+    
+    async def event_stream():
+        try:
+            async for stage, payload in stream_pipeline(
+                None, job_description, resume_path, None, model,
+                include_ats_validation=include_ats, fields=requested_fields, mode=mode,
+                stream_sections=True, models=stage_models
+            ):
+                if stage == "result":
+                    logger.info(f"Stream processing completed successfully - Score: {payload.score}")
+                    if user_id:
+                        _save_analysis_history(db, user_id, job_description, payload)
+                    payload = payload.model_dump(exclude_unset=True)
+                yield _sse(stage, payload)
+        except Exception as e:
+            logger.error(f"Error in match_stream: {str(e)}\n{traceback.format_exc()}")
+            yield _sse("error", {"detail": f"Error processing files: {str(e)}"})
+        finally:
+            _remove_temp_file(resume_path)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/match/batch")
+async def match_batch(
+    resume_file: UploadFile = File(..., description="Resume file (PDF, DOCX, or TXT)"),
+    job_descriptions: List[str] = Form(..., description="Job description texts (repeat the field once per job)"),
+    model: Optional[str] = Form(None, description="OpenAI model for every LLM stage (default: the per-stage routing table)"),
+    models: Optional[str] = Form(None, description="Per-stage model overrides, e.g. 'parse_jd=gpt-4o-mini,tailor=gpt-4o'"),
+    fields: Optional[str] = Form("score", description="Comma-separated response fields or a preset ('score', 'all')"),
+    include_ats: bool = Form(True, description="Run ATS validation on the tailored resume"),
+    mode: str = Form("standard", description="Extraction mode: 'standard' or 'fast' (rule-based, no LLM)"),
+):
+    """
+    Match one resume against several job descriptions, parsing the resume once.
+    
+    Streams Server-Sent Events: cv_parsed once, then one result (or error)
+    event per job in completion order, each tagged with the job's index,
+    and a final done event.
+    """
+    logger.info(f"Batch request received - Resume: {resume_file.filename}, Jobs: {len(job_descriptions)}, Model: {model}")
+    
+    if len(job_descriptions) > BATCH_MAX_JOBS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many job descriptions: {len(job_descriptions)}. Maximum: {BATCH_MAX_JOBS}"
+        )
+    requested_fields = _parse_fields_param(fields)
+    stage_models = _parse_models_param(models)
+    _check_mode_param(mode)
+    if needs_llm(mode, requested_fields):
+        _check_openai_key()
+    resume_path = _save_resume_upload(resume_file)
+    
+    async def event_stream():
+        completed = failed = 0
+        try:
+            async for event, payload in stream_batch_pipeline(
+                None, resume_path, job_descriptions, model,
+                include_ats_validation=include_ats, fields=requested_fields, mode=mode, models=stage_models
+            ):
+                if event == "result":
+                    completed += 1
+                    payload = {"index": payload["index"], "result": payload["result"].model_dump(exclude_unset=True)}
+                elif event == "error":
+                    failed += 1
+                yield _sse(event, payload)
+            yield _sse("done", {"completed": completed, "failed": failed})
+        except Exception as e:
+            logger.error(f"Error in match_batch: {str(e)}\n{traceback.format_exc()}")
+            yield _sse("error", {"detail": f"Error processing files: {str(e)}"})
+        finally:
+            _remove_temp_file(resume_path)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _spool_uploaded_resumes(files: List[UploadFile]) -> List[Tuple[str, IO[bytes]]]:
+    """
+    Copy each supported uploaded resume into a temporary file owned by the caller.
+
+    The ranking stream reads resumes after the endpoint has returned, when
+    the request's UploadFiles may already be closed.
+    """
+    spooled = []
+    for upload in files:
+        name = upload.filename or "resume.txt"
+        if os.path.splitext(name)[1].lower() not in ALLOWED_RESUME_EXTENSIONS:
+            logger.warning(f"Skipping unsupported resume file: {name}")
+            continue
+        if upload.size and upload.size > MAX_RESUME_SIZE:
+            logger.warning(f"Skipping oversized resume file: {name} ({upload.size} bytes)")
+            continue
+        spool = tempfile.TemporaryFile()
+        shutil.copyfileobj(upload.file, spool)
+        upload_size_bytes.observe(spool.tell(), file_type=os.path.splitext(name)[1].lower().lstrip("."))
+        spool.seek(0)
+        spooled.append((name, spool))
+    return spooled
+
+
+async def _iter_spooled_resumes(spooled: List[Tuple[str, IO[bytes]]]) -> AsyncIterator[Tuple[str, bytes]]:
+    """Yield (name, bytes) for each spooled resume, one file in memory at a time."""
+    for name, spool in spooled:
+        data = await asyncio.to_thread(spool.read)
+        spool.close()
+        yield name, data
+
+
+def _spool_archive(upload: UploadFile) -> Tuple[IO[bytes], zipfile.ZipFile, List[zipfile.ZipInfo]]:
+    """
+    Copy a ZIP upload into a temporary file, open it and list its supported
+    resume entries. The caller closes both the archive and the file.
+
+    Raises HTTPException (400) for an invalid archive or one with more than
+    RANK_MAX_RESUMES resumes, before anything is streamed.
+    """
+    spool = tempfile.TemporaryFile()
+    shutil.copyfileobj(upload.file, spool)
+    spool.seek(0)
+    try:
+        archive = zipfile.ZipFile(spool)
+    except zipfile.BadZipFile:
+        spool.close()
+        raise HTTPException(status_code=400, detail="resume_archive is not a valid ZIP file")
+    entries = []
+    for info in archive.infolist():
+        name = info.filename
+        if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+            continue
+        if os.path.splitext(name)[1].lower() not in ALLOWED_RESUME_EXTENSIONS:
+            logger.warning(f"Skipping unsupported archive entry: {name}")
+            continue
+        if info.file_size > MAX_RESUME_SIZE:
+            logger.warning(f"Skipping oversized archive entry: {name} ({info.file_size} bytes)")
+            continue
+        entries.append(info)
+    if len(entries) > RANK_MAX_RESUMES:
+        archive.close()
+        spool.close()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Archive contains too many resumes: {len(entries)}. Maximum: {RANK_MAX_RESUMES}"
+        )
+    return spool, archive, entries
+
+
+async def _iter_zip_resumes(archive: zipfile.ZipFile, entries: List[zipfile.ZipInfo]) -> AsyncIterator[Tuple[str, bytes]]:
+    """Yield (name, bytes) for each listed resume in a ZIP archive without extracting it to disk."""
+    for info in entries:
+        upload_size_bytes.observe(info.file_size, file_type=os.path.splitext(info.filename)[1].lower().lstrip("."))
+        yield info.filename, await asyncio.to_thread(archive.read, info)
+
+
+@app.post("/match/rank")
+async def match_rank(
+    job_description: str = Form(..., description="Job description text"),
+    resume_files: List[UploadFile] = File(None, description="Resume files (PDF, DOCX, or TXT)"),
+    resume_archive: Optional[UploadFile] = File(None, description="ZIP archive of resumes"),
+    top_k: int = Form(RANK_DEFAULT_TOP_K, ge=1, le=100, description="Number of top candidates to return"),
+    model: Optional[str] = Form(None, description="OpenAI model for every LLM stage (default: the per-stage routing table)"),
+    models: Optional[str] = Form(None, description="Per-stage model overrides, e.g. 'parse_jd=gpt-4o-mini,tailor=gpt-4o'"),
+    fields: Optional[str] = Form("score", description="Fields computed for the top candidates ('score', 'all', ...)"),
+    include_ats: bool = Form(True, description="Run ATS validation on the tailored resumes"),
+    mode: str = Form("standard", description="Extraction mode: 'standard' or 'fast' (rule-based, no LLM)"),
+):
+    """
+    Rank many resumes against one job description and return the top_k candidates.
+    
+    The job description is parsed once, resumes are processed concurrently
+    and only the top_k get tailoring/ATS work. Streams Server-Sent Events:
+    jd_parsed, one scored (or error) per resume, then ranking.
+    """
+    if not resume_files and not resume_archive:
+        raise HTTPException(status_code=400, detail="Provide resume_files or a resume_archive")
+    if resume_files and len(resume_files) > RANK_MAX_RESUMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many resumes: {len(resume_files)}. Maximum: {RANK_MAX_RESUMES}"
+        )
+    requested_fields = _parse_fields_param(fields)
+    stage_models = _parse_models_param(models)
+    _check_mode_param(mode)
+    if needs_llm(mode, requested_fields):
+        _check_openai_key()
+    
+    # Copied before returning: the stream outlives the request's upload files
+    archive_file, archive, spooled = None, None, []
+    if resume_archive:
+        archive_file, archive, entries = await asyncio.to_thread(_spool_archive, resume_archive)
+        resumes = _iter_zip_resumes(archive, entries)
+    else:
+        spooled = await asyncio.to_thread(_spool_uploaded_resumes, resume_files)
+        resumes = _iter_spooled_resumes(spooled)
+    logger.info(f"Ranking request received - Top K: {top_k}, Model: {model}, Archive: {bool(resume_archive)}")
+    
+    async def event_stream():
+        try:
+            async for event, payload in stream_rank_pipeline(
+                job_description, resumes, model, top_k=top_k,
+                include_ats_validation=include_ats, fields=requested_fields, mode=mode, models=stage_models
+            ):
+                if event == "ranking":
+                    payload = {"candidates": [
+                        {**candidate, "result": candidate["result"].model_dump(exclude_unset=True)}
+                        for candidate in payload
+                    ]}
+                yield _sse(event, payload)
+        except Exception as e:
+            logger.error(f"Error in match_rank: {str(e)}\n{traceback.format_exc()}")
+            yield _sse("error", {"detail": f"Error processing files: {str(e)}"})
+        finally:
+            for _, spool in spooled:
+                spool.close()
+            if archive is not None:
+                archive.close()
+                archive_file.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    resume_file: UploadFile = File(..., description="Resume file (PDF, DOCX, or TXT)"),
+    job_description: str = Form(..., description="Job description text"),
+    model: Optional[str] = Form(None, description="OpenAI model for every LLM stage (default: the per-stage routing table)"),
+    models: Optional[str] = Form(None, description="Per-stage model overrides, e.g. 'parse_jd=gpt-4o-mini,tailor=gpt-4o'"),
+    user_id: Optional[int] = Form(None, description="User ID (optional, for saving to history)"),
+    fields: Optional[str] = Form(None, description="Comma-separated response fields or a preset ('score', 'all')"),
+    include_ats: bool = Form(True, description="Run ATS validation on the tailored resume"),
+    mode: str = Form("standard", description="Extraction mode: 'standard' (separate JD and CV calls), 'combined' (one call) or 'fast' (rule-based, no LLM)"),
+    webhook_url: Optional[str] = Form(None, description="URL to POST the job result to when it finishes"),
+):
+    """
+    Queue a matching analysis and return immediately with a job ID.
+    
+    Poll GET /jobs/{job_id} or pass webhook_url to be called back with the
+    same payload once the job succeeds or permanently fails.
+    """
+    logger.info(f"Job request received - Resume: {resume_file.filename}, Model: {model}, User ID: {user_id}")
+    
+    resume_path = None
+    try:
+        requested_fields = _parse_fields_param(fields)
+        stage_models = _parse_models_param(models)
+        _check_mode_param(mode)
+        if needs_llm(mode, requested_fields):
+            _check_openai_key()
+        if webhook_url:
             try:
-                os.unlink(resume_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete resume temp file: {e}")
+                await asyncio.to_thread(check_webhook_url, webhook_url)
+            except WebhookURLError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        resume_path = _save_resume_upload(resume_file)
+        
+        # Store extracted text so the job does not depend on the temp file
+        resume_text = await asyncio.to_thread(load_text_auto, resume_path)
+        job = await asyncio.to_thread(job_queue.enqueue, {
+            "resume_text": resume_text,
+            "job_text": job_description,
+            "model": model,
+            "models": stage_models,
+            "fields": sorted(requested_fields) if requested_fields is not None else None,
+            "include_ats": include_ats,
+            "mode": mode
+        }, user_id, webhook_url)
+        logger.info(f"Job queued with ID: {job.id}")
+        return job_to_response(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in create_job: {str(e)}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"Error queueing job: {str(e)}")
+    finally:
+        _remove_temp_file(resume_path)
 
 
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get the status (and result, once finished) of a queued analysis."""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_response(job)
+
+
+@app.get("/stats")
+async def get_stats():
+    """Report model routes, LLM cache counters, connection pool utilization, structured output parsing outcomes and idempotency state."""
+    return {
+        "model_routes": model_routes.describe(),
+        "llm_cache": llm_cache.stats(),
+        "llm_clients": llm_registry.stats(),
+        "structured_output": structured_stats.stats(),
+        "idempotency": request_coalescer.stats(),
+        "taxonomy": get_taxonomy().describe()
+    }
+
+
+def _require_admin(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")) -> None:
+    """Allow the request only with the configured ADMIN_TOKEN."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/admin/taxonomy/reload", dependencies=[Depends(_require_admin)])
+async def reload_skill_taxonomy():
+    """Recompile the skill taxonomy file and swap it in; the current taxonomy stays on failure."""
+    previous = get_taxonomy().describe()
+    try:
+        taxonomy = await asyncio.to_thread(reload_taxonomy)
+    except TaxonomyError as e:
+        raise HTTPException(status_code=400, detail=f"Taxonomy reload failed, keeping version {previous['version']}: {e}")
+    return {"previous": previous, "current": taxonomy.describe()}
+
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose request, stage, LLM error and upload size metrics in the Prometheus text format."""
+    # Starlette appends "; charset=utf-8" to text/* media types
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
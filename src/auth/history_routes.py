@@ -1,14 +1,26 @@
 """
 Routes for analysis history by user ID.
 """
+import json
 import logging
+import time
 from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Type
 from .database import get_db
-from .schemas import AnalysisHistoryResponse
+from .schemas import (
+    AnalysisHistoryResponse, RescoreRequest, RescoreResponse,
+    CandidateSearchRequest, CandidateSearchResponse, CandidateMatch
+)
 from .dependencies import get_current_active_user
 from .models import User, AnalysisHistory
+from .search_index import search_candidates
+from .service import HistoryService
+from ..core.models import JDStruct, CVStruct, ParsedInputs
+from ..core.pipeline import rescore
+from ..parsers.fast import fast_parse_jd
+from ..utils.utils import clean_text
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/history", tags=["history"])
@@ -35,3 +47,100 @@ def get_all_analysis_by_user_id(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error fetching analysis history: {str(e)}"
         )
+
+
+def _apply_edits(model: Type, stored: str, edits: Dict[str, Any], name: str):
+    """Rebuild a stored struct with edited fields, mapping unknown or invalid fields to a 400."""
+    unknown = set(edits) - set(model.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {name} field(s): {', '.join(sorted(unknown))}. Valid fields: {', '.join(model.model_fields)}"
+        )
+    try:
+        return model(**{**json.loads(stored), **edits})
+    except ValidationError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {name} edits: {e}")
+
+
+@router.post("/{analysis_id}/rescore", response_model=RescoreResponse, response_model_exclude_unset=True)
+def rescore_analysis(
+    analysis_id: int,
+    request: RescoreRequest = RescoreRequest(),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Re-score a stored analysis from its parsed job description and CV, without calling the LLM.
+    
+    jd and cv replace individual struct fields before scoring; the safety
+    scan and ATS validation re-run against the stored tailored resume. With
+    save, the new score and the edited structs replace the stored ones.
+    """
+    analysis = db.query(AnalysisHistory).filter(
+        AnalysisHistory.id == analysis_id, AnalysisHistory.user_id == current_user.id
+    ).first()
+    if analysis is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Analysis not found")
+    stored = HistoryService.get_inputs(db, analysis_id)
+    if stored is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This analysis was saved without its parsed inputs; run the analysis again to re-score it"
+        )
+    
+    inputs = ParsedInputs(
+        resume_text=stored.resume_text,
+        jd=_apply_edits(JDStruct, stored.jd_struct, request.jd, "jd"),
+        cv=_apply_edits(CVStruct, stored.cv_struct, request.cv, "cv")
+    )
+    result, ats_validation = rescore(inputs, analysis.tailored_resume or "", include_ats_validation=request.include_ats)
+    logger.info(f"Re-scored analysis {analysis_id}: {analysis.score} -> {result.score}")
+    
+    previous_score = analysis.score
+    if request.save:
+        HistoryService.save_rescore(db, analysis, stored, result)
+    return RescoreResponse(
+        analysis_id=analysis_id,
+        previous_score=previous_score,
+        result=result,
+        ats_validation=ats_validation,
+        jd=inputs.jd,
+        cv=inputs.cv,
+        saved=request.save
+    )
+
+
+@router.post("/search", response_model=CandidateSearchResponse)
+def search_analyses(
+    request: CandidateSearchRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Rank the current user's stored analyses against a job description, without calling the LLM.
+    
+    Candidates come from the search index (skills, seniority and education
+    of every CV analysed with parsed inputs). Raw job text is parsed with
+    the local extractor; pass jd for an LLM-quality parse.
+    """
+    if request.jd is None and not (request.job_description or "").strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide job_description or jd")
+    started = time.perf_counter()
+    jd = request.jd or fast_parse_jd(clean_text(request.job_description))
+    hits = search_candidates(db, current_user.id, jd, request.top_k, request.education, request.seniority)
+    
+    analyses = {
+        a.id: a for a in db.query(AnalysisHistory).filter(AnalysisHistory.id.in_([h.analysis_id for h in hits]))
+    } if hits else {}
+    candidates = [
+        CandidateMatch(
+            **vars(hit),
+            analysis_score=analyses[hit.analysis_id].score,
+            created_at=analyses[hit.analysis_id].created_at
+        )
+        for hit in hits if hit.analysis_id in analyses
+    ]
+    took_ms = round((time.perf_counter() - started) * 1000.0, 2)
+    logger.info(f"Candidate search for user {current_user.id}: {len(candidates)} results in {took_ms}ms")
+    return CandidateSearchResponse(jd=jd, candidates=candidates, took_ms=took_ms)
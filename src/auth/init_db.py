@@ -3,7 +3,7 @@ Database initialization script.
 """
 import logging
 from .database import engine, Base
-from .models import User, AnalysisHistory, PaymentHistory
+from .models import User, AnalysisHistory, AnalysisInputs, AnalysisJob, PaymentHistory, SearchDocument, SearchPosting
 
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,42 @@
+"""
+Database migration script for the parsed-inputs, job queue and search tables.
+This script creates analysis_inputs, analysis_jobs, search_documents and
+search_postings in an existing database and indexes the analyses that
+already have parsed inputs.
+"""
+import logging
+from sqlalchemy import inspect
+from .database import engine, SessionLocal
+from .models import AnalysisInputs, AnalysisJob, SearchDocument, SearchPosting
+from .search_index import rebuild_index
+
+logger = logging.getLogger(__name__)
+
+NEW_TABLES = (AnalysisInputs, AnalysisJob, SearchDocument, SearchPosting)
+
+def migrate_database():
+    """Create the tables missing from an existing database and backfill the search index."""
+    try:
+        existing = set(inspect(engine).get_table_names())
+        missing = [model.__table__ for model in NEW_TABLES if model.__tablename__ not in existing]
+        if not missing:
+            logger.info("ℹ️  No migration needed - all tables already exist")
+            return
+
+        logger.info(f"🔄 Migrating database: creating {', '.join(t.name for t in missing)}...")
+        for table in missing:
+            table.create(bind=engine, checkfirst=True)
+
+        if SearchPosting.__table__ in missing:
+            session = SessionLocal()
+            try:
+                logger.info(f"Search index built for {rebuild_index(session)} analyses")
+            finally:
+                session.close()
+        logger.info("✅ Database migration completed successfully!")
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {e}", exc_info=True)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    migrate_database()
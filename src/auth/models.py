@@ -1,7 +1,7 @@
 """
 Database models for authentication and user management.
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, Index
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -30,6 +30,57 @@ class AnalysisHistory(Base):
     analysis_result = Column(Text, nullable=True)  # JSON string of the full result
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+class AnalysisInputs(Base):
+    """Parsed inputs of an analysis, so it can be re-scored without calling the LLM."""
+    __tablename__ = "analysis_inputs"
+    
+    analysis_id = Column(Integer, primary_key=True, index=True)  # AnalysisHistory.id
+    resume_text = Column(Text, nullable=False)  # Cleaned resume text the CV was parsed from
+    jd_struct = Column(Text, nullable=False)  # JSON string of the JDStruct
+    cv_struct = Column(Text, nullable=False)  # JSON string of the CVStruct
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class SearchDocument(Base):
+    """Per-analysis facts the candidate search ranks by (one row per indexed analysis)."""
+    __tablename__ = "search_documents"
+    
+    analysis_id = Column(Integer, primary_key=True)  # AnalysisHistory.id
+    user_id = Column(Integer, nullable=False, index=True)
+    years_of_experience = Column(Float, nullable=False, default=0.0)
+    seniority = Column(String(20), nullable=False)  # junior, mid, senior (from years_of_experience)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SearchPosting(Base):
+    """Inverted index entry: a normalized skill, seniority or education term of an analysis."""
+    __tablename__ = "search_postings"
+    __table_args__ = (
+        # Covers the search query: postings of one user for a set of terms, grouped by analysis
+        Index("ix_search_postings_user_term", "user_id", "term", "analysis_id"),
+    )
+    
+    analysis_id = Column(Integer, primary_key=True)  # AnalysisHistory.id
+    term = Column(String(255), primary_key=True)  # e.g. "skill:python", "seniority:senior", "education:master"
+    user_id = Column(Integer, nullable=False)
+
+class AnalysisJob(Base):
+    """Model for queued background analyses."""
+    __tablename__ = "analysis_jobs"
+    
+    id = Column(String(36), primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    status = Column(String(20), default="queued", index=True)  # queued, running, succeeded, failed
+    payload = Column(Text, nullable=False)  # JSON string of the pipeline inputs
+    result = Column(Text, nullable=True)  # JSON string of the SuperOutput
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    available_at = Column(Float, nullable=False, index=True)  # Epoch seconds; queued: run after, running: lease expiry
+    webhook_url = Column(String(2048), nullable=True)
+    webhook_status = Column(String(50), nullable=True)  # delivered, failed
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
 class PaymentHistory(Base):
     """Model for storing payment history."""
     __tablename__ = "payment_history"
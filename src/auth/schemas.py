@@ -1,9 +1,11 @@
 """
 Pydantic schemas for authentication.
 """
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from ..core.config import SEARCH_DEFAULT_TOP_K, SEARCH_MAX_TOP_K
+from ..core.models import ATSValidationResult, JDStruct, CVStruct, SuperOutput
 
 class UserBase(BaseModel):
     """Base user schema."""
@@ -51,6 +53,50 @@ class AnalysisHistoryResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class RescoreRequest(BaseModel):
+    """Edits applied to a stored analysis's parsed structs before re-scoring it."""
+    jd: Dict[str, Any] = Field(default_factory=dict, description="JDStruct fields to replace, e.g. must_have_skills")
+    cv: Dict[str, Any] = Field(default_factory=dict, description="CVStruct fields to replace, e.g. years_of_experience")
+    include_ats: bool = Field(True, description="Run ATS validation on the stored tailored resume")
+    save: bool = Field(False, description="Store the new score and the edited structs in the history entry")
+
+class RescoreResponse(BaseModel):
+    """Schema for a re-scored analysis."""
+    analysis_id: int
+    previous_score: float
+    result: SuperOutput
+    ats_validation: Optional[ATSValidationResult] = Field(None, description="ATS validation of the stored tailored resume, when include_ats")
+    jd: JDStruct
+    cv: CVStruct
+    saved: bool
+
+class CandidateSearchRequest(BaseModel):
+    """A job description to rank stored analyses against: raw text or an already parsed JDStruct."""
+    job_description: Optional[str] = Field(None, description="Job description text, parsed locally (no LLM call)")
+    jd: Optional[JDStruct] = Field(None, description="Parsed job description; takes precedence over job_description")
+    top_k: int = Field(SEARCH_DEFAULT_TOP_K, ge=1, le=SEARCH_MAX_TOP_K, description="Number of candidates to return")
+    education: List[str] = Field(default_factory=list, description="Only candidates with any of these degrees or levels (bachelor, master, phd)")
+    seniority: List[str] = Field(default_factory=list, description="Only candidates at any of these levels (junior, mid, senior)")
+
+class CandidateMatch(BaseModel):
+    """A stored analysis ranked by the candidate search."""
+    analysis_id: int
+    score: float = Field(..., description="Index score: must-have, nice-to-have and seniority fit")
+    must_have: float
+    nice_to_have: float
+    seniority_fit: float
+    years_of_experience: float
+    matched_skills: List[str]
+    missing_skills: List[str]
+    analysis_score: float = Field(..., description="Score of the stored analysis against its own job")
+    created_at: Optional[datetime] = None
+
+class CandidateSearchResponse(BaseModel):
+    """Schema for candidate search results."""
+    jd: JDStruct
+    candidates: List[CandidateMatch]
+    took_ms: float
+
 class PaymentHistoryResponse(BaseModel):
     """Schema for payment history response."""
     id: int
@@ -0,0 +1,262 @@
+"""
+Inverted index over stored analyses, for candidate search.
+
+Every analysis saved with its parsed inputs is indexed under normalized
+terms (phrase keys, so case, accents and punctuation do not matter):
+
+- "skill:<key>": each tech stack and language item, as a whole and word by
+  word, plus every known skill (taxonomy tech aliases and skill variants)
+  the resume text mentions;
+- "seniority:<level>": junior, mid or senior from the years of experience;
+- "education:<degree>" and "education:<level>" (bachelor, master, phd).
+
+A search turns a job description into the skill terms that count as
+evidence for each of its skills (skill_alternatives, as in match_and_score)
+and ranks the user's analyses with one grouped query over the
+(user_id, term) index:
+
+    score = 0.7 * must-have coverage + 0.2 * nice-to-have coverage + 0.1 * seniority fit
+
+This is match_and_score with nice-to-have skills in place of
+responsibilities, which need the resume text. When the job lists no
+nice-to-have skills, must-have coverage takes their weight.
+
+Run "python -m src.auth.search_index" to index analyses saved before the
+index existed.
+"""
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache, reduce
+from operator import add
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Set
+
+from sqlalchemy import case, func, literal, select
+from sqlalchemy.orm import Session
+
+from .models import AnalysisHistory, AnalysisInputs, SearchDocument, SearchPosting
+from ..core.matcher import seniority_fit_score
+from ..core.models import CVStruct, JDStruct
+from ..core.resume_index import PhraseKeys, ResumeIndex, phrase_key, skill_alternatives
+from ..core.taxonomy import Taxonomy, get_taxonomy, register_compiler
+
+logger = logging.getLogger(__name__)
+
+# Longest phrase key indexed (SearchPosting.term is a String(255) with its prefix)
+MAX_TERM_LENGTH = 200
+
+# Degree words -> level used by the "education" search filter
+EDUCATION_LEVELS = {
+    "bachelor": "bachelor", "licence": "bachelor",
+    "master": "master", "mba": "master",
+    "doctor": "phd", "phd": "phd", "doctorat": "phd"
+}
+
+
+class _TermKeys(NamedTuple):
+    """Phrase keys the index looks for, compiled once per taxonomy."""
+    skills: PhraseKeys
+    degrees: PhraseKeys
+    # Education alias key -> canonical degree key
+    canonical_degrees: Dict[str, str]
+
+
+@register_compiler
+@lru_cache(maxsize=2)
+def _term_keys(taxonomy: Taxonomy) -> _TermKeys:
+    """Skill and degree keys of a taxonomy."""
+    variants = taxonomy.skill_variants
+    names = set(taxonomy.aliases["tech"]) | set(variants) | {v for spellings in variants.values() for v in spellings}
+    canonical = {phrase_key(alias): phrase_key(degree) for alias, degree in taxonomy.aliases["education"].items()}
+    canonical.pop("", None)
+    return _TermKeys(PhraseKeys(map(phrase_key, names)), PhraseKeys(canonical), canonical)
+
+
+def seniority_level(years: float) -> str:
+    """Seniority level of a candidate, with the thresholds the fast parser uses for job descriptions."""
+    y = years or 0.0
+    return "junior" if y < 2 else "mid" if y < 5 else "senior"
+
+
+def education_terms(education: Iterable[str]) -> Set[str]:
+    """Canonical degrees and degree levels named by education entries."""
+    keys = _term_keys(get_taxonomy())
+    degrees: Set[str] = set()
+    for entry in education:
+        degrees.update(keys.canonical_degrees[alias] for alias in keys.degrees.found_in(ResumeIndex(entry)))
+    words = {word for degree in degrees for word in degree.split(" ")}
+    levels = {EDUCATION_LEVELS[word] for word in words if word in EDUCATION_LEVELS}
+    return {f"education:{term}" for term in degrees | levels}
+
+
+def candidate_terms(cv: CVStruct, resume_text: str) -> Set[str]:
+    """Every index term of a parsed CV and its resume text."""
+    skills: Set[str] = set()
+    for item in [*(cv.tech_stack or []), *(cv.languages or [])]:
+        key = phrase_key(item)
+        if key:
+            skills.add(key)
+            skills.update(key.split(" "))
+    skills.update(_term_keys(get_taxonomy()).skills.found_in(ResumeIndex(resume_text or "")))
+    terms = {f"skill:{key}" for key in skills if len(key) <= MAX_TERM_LENGTH}
+    terms.add(f"seniority:{seniority_level(cv.years_of_experience)}")
+    return terms | education_terms(cv.education or [])
+
+
+def index_analysis(db: Session, analysis_id: int, user_id: int, cv: CVStruct, resume_text: str) -> None:
+    """Replace the index entries of an analysis; the caller commits."""
+    terms = candidate_terms(cv, resume_text)
+    db.query(SearchPosting).filter(SearchPosting.analysis_id == analysis_id).delete(synchronize_session=False)
+    db.merge(SearchDocument(
+        analysis_id=analysis_id,
+        user_id=user_id,
+        years_of_experience=cv.years_of_experience or 0.0,
+        seniority=seniority_level(cv.years_of_experience)
+    ))
+    db.add_all(SearchPosting(analysis_id=analysis_id, term=term, user_id=user_id) for term in sorted(terms))
+
+
+def rebuild_index(db: Session, batch_size: int = 500) -> int:
+    """Index every analysis that has stored parsed inputs; returns how many were indexed."""
+    count, last_id = 0, 0
+    while True:
+        rows = db.query(AnalysisInputs, AnalysisHistory.user_id)\
+            .join(AnalysisHistory, AnalysisHistory.id == AnalysisInputs.analysis_id)\
+            .filter(AnalysisInputs.analysis_id > last_id)\
+            .order_by(AnalysisInputs.analysis_id)\
+            .limit(batch_size)\
+            .all()
+        if not rows:
+            return count
+        for inputs, user_id in rows:
+            cv = CVStruct.model_validate_json(inputs.cv_struct)
+            index_analysis(db, inputs.analysis_id, user_id, cv, inputs.resume_text)
+        last_id = rows[-1][0].analysis_id
+        db.commit()
+        count += len(rows)
+        logger.info(f"Indexed {count} analyses")
+
+
+@dataclass
+class CandidateHit:
+    """One ranked analysis."""
+    analysis_id: int
+    score: float
+    must_have: float
+    nice_to_have: float
+    seniority_fit: float
+    years_of_experience: float
+    matched_skills: List[str] = field(default_factory=list)
+    missing_skills: List[str] = field(default_factory=list)
+
+
+def _skill_hits(alternatives: List[Set[str]]):
+    """SQL count of the skills (one set of terms each) an analysis's grouped postings cover."""
+    if not alternatives:
+        return literal(0)
+    return reduce(add, (
+        func.max(case((SearchPosting.term.in_(sorted(terms)), 1), else_=0)) for terms in alternatives
+    ))
+
+
+def _seniority_fit_sql(jd_seniority: str, years):
+    """seniority_fit_score as a SQL expression over a years column."""
+    s = (jd_seniority or "").lower()
+    if s == "junior":
+        return case((years < 2, 100.0), else_=60.0)
+    if s == "mid":
+        return case(((years >= 2) & (years < 6), 100.0), (years >= 6, 80.0), else_=40.0)
+    if s == "senior":
+        return case((years >= 5, 100.0), (years >= 3, 70.0), else_=30.0)
+    return literal(60.0)
+
+
+def _coverage(hits: int, total: int) -> float:
+    return (hits / max(1, total)) * 100.0
+
+
+def search_candidates(
+    db: Session,
+    user_id: int,
+    jd: JDStruct,
+    top_k: int,
+    education: Sequence[str] = (),
+    seniority: Sequence[str] = ()
+) -> List[CandidateHit]:
+    """
+    Rank a user's indexed analyses against a job description.
+
+    Only analyses matching at least one of the job's skills are ranked.
+    education and seniority restrict the results to analyses having any of
+    the given degrees/levels or seniority levels.
+    """
+    must = jd.must_have_skills or []
+    nice = jd.nice_to_have_skills or []
+    must_terms = [{f"skill:{key}" for key in skill_alternatives(s)} for s in must]
+    nice_terms = [{f"skill:{key}" for key in skill_alternatives(s)} for s in nice]
+    query_terms = sorted(set().union(*must_terms, *nice_terms))
+    if not query_terms:
+        return []
+
+    P, D = SearchPosting, SearchDocument
+    grouped = select(
+        P.analysis_id.label("analysis_id"),
+        _skill_hits(must_terms).label("must_hits"),
+        _skill_hits(nice_terms).label("nice_hits")
+    ).where(P.user_id == user_id, P.term.in_(query_terms)).group_by(P.analysis_id)
+    for prefix, values in (("education", education), ("seniority", seniority)):
+        wanted = sorted({f"{prefix}:{phrase_key(v)}" for v in values if phrase_key(v)})
+        if wanted:
+            grouped = grouped.where(P.analysis_id.in_(
+                select(P.analysis_id).where(P.user_id == user_id, P.term.in_(wanted))
+            ))
+    grouped = grouped.subquery()
+
+    must_cov = grouped.c.must_hits * (100.0 / max(1, len(must)))
+    nice_cov = grouped.c.nice_hits * (100.0 / len(nice)) if nice else must_cov
+    score = 0.7 * must_cov + 0.2 * nice_cov + 0.1 * _seniority_fit_sql(jd.seniority, D.years_of_experience)
+    rows = db.execute(
+        select(grouped.c.analysis_id, grouped.c.must_hits, grouped.c.nice_hits, D.years_of_experience)
+        .join(D, D.analysis_id == grouped.c.analysis_id)
+        .order_by(score.desc(), grouped.c.analysis_id.desc())
+        .limit(top_k)
+    ).all()
+    if not rows:
+        return []
+
+    # Skill names and exact scores for the returned rows only
+    found: Dict[int, Set[str]] = {}
+    for analysis_id, term in db.execute(
+        select(P.analysis_id, P.term).where(P.analysis_id.in_([r.analysis_id for r in rows]), P.term.in_(query_terms))
+    ):
+        found.setdefault(analysis_id, set()).add(term)
+
+    hits = []
+    for row in rows:
+        terms = found.get(row.analysis_id, set())
+        must_cov_value = _coverage(row.must_hits, len(must))
+        nice_cov_value = _coverage(row.nice_hits, len(nice)) if nice else must_cov_value
+        sen_fit = seniority_fit_score(jd.seniority, row.years_of_experience)
+        hits.append(CandidateHit(
+            analysis_id=row.analysis_id,
+            score=round(0.7 * must_cov_value + 0.2 * nice_cov_value + 0.1 * sen_fit, 2),
+            must_have=must_cov_value,
+            nice_to_have=_coverage(row.nice_hits, len(nice)),
+            seniority_fit=sen_fit,
+            years_of_experience=row.years_of_experience,
+            matched_skills=[s for s, alternatives in zip(must, must_terms) if alternatives & terms],
+            missing_skills=[s for s, alternatives in zip(must, must_terms) if not alternatives & terms]
+        ))
+    return hits
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+    from .init_db import create_tables
+
+    logging.basicConfig(level=logging.INFO)
+    create_tables()
+    session = SessionLocal()
+    try:
+        logger.info(f"Search index rebuilt for {rebuild_index(session)} analyses")
+    finally:
+        session.close()
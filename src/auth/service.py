@@ -3,10 +3,13 @@ Authentication service for user management.
 """
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from .models import User, AnalysisHistory, PaymentHistory
+from .models import User, AnalysisHistory, AnalysisInputs, PaymentHistory
 from .schemas import UserCreate, UserLogin
 from .jwt_handler import verify_password, get_password_hash, create_access_token, create_refresh_token, verify_token
-from datetime import timedelta
+from .search_index import index_analysis
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import json
 
 class AuthService:
     """Service class for authentication operations."""
@@ -117,3 +120,63 @@ class AuthService:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
             )
+
+
+class HistoryService:
+    """Service class for analysis history operations."""
+    
+    @staticmethod
+    def save_analysis(db: Session, user_id: int, job_text: str, result) -> AnalysisHistory:
+        """
+        Persist a pipeline result (SuperOutput) to the user's analysis history.
+        
+        The parsed job description and CV the result carries are stored
+        alongside, so the analysis can be re-scored without the LLM, and the
+        CV is added to the candidate search index.
+        """
+        analysis_history = AnalysisHistory(
+            user_id=user_id,
+            tailored_resume=result.tailored_resume_text,
+            job_text=job_text,
+            score=result.score,
+            analysis_result=json.dumps(result.model_dump())
+        )
+        db.add(analysis_history)
+        inputs = result.parsed_inputs
+        if inputs is not None:
+            db.flush()
+            db.add(AnalysisInputs(
+                analysis_id=analysis_history.id,
+                resume_text=inputs.resume_text,
+                jd_struct=inputs.jd.model_dump_json(),
+                cv_struct=inputs.cv.model_dump_json()
+            ))
+            index_analysis(db, analysis_history.id, user_id, inputs.cv, inputs.resume_text)
+        db.commit()
+        db.refresh(analysis_history)
+        return analysis_history
+    
+    @staticmethod
+    def get_inputs(db: Session, analysis_id: int) -> Optional[AnalysisInputs]:
+        """Get the stored parsed inputs of an analysis, if it has any."""
+        return db.query(AnalysisInputs).filter(AnalysisInputs.analysis_id == analysis_id).first()
+    
+    @staticmethod
+    def save_rescore(db: Session, analysis: AnalysisHistory, inputs: AnalysisInputs, result) -> AnalysisHistory:
+        """
+        Store a re-scored result over an analysis: its score, the recomputed
+        result fields and the (possibly edited) parsed structs, re-indexing
+        the CV for candidate search. The tailored resume and recommendations
+        are kept.
+        """
+        stored = json.loads(analysis.analysis_result or "{}")
+        stored.update(result.model_dump(exclude_unset=True, exclude={"meta", "tailored_resume_text"}))
+        stored.setdefault("meta", {})["rescored_at"] = datetime.now(timezone.utc).isoformat()
+        analysis.score = result.score
+        analysis.analysis_result = json.dumps(stored)
+        inputs.jd_struct = result.parsed_inputs.jd.model_dump_json()
+        inputs.cv_struct = result.parsed_inputs.cv.model_dump_json()
+        index_analysis(db, analysis.id, analysis.user_id, result.parsed_inputs.cv, inputs.resume_text)
+        db.commit()
+        db.refresh(analysis)
+        return analysis
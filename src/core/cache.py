@@ -0,0 +1,221 @@
+"""
+Content-addressed cache for LLM extraction and tailoring results.
+
+Two tiers: an in-process LRU in front of a persistent SQLite table. Keys are
+a hash of the normalized input text, the model, the prompt version and the
+cache's scope (LLM provider and base URL), so a prompt change invalidates
+its entries without touching the others and results from one backend are
+never served for another. With LLM_PROVIDER=fake the cache is disabled, so
+every call goes through the fake transport and its latency and failure
+injection.
+"""
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from .config import (
+    LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_MAX_ROWS, LLM_PROVIDER, OPENAI_BASE_URL
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+# Trim the SQLite table every N writes rather than on each one
+_TRIM_EVERY = 100
+
+
+def normalize_cache_text(text: str) -> str:
+    """Collapse whitespace so formatting-only differences share a key."""
+    return " ".join((text or "").split())
+
+
+class LLMCache:
+    """
+    Two-tier (memory LRU + SQLite) cache for Pydantic LLM outputs.
+    
+    table lets other stores (e.g. replayable request results) share the
+    same SQLite file with their own TTL and size limits. scope is part of
+    every key, e.g. the LLM provider and base URL the results came from.
+    """
+    
+    def __init__(
+        self,
+        db_path: str,
+        memory_entries: int = 1024,
+        max_rows: int = 100000,
+        ttl_seconds: int = 7 * 24 * 3600,
+        enabled: bool = True,
+        table: str = "llm_cache",
+        scope: str = ""
+    ):
+        self.db_path = db_path
+        self.table = table
+        self.scope = scope
+        self.memory_entries = memory_entries
+        self.max_rows = max_rows
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        
+        # key -> (expires_at, json payload); payloads are re-validated on every
+        # hit so callers can mutate the returned model freely
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "errors": 0
+        }
+    
+    def make_key(self, namespace: str, text: str, model: str, version: str) -> str:
+        """Build a content-addressed key for an LLM call."""
+        payload = "\x1f".join([namespace, version, self.scope, model, normalize_cache_text(text)])
+        return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the SQLite connection lazily and create the table if needed."""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_access ON {self.table}(last_access)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+    
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    def get(self, key: str, schema: Type[T]) -> Optional[T]:
+        """Return a fresh copy of the cached model, or None on a miss."""
+        if not self.enabled:
+            return None
+        
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return schema.model_validate_json(entry[1])
+            if entry:
+                del self._memory[key]
+            
+            try:
+                conn = self._connect()
+                row = conn.execute(
+                    f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    conn.execute(f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key))
+                    conn.commit()
+                    self._remember(key, row[1], row[0])
+                    self._stats["disk_hits"] += 1
+                    return schema.model_validate_json(row[0])
+                if row:
+                    conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    conn.commit()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"LLM cache read failed: {e}")
+            
+            self._stats["misses"] += 1
+            return None
+    
+    def set(self, key: str, value: BaseModel, ttl_seconds: Optional[int] = None) -> None:
+        """Store a model in both tiers, for ttl_seconds (default: the cache's TTL)."""
+        if not self.enabled:
+            return
+        
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        payload = value.model_dump_json()
+        with self._lock:
+            self._remember(key, expires_at, payload)
+            self._stats["writes"] += 1
+            try:
+                conn = self._connect()
+                conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, payload, expires_at, now)
+                )
+                self._writes += 1
+                if self._writes % _TRIM_EVERY == 0:
+                    self._trim(conn, now)
+                conn.commit()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.warning(f"LLM cache write failed: {e}")
+    
+    async def aget(self, key: str, schema: Type[T]) -> Optional[T]:
+        """Async variant of get; the SQLite lookup runs in a worker thread."""
+        return await asyncio.to_thread(self.get, key, schema)
+    
+    async def aset(self, key: str, value: BaseModel) -> None:
+        """Async variant of set; the SQLite write runs in a worker thread."""
+        await asyncio.to_thread(self.set, key, value)
+    
+    def _trim(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows and the least recently used rows above max_rows."""
+        expired = conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,)).rowcount
+        overflow = conn.execute(f"""
+            DELETE FROM {self.table} WHERE key IN (
+                SELECT key FROM {self.table} ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_rows,)).rowcount
+        self._stats["evictions"] += max(0, expired) + max(0, overflow)
+    
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self.enabled:
+                conn = self._connect()
+                conn.execute(f"DELETE FROM {self.table}")
+                conn.commit()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current memory tier size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Process-wide cache instance
+llm_cache = LLMCache(
+    LLM_CACHE_PATH,
+    memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+    max_rows=LLM_CACHE_MAX_ROWS,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    # Fake replies must not be served to real traffic, nor hide the fake's latency and failures
+    enabled=LLM_CACHE_ENABLED and LLM_PROVIDER != "fake",
+    scope=f"{LLM_PROVIDER}|{OPENAI_BASE_URL or ''}"
+)
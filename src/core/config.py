@@ -13,6 +13,57 @@ logger = logging.getLogger(__name__)
 # API Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-4o-mini")
+# OpenAI-compatible endpoint, e.g. a local gateway (defaults to api.openai.com)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or os.getenv("OPENAI_API_BASE")
+
+# Per-stage model routing: JSON object mapping parse_jd, parse_cv, parse_jd_cv, tailor
+# or "default" to a model or an ordered list of models (the rest are fallbacks),
+# e.g. {"parse_jd": "gpt-4o-mini", "tailor": ["gpt-4o", "gpt-4o-mini"]}.
+# MODEL_ROUTES_FILE points to a JSON file with the same content and wins over MODEL_ROUTES.
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "")
+MODEL_ROUTES_FILE = os.getenv("MODEL_ROUTES_FILE", "")
+
+# LLM HTTP connection pools
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+# Outbound LLM scheduler: per-model request/token budgets (per minute), adaptive
+# (AIMD) concurrency between the min and max, and fair queueing across requests
+LLM_SCHEDULER_ENABLED = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true"
+LLM_RPM_LIMIT = float(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = float(os.getenv("LLM_TPM_LIMIT", "200000"))
+# JSON per-model overrides, e.g. {"gpt-4o": {"rpm": 500, "tpm": 30000}}
+LLM_MODEL_LIMITS = os.getenv("LLM_MODEL_LIMITS", "")
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_INITIAL_CONCURRENCY = int(os.getenv("LLM_INITIAL_CONCURRENCY", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+# Shrink concurrency when recent latency per token exceeds this multiple of the long-run average
+LLM_LATENCY_BACKOFF_FACTOR = float(os.getenv("LLM_LATENCY_BACKOFF_FACTOR", "2.0"))
+# Completion tokens assumed for requests that do not set max_tokens
+LLM_COMPLETION_TOKENS_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKENS_ESTIMATE", "1000"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "300"))  # 0 waits forever
+
+# LLM provider: "openai" or "fake" (local, offline responses derived from the
+# input; no API key or network needed). The fake's knobs are below.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "500"))  # time to first token
+FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "100"))
+FAKE_LLM_LATENCY_DISTRIBUTION = os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "normal").lower()  # fixed, uniform, normal, lognormal, exponential
+FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0"))  # 0 = whole reply at once
+FAKE_LLM_RATE_429 = float(os.getenv("FAKE_LLM_RATE_429", "0"))
+FAKE_LLM_RATE_500 = float(os.getenv("FAKE_LLM_RATE_500", "0"))
+FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+FAKE_LLM_RETRY_AFTER = float(os.getenv("FAKE_LLM_RETRY_AFTER", "0.5"))  # seconds, sent with 429s
+FAKE_LLM_SEED = os.getenv("FAKE_LLM_SEED")
+
+# How structured output is requested from the LLM: "tools" (native function
+# calling, no schema in the prompt) or "prompt" (JSON schema in the prompt,
+# for endpoints without tool support). Both repair malformed JSON locally.
+STRUCTURED_OUTPUT_BACKEND = os.getenv("STRUCTURED_OUTPUT_BACKEND", "tools").lower()
 
 # JWT Configuration
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-this-in-production")
@@ -32,60 +83,13 @@ if not OPENAI_API_KEY:
 else:
     logger.info("OPENAI_API_KEY is configured")
 
-# Normalization aliases for different categories
-ALIASES = {
-    "seniority": {
-        "stagiaire": "junior", "alternant": "junior", "junior": "junior", "entry-level": "junior",
-        "confirmé": "mid", "expérimenté": "mid", "intermédiaire": "mid", "mid-level": "mid",
-        "senior": "senior", "lead": "senior", "principal": "senior", "expert": "senior", "staff": "senior"
-    },
-    "roles": {
-        "développeur": "software engineer", "développeuse": "software engineer",
-        "ingénieur logiciel": "software engineer", "ingénieur études et développement": "software engineer",
-        "développeur back-end": "backend engineer", "développeur front-end": "frontend engineer",
-        "full-stack": "fullstack engineer", "référent technique": "tech lead", "tech lead": "tech lead"
-    },
-    "tech": {
-        "js": "javascript", "javascript": "javascript", "ts": "typescript", "typescript": "typescript",
-        "py": "python", "python": "python", "java ee": "java", "jee": "java", "j2ee": "java", "java": "java",
-        ".net": ".net", "dotnet": ".net", "sql": "sql", "spring": "spring boot", "spring boot": "spring boot",
-        "hibernate": "hibernate", "struts": "struts", "jpa": "jpa", "maven": "maven", "gradle": "gradle",
-        "reactjs": "react", "react": "react", "vuejs": "vue", "vue": "vue", "angular": "angular", "jquery": "jquery",
-        "postgres": "postgresql", "postgresql": "postgresql", "mysql": "mysql", "oracle": "oracle",
-        "mongodb": "mongodb", "mongo": "mongodb", "elasticsearch": "elasticsearch", "elastic": "elasticsearch",
-        "redis": "redis", "aws": "aws", "azure": "azure", "gcp": "gcp", "google cloud": "gcp",
-        "docker": "docker", "k8s": "kubernetes", "kubernetes": "kubernetes", "ci/cd": "ci/cd",
-        "intégration continue": "ci/cd", "déploiement continu": "ci/cd", "terraform": "terraform", "ansible": "ansible",
-        "micro-services": "microservices", "microservices": "microservices", "rest": "rest", "restful": "rest",
-        "soap": "soap", "event-driven": "event-driven", "événementiel": "event-driven",
-        "message broker": "message queues", "queue": "message queues", "mq": "message queues"
-    },
-    "skills": {
-        "cahier des charges": "functional specifications", "spécifications fonctionnelles": "functional specifications",
-        "spécifications techniques": "technical specifications", "conception": "technical design", "design technique": "technical design",
-        "développement back-end": "backend development", "développement front-end": "frontend development",
-        "mise en production": "production deployment", "go-live": "production deployment", "release": "production deployment",
-        "exploitation": "operations", "run": "operations", "recette": "user acceptance testing",
-        "tests fonctionnels": "user acceptance testing", "tests unitaires": "unit testing", "revue de code": "code review",
-        "pair programming": "pair programming", "montée en compétence": "upskilling", "veille technologique": "tech watch",
-        "performance": "performance optimization", "optimisation": "performance optimization",
-        "ergonomie": "ux/usability", "ux": "ux/usability", "accessibilité": "ux/usability",
-        "sécurité applicative": "application security", "gestion d'incidents": "incident management",
-        "sla": "sla management", "engagements de service": "sla management"
-    },
-    "education": {
-        "b.s.": "bachelor of science", "bs": "bachelor of science", "bachelor of science": "bachelor of science",
-        "b.a.": "bachelor of arts", "ba": "bachelor of arts", "bachelor of arts": "bachelor of arts",
-        "b.eng.": "bachelor of engineering", "beng": "bachelor of engineering", "bachelor of engineering": "bachelor of engineering",
-        "b.com.": "bachelor of commerce", "bcom": "bachelor of commerce", "bachelor of commerce": "bachelor of commerce",
-        "m.s.": "master of science", "ms": "master of science", "master of science": "master of science",
-        "m.a.": "master of arts", "ma": "master of arts", "master of arts": "master of arts",
-        "m.eng.": "master of engineering", "meng": "master of engineering", "master of engineering": "master of engineering",
-        "mba": "master of business administration", "master of business administration": "master of business administration",
-        "phd": "doctor of philosophy", "ph.d.": "doctor of philosophy", "doctor of philosophy": "doctor of philosophy",
-        "licence": "bachelor degree", "master": "master degree", "doctorat": "phd", "ingénieur": "engineer"
-    }
-}
+# Skill taxonomy (normalization aliases, skill and education variants): a versioned
+# JSON file compiled at startup, reloaded without a restart on SIGHUP or
+# POST /admin/taxonomy/reload (see src/core/taxonomy.py)
+TAXONOMY_FILE = os.getenv("TAXONOMY_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "taxonomy.json")
+
+# Token for the /admin endpoints (X-Admin-Token header); they are disabled when empty
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 # Text processing patterns
 BULLET_PATTERN = r"[•·◦●∙\u2022\u25CF\u2219]"
@@ -94,44 +98,51 @@ MULTINEWLINE = r"\n{3,}"
 DASHES = r"[–—―]+"
 DATE_RANGE = r"(\b\d{1,2}[\/\.-]\d{4}\b|\b\d{4}\b)\s*[-–—]\s*(\b\d{1,2}[\/\.-]\d{4}\b|\bPresent|Présent|Now\b)"
 
-# Skill matching variants
-SKILL_VARIANTS = {
-    "ruby": ["ruby", "ruby on rails", "rails"],
-    "javascript": ["javascript", "js", "node.js", "nodejs"],
-    "java": ["java", "java ee", "jee", "j2ee"],
-    "python": ["python", "py"],
-    "react": ["react", "reactjs", "react.js"],
-    "node.js": ["node.js", "nodejs", "node"],
-    "sql": ["sql", "mysql", "postgresql", "postgres"],
-    "mongodb": ["mongodb", "mongo"],
-    "aws": ["aws", "amazon web services"],
-    "docker": ["docker", "dockerfile"],
-    "kubernetes": ["kubernetes", "k8s"],
-    "git": ["git", "github", "gitlab"],
-    "agile": ["agile", "scrum", "kanban"],
-    "rest": ["rest", "restful", "rest api"],
-    "graphql": ["graphql", "graph ql"],
-    "typescript": ["typescript", "ts"],
-    "html": ["html", "html5"],
-    "css": ["css", "css3"],
-    "swift": ["swift", "ios"],
-    "c++": ["c++", "cpp", "c plus plus"],
-    "c": ["c programming", "c language"],
-    "latex": ["latex", "tex"],
-    "figma": ["figma"],
-    "firebase": ["firebase"],
-    "heroku": ["heroku"],
-    "gcp": ["gcp", "google cloud", "google cloud platform"],
-    "jira": ["jira"],
-    "xcode": ["xcode", "x-code"]
-}
-
-# Education validation variants
-EDUCATION_VARIANTS = {
-    "bachelor of science": ["b.s.", "bs", "bachelor of science"],
-    "master of science": ["m.s.", "ms", "master of science"],
-    "bachelor of arts": ["b.a.", "ba", "bachelor of arts"],
-    "master of business administration": ["mba", "master of business administration"],
-    "doctor of philosophy": ["phd", "ph.d.", "doctor of philosophy"]
-}
+# Responsibilities evidence: BM25 over the resume's lines and achievements
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Responsibilities covered below this percentage are reported as weak evidence
+RESPONSIBILITY_WEAK_COVERAGE = float(os.getenv("RESPONSIBILITY_WEAK_COVERAGE", "50"))
+
+# Batch matching (one resume against many job descriptions)
+BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", "50"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "5"))
+
+# Recruiter ranking (many resumes against one job description)
+RANK_MAX_RESUMES = int(os.getenv("RANK_MAX_RESUMES", "1000"))
+RANK_MAX_CONCURRENCY = int(os.getenv("RANK_MAX_CONCURRENCY", "8"))
+RANK_DEFAULT_TOP_K = int(os.getenv("RANK_DEFAULT_TOP_K", "10"))
+
+# Candidate search over stored analyses (POST /history/search)
+SEARCH_DEFAULT_TOP_K = int(os.getenv("SEARCH_DEFAULT_TOP_K", "20"))
+SEARCH_MAX_TOP_K = int(os.getenv("SEARCH_MAX_TOP_K", "500"))
+
+# Token budget for the tailoring prompt (the resume text is truncated beyond it)
+TAILOR_PROMPT_TOKEN_BUDGET = int(os.getenv("TAILOR_PROMPT_TOKEN_BUDGET", "12000"))
+# Seconds startup waits for the tiktoken encodings (token counts are estimated until they load)
+TIKTOKEN_LOAD_TIMEOUT = float(os.getenv("TIKTOKEN_LOAD_TIMEOUT", "10"))
+
+# Background job queue
+JOB_WORKER_COUNT = int(os.getenv("JOB_WORKER_COUNT", "2"))  # 0 disables workers in this process
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "600"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "30"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_WEBHOOK_TIMEOUT = float(os.getenv("JOB_WEBHOOK_TIMEOUT", "10"))
+# Comma-separated hosts job webhooks may call; when empty, any host resolving only to public addresses
+WEBHOOK_ALLOWED_HOSTS = [h.strip().lower().rstrip(".") for h in os.getenv("WEBHOOK_ALLOWED_HOSTS", "").split(",") if h.strip()]
+
+# LLM result cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "100000"))
 
+# Request idempotency: identical /match/upload requests share one pipeline run while
+# in flight. Results of requests with an Idempotency-Key are replayed for
+# IDEMPOTENCY_TTL_SECONDS (0 disables replay); results of identical requests without
+# one only for IDEMPOTENCY_FINGERPRINT_TTL_SECONDS (0, the default: re-runs run again)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_FINGERPRINT_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_FINGERPRINT_TTL_SECONDS", "0"))
+IDEMPOTENCY_MAX_ROWS = int(os.getenv("IDEMPOTENCY_MAX_ROWS", "10000"))
@@ -0,0 +1,183 @@
+"""
+BM25 evidence index over a resume, for responsibilities coverage.
+
+The resume is split into lines (section lines, bullets, sentences) plus one
+line per achievement. Each line is a BM25 document over folded, lightly
+stemmed tokens with stopwords removed. The index keeps one posting list per
+term (lines and BM25 weights), so its size follows the resume's tokens,
+not lines x vocabulary. A job responsibility is a query: only the postings
+of its terms are expanded to score every line, and the best scoring line is
+its evidence.
+
+Coverage of a responsibility combines two fractions:
+- the share of the IDF mass of the query terms the resume contains that the
+  evidence line holds, so rare, specific terms weigh more than words found
+  all over the resume;
+- the share of query terms the resume contains at all. Absence from one
+  resume says nothing about how specific a word is, so missing terms count
+  with the average weight of the found ones, not an arbitrary high IDF.
+Their product then saturates like BM25 term frequency (COVERAGE_SATURATION):
+a line holding a third of a responsibility, e.g. the technology of "Operate
+services on Kubernetes", clears the default 50% weak-evidence threshold,
+while a line holding one word of a long responsibility does not. The result
+is a whole percent.
+
+Weights are quantized to multiples of 2**-16, so the sums are exact and a
+query scores the same however the queries are batched (see BatchMatcher).
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import BM25_B, BM25_K1
+from .resume_index import INDEX_CACHE_SIZE, tokenize
+
+# Fixed-point grid for term weights: sums of a few hundred weights stay exact in float64
+_QUANTUM = float(2 ** 16)
+# k of the coverage curve f * (1 + k) / (f + k) over the term share f: with 0.5,
+# a quarter of the terms scores 50%, a third 60% and all of them 100%
+COVERAGE_SATURATION = 0.5
+
+# Line breaks, sentence ends and inline " - " bullets (a lookbehind keeping the
+# punctuation makes the split several times slower)
+_LINE_BREAK = re.compile(r"\n+|[.;!?][ \t]+| - ")
+
+STOPWORDS = frozenset("""
+a an and are as at be been by for from has have in into is it its of on or our over that the their this to
+under via was we were will with within you your across all also any based both each etc including like more
+other per such than then these those through up using well what when where which who
+au aux avec ce ces dans de des du en et la le les leur leurs nos notre ou par pour sa se ses son sur un une vos votre
+""".split())
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Strip a plural or verb suffix ('apis' -> 'api', 'designed' -> 'design') from alphabetic tokens; "" for stopwords."""
+    if token in STOPWORDS:
+        return ""
+    if not token.isalpha():
+        return token
+    for suffix in ("ing", "ed", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3 and not token.endswith("ss"):
+            return token[:-len(suffix)]
+    return token
+
+
+def terms(text: str) -> List[str]:
+    """Index terms of a text: folded tokens without stopwords, stemmed."""
+    return [term for term in map(stem, tokenize(text)) if term]
+
+
+@lru_cache(maxsize=4096)
+def query_terms(text: str) -> Tuple[str, ...]:
+    """Distinct terms of a query, in order of appearance."""
+    return tuple(dict.fromkeys(terms(text)))
+
+
+def evidence_lines(resume_text: str, achievements: Sequence[str] = ()) -> List[str]:
+    """Candidate evidence lines: the resume split into lines and sentences, then each achievement."""
+    lines = [line.strip(" -\t") for line in _LINE_BREAK.split(resume_text or "")]
+    lines += [a.strip() for a in achievements or []]
+    return [line for line in lines if line]
+
+
+def _quantize(values: np.ndarray) -> np.ndarray:
+    return np.round(values * _QUANTUM) / _QUANTUM
+
+
+@dataclass
+class Evidence:
+    """A query's coverage (whole percent, 0-100) and its best line ("" when nothing matched)."""
+    coverage: float
+    line: str
+
+
+class EvidenceIndex:
+    """Posting lists with the BM25 weight of every (term, line) pair of one resume; see the module docstring."""
+
+    def __init__(self, lines: Sequence[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.vocab: Dict[str, int] = {}
+        docs = [(line, [self.vocab.setdefault(t, len(self.vocab)) for t in terms(line)]) for line in lines]
+        docs = [(line, ids) for line, ids in docs if ids]
+        self.lines: List[str] = [line for line, _ in docs]
+
+        n = len(docs)
+        lengths = np.array([len(ids) for _, ids in docs], dtype=np.intp)
+        line_ids = np.repeat(np.arange(n, dtype=np.intp), lengths)
+        term_ids = np.concatenate([np.array(ids, dtype=np.intp) for _, ids in docs]) if n else np.zeros(0, dtype=np.intp)
+        # One posting per distinct (term, line) pair, grouped by term and sorted by line
+        pairs, tf = np.unique(term_ids * max(n, 1) + line_ids, return_counts=True)
+        terms_of, self._post_lines = np.divmod(pairs, max(n, 1))
+        self._df = np.bincount(terms_of, minlength=len(self.vocab))
+        self._starts = np.cumsum(self._df) - self._df
+        self.idf = _quantize(np.log1p((n - self._df + 0.5) / (self._df + 0.5)))
+
+        norm = k1 * (1.0 - b + b * lengths / (lengths.mean() if n else 1.0))
+        tf = tf.astype(np.float64)
+        self._post_weights = _quantize(self.idf[terms_of] * (tf * (k1 + 1.0)) / (tf + norm[self._post_lines]))
+
+    def _postings(self, term_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(row in term_ids, line, posting position) of every posting of the given terms."""
+        counts = self._df[term_ids]
+        rows = np.repeat(np.arange(len(term_ids), dtype=np.intp), counts)
+        offsets = np.arange(len(rows), dtype=np.intp) - np.repeat(np.cumsum(counts) - counts, counts)
+        positions = np.repeat(self._starts[term_ids], counts) + offsets
+        return rows, self._post_lines[positions], positions
+
+    def score_matrix(self, queries: np.ndarray, term_ids: np.ndarray, query_lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Coverage of many queries in one pass.
+
+        queries is a (queries, k) 0/1 matrix over the resume terms term_ids;
+        query_lengths counts every distinct term of each query, including
+        terms the resume does not contain. Returns the coverage percentages
+        and the index of each query's best line (-1 when it scored 0).
+
+        Only the postings of term_ids are expanded, to a (k, lines) block.
+        """
+        if not self.lines:
+            return np.zeros(len(queries)), np.full(len(queries), -1, dtype=np.intp)
+        term_ids = np.asarray(term_ids, dtype=np.intp)
+        rows, lines, positions = self._postings(term_ids)
+        weights = np.zeros((len(term_ids), len(self.lines)), dtype=np.float64)
+        weights[rows, lines] = self._post_weights[positions]
+        best = (queries @ weights).argmax(axis=1)
+
+        # IDF of each query term, counted as found where the best line contains it
+        idf = queries * self.idf[term_ids]
+        found = (idf * (weights[:, best].T > 0)).sum(axis=1)
+        known = idf.sum(axis=1)
+        known_terms = queries.sum(axis=1)
+        share = np.divide(found, known, out=np.zeros(len(queries)), where=known > 0)
+        share *= np.divide(known_terms, query_lengths, out=np.zeros(len(queries)), where=query_lengths > 0)
+        coverage = share * (1.0 + COVERAGE_SATURATION) / (share + COVERAGE_SATURATION)
+        return np.rint(coverage * 100.0), np.where(found > 0, best, -1)
+
+    def search(self, queries: Sequence[str]) -> List[Evidence]:
+        """Coverage and best evidence line of each query (e.g. the responsibilities of a job)."""
+        qterms = [query_terms(q) for q in queries]
+        columns: Dict[int, int] = {}
+        cells = [(qi, columns.setdefault(self.vocab[t], len(columns)))
+                 for qi, ts in enumerate(qterms) for t in ts if t in self.vocab]
+        matrix = np.zeros((len(qterms), len(columns)), dtype=np.float64)
+        if cells:
+            r, c = np.array(cells, dtype=np.intp).T
+            matrix[r, c] = 1.0
+        coverage, best = self.score_matrix(
+            matrix, np.fromiter(columns, dtype=np.intp, count=len(columns)),
+            np.array([len(ts) for ts in qterms], dtype=np.float64)
+        )
+        return [Evidence(float(c), self.lines[i] if i >= 0 else "") for c, i in zip(coverage, best)]
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _cached_index(resume_text: str, achievements: Tuple[str, ...]) -> EvidenceIndex:
+    return EvidenceIndex(evidence_lines(resume_text, achievements))
+
+
+def get_evidence_index(resume_text: str, achievements: Optional[Sequence[str]] = None) -> EvidenceIndex:
+    """The evidence index of a resume, built once and reused while it stays in the cache."""
+    return _cached_index(resume_text or "", tuple(achievements or ()))
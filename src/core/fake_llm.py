@@ -0,0 +1,344 @@
+"""
+Offline fake of the OpenAI chat completions API.
+
+FakeLLMTransport is an httpx transport that answers chat completion requests
+locally, so the real OpenAI SDK and ChatOpenAI code paths (retries, tool
+calls, streaming, connection pool accounting) run unchanged without network
+access or an API key. Replies are schema-valid JDStruct / CVStruct /
+JDCVStruct / TailoredOutput JSON derived from the prompt with the rule-based
+extractor. Latency, streaming token rate, 429/500 errors and malformed JSON
+are configurable so concurrency behaviour can be benchmarked
+deterministically. Enabled with LLM_PROVIDER=fake.
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from .config import (
+    FAKE_LLM_LATENCY_MS, FAKE_LLM_JITTER_MS, FAKE_LLM_LATENCY_DISTRIBUTION, FAKE_LLM_TOKENS_PER_SECOND,
+    FAKE_LLM_RATE_429, FAKE_LLM_RATE_500, FAKE_LLM_MALFORMED_RATE, FAKE_LLM_RETRY_AFTER, FAKE_LLM_SEED
+)
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+# Streamed replies are sent in chunks of this many (estimated) tokens
+STREAM_CHUNK_TOKENS = 4
+CHARS_PER_TOKEN = 4
+
+
+def _section(prompt: str, label: str) -> Optional[str]:
+    """Text between the '---' fences that follow 'label:' in a prompt."""
+    m = re.search(rf"(?:^|\n){re.escape(label)}:\s*\n---\n(.*?)\n---", prompt, re.DOTALL)
+    return m.group(1) if m else None
+
+
+def _json_section(prompt: str, label: str) -> Dict[str, Any]:
+    try:
+        return json.loads(_section(prompt, label) or "{}")
+    except ValueError:
+        return {}
+
+
+def _detect_schema(body: Dict[str, Any], prompt: str) -> str:
+    """Name of the schema a request asks for: the forced tool, else inferred from the prompt."""
+    for tool in body.get("tools") or []:
+        name = (tool.get("function") or {}).get("name")
+        if name:
+            return name
+    if _section(prompt, "Original resume") is not None:
+        return "TailoredOutput"
+    has_jd = _section(prompt, "Job description") is not None
+    has_cv = _section(prompt, "Resume") is not None
+    if has_jd and has_cv:
+        return "JDCVStruct"
+    return "JDStruct" if has_jd else "CVStruct"
+
+
+def _fake_tailored(prompt: str) -> Dict[str, Any]:
+    """TailoredOutput built from the resume, structs and gaps in a tailoring prompt."""
+    resume_text = _section(prompt, "Original resume") or ""
+    jd = _json_section(prompt, "Job requirements")
+    cv = _json_section(prompt, "Candidate profile")
+    gaps_match = re.search(r"- Gaps: (.*)", prompt)
+    try:
+        gaps = json.loads(gaps_match.group(1)) if gaps_match else {}
+    except ValueError:
+        gaps = {}
+    missing = gaps.get("missing_skills") or []
+    tech = cv.get("tech_stack") or []
+
+    lines = [line.strip() for line in resume_text.splitlines() if line.strip()]
+    email = re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", resume_text)
+    contact = {"name": lines[0][:80] if lines else ""}
+    if email:
+        contact["email"] = email.group(0)
+    title = jd.get("title") or "software engineer"
+    years = cv.get("years_of_experience") or 0
+    summary = (
+        f"{title.title()} candidate with {years:g} years of experience"
+        + (f" in {', '.join(tech[:4])}" if tech else "") + "."
+    )
+    bullets = [line.lstrip("-*• ").strip() for line in lines if line[:1] in "-*•"]
+    skills = {"technical": tech + [s for s in missing if s not in tech], "soft": cv.get("soft_skills") or []}
+    structured = {
+        "contact_info": contact,
+        "summary": summary,
+        "experience": [{"description": b} for b in bullets[:8]],
+        "education": [{"degree": e} for e in cv.get("education") or []],
+        "skills": skills,
+        "achievements": cv.get("achievements") or [],
+        "languages": [{"name": lang} for lang in cv.get("languages") or []],
+    }
+    text = "\n\n".join([contact["name"], "SUMMARY\n" + summary, "SKILLS\n" + ", ".join(skills["technical"]), resume_text])
+    recommendations = [f"Add concrete evidence of {skill} experience" for skill in missing[:4]]
+    recommendations.append("Quantify achievements with metrics where possible")
+    return {"tailored_resume_text": text, "structured_resume": structured, "recommendations": recommendations}
+
+
+def fake_reply(schema: str, prompt: str) -> Dict[str, Any]:
+    """Schema-valid reply for a prompt, derived from the texts it contains."""
+    # Imported here: the parsers import this package's llm module
+    from ..parsers.fast import fast_parse_jd, fast_parse_cv
+
+    if schema == "TailoredOutput":
+        return _fake_tailored(prompt)
+    if schema == "JDCVStruct":
+        return {
+            "jd": fast_parse_jd(_section(prompt, "Job description") or "").model_dump(),
+            "cv": fast_parse_cv(_section(prompt, "Resume") or "").model_dump()
+        }
+    if schema == "JDStruct":
+        return fast_parse_jd(_section(prompt, "Job description") or "").model_dump()
+    return fast_parse_cv(_section(prompt, "Resume") or "").model_dump()
+
+
+class FakeLLMTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """httpx transport that serves /chat/completions locally (sync and async)."""
+
+    def __init__(
+        self,
+        latency_ms: float = 500.0,
+        jitter_ms: float = 100.0,
+        distribution: str = "normal",
+        tokens_per_second: float = 0.0,
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        malformed_rate: float = 0.0,
+        retry_after: float = 0.5,
+        seed: Optional[int] = None
+    ):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            logger.warning(f"Unknown fake LLM latency distribution '{distribution}', using 'normal'")
+            distribution = "normal"
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self.tokens_per_second = tokens_per_second
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.malformed_rate = malformed_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "streamed": 0, "errors_429": 0, "errors_500": 0, "malformed": 0, "schemas": {}}
+
+    # -- randomness (one seeded generator, so a run is reproducible) --
+
+    def _sample_latency(self) -> float:
+        """Seconds until the first token, drawn from the configured distribution."""
+        mean, jitter = self.latency_ms, self.jitter_ms
+        with self._lock:
+            if self.distribution == "fixed":
+                ms = mean
+            elif self.distribution == "uniform":
+                ms = self._rng.uniform(mean - jitter, mean + jitter)
+            elif self.distribution == "lognormal":
+                sigma = (jitter / mean) if mean > 0 else 0.0
+                ms = mean * self._rng.lognormvariate(0.0, sigma)
+            elif self.distribution == "exponential":
+                ms = self._rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+            else:
+                ms = self._rng.gauss(mean, jitter)
+        return max(0.0, ms) / 1000.0
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _malform(self, text: str) -> str:
+        """Damage JSON the way LLMs do: truncation, trailing commas, fences or prose."""
+        with self._lock:
+            kind = self._rng.choice(("truncate", "trailing_comma", "fenced", "prose"))
+            cut = self._rng.uniform(0.6, 0.95)
+        if kind == "truncate":
+            return text[:int(len(text) * cut)]
+        if kind == "trailing_comma":
+            return text[:-1] + ",}" if text.endswith("}") else text + ","
+        if kind == "fenced":
+            return f"```json\n{text}\n```"
+        return f"Here is the requested JSON:\n{text}\nLet me know if you need anything else."
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests served and failures injected so far, plus the active settings."""
+        with self._lock:
+            counts = {**self._stats, "schemas": dict(self._stats["schemas"])}
+        return {
+            "settings": {
+                "latency_ms": self.latency_ms, "jitter_ms": self.jitter_ms, "distribution": self.distribution,
+                "tokens_per_second": self.tokens_per_second, "rate_429": self.rate_429,
+                "rate_500": self.rate_500, "malformed_rate": self.malformed_rate
+            },
+            **counts
+        }
+
+    # -- request handling --
+
+    def _plan(self, request: httpx.Request) -> Tuple[float, Optional[httpx.Response], Dict[str, Any]]:
+        """Decide how to answer: (latency, error response or None, reply details)."""
+        self._count("requests")
+        latency = self._sample_latency()
+        if not request.url.path.endswith("/chat/completions"):
+            return 0.0, httpx.Response(404, json={"error": {"message": "Only chat completions are faked"}}), {}
+        if self._roll(self.rate_429):
+            self._count("errors_429")
+            return latency, httpx.Response(
+                429, headers={"retry-after": str(self.retry_after)},
+                json={"error": {"message": "Rate limit reached (injected by fake LLM)", "type": "requests", "code": "rate_limit_exceeded"}}
+            ), {}
+        if self._roll(self.rate_500):
+            self._count("errors_500")
+            return latency, httpx.Response(
+                500, json={"error": {"message": "Internal server error (injected by fake LLM)", "type": "server_error"}}
+            ), {}
+
+        body = json.loads(request.content or b"{}")
+        prompt = "\n".join(str(m.get("content") or "") for m in body.get("messages") or [])
+        schema = _detect_schema(body, prompt)
+        text = json.dumps(fake_reply(schema, prompt), ensure_ascii=False)
+        if self._roll(self.malformed_rate):
+            self._count("malformed")
+            text = self._malform(text)
+        self._count_schema(schema, bool(body.get("stream")))
+        tool = next(((t.get("function") or {}).get("name") for t in body.get("tools") or []), None)
+        return latency, None, {
+            "model": body.get("model", "fake"), "text": text, "tool": tool,
+            "stream": bool(body.get("stream")), "prompt_tokens": len(prompt) // CHARS_PER_TOKEN
+        }
+
+    def _count_schema(self, schema: str, streamed: bool) -> None:
+        with self._lock:
+            self._stats["schemas"][schema] = self._stats["schemas"].get(schema, 0) + 1
+            if streamed:
+                self._stats["streamed"] += 1
+
+    def _generation_time(self, text: str) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return (len(text) / CHARS_PER_TOKEN) / self.tokens_per_second
+
+    @staticmethod
+    def _completion(reply: Dict[str, Any]) -> Dict[str, Any]:
+        text, tool = reply["text"], reply["tool"]
+        if tool:
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                "function": {"name": tool, "arguments": text}
+            }]}
+        else:
+            message = {"role": "assistant", "content": text}
+        completion_tokens = len(text) // CHARS_PER_TOKEN
+        return {
+            "id": f"chatcmpl-fake-{uuid.uuid4().hex[:12]}", "object": "chat.completion", "created": int(time.time()),
+            "model": reply["model"],
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool else "stop"}],
+            "usage": {
+                "prompt_tokens": reply["prompt_tokens"], "completion_tokens": completion_tokens,
+                "total_tokens": reply["prompt_tokens"] + completion_tokens
+            }
+        }
+
+    def _stream_events(self, reply: Dict[str, Any]) -> List[Tuple[float, bytes]]:
+        """SSE chunks of a streamed reply, each with the delay to wait before sending it."""
+        text, tool = reply["text"], reply["tool"]
+        chunk_chars = STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+        delay = (STREAM_CHUNK_TOKENS / self.tokens_per_second) if self.tokens_per_second > 0 else 0.0
+        base = {"id": f"chatcmpl-fake-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": reply["model"]}
+        events = []
+        for i in range(0, len(text), chunk_chars):
+            piece = text[i:i + chunk_chars]
+            if tool:
+                call = {"index": 0, "function": {"arguments": piece}}
+                if i == 0:
+                    call.update({"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function"})
+                    call["function"]["name"] = tool
+                delta: Dict[str, Any] = {"tool_calls": [call]}
+            else:
+                delta = {"content": piece}
+            if i == 0:
+                delta["role"] = "assistant"
+            chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            events.append((0.0 if i == 0 else delay, f"data: {json.dumps(chunk)}\n\n".encode()))
+        done = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls" if tool else "stop"}]}
+        events.append((0.0, f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode()))
+        return events
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        latency, error, reply = self._plan(request)
+        time.sleep(latency)
+        if error is not None:
+            return error
+        if reply["stream"]:
+            def body() -> Iterator[bytes]:
+                for delay, data in self._stream_events(reply):
+                    if delay:
+                        time.sleep(delay)
+                    yield data
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+        time.sleep(self._generation_time(reply["text"]))
+        return httpx.Response(200, json=self._completion(reply))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        latency, error, reply = self._plan(request)
+        await asyncio.sleep(latency)
+        if error is not None:
+            return error
+        if reply["stream"]:
+            async def body() -> AsyncIterator[bytes]:
+                for delay, data in self._stream_events(reply):
+                    if delay:
+                        await asyncio.sleep(delay)
+                    yield data
+            return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+        await asyncio.sleep(self._generation_time(reply["text"]))
+        return httpx.Response(200, json=self._completion(reply))
+
+
+def fake_transport_from_config() -> FakeLLMTransport:
+    """Build the fake transport from the FAKE_LLM_* settings."""
+    return FakeLLMTransport(
+        latency_ms=FAKE_LLM_LATENCY_MS,
+        jitter_ms=FAKE_LLM_JITTER_MS,
+        distribution=FAKE_LLM_LATENCY_DISTRIBUTION,
+        tokens_per_second=FAKE_LLM_TOKENS_PER_SECOND,
+        rate_429=FAKE_LLM_RATE_429,
+        rate_500=FAKE_LLM_RATE_500,
+        malformed_rate=FAKE_LLM_MALFORMED_RATE,
+        retry_after=FAKE_LLM_RETRY_AFTER,
+        seed=int(FAKE_LLM_SEED) if FAKE_LLM_SEED else None
+    )
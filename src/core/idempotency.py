@@ -0,0 +1,148 @@
+"""
+Idempotent request execution: in-flight coalescing plus result replay.
+
+Clients that time out and retry (or send the same Idempotency-Key again)
+should not start another full pipeline run. Requests are identified by a
+fingerprint of everything that affects the result; while one execution is
+in flight, identical requests await the same task. Once it finishes, its
+result is stored in SQLite and replayed to retries with the same
+Idempotency-Key (scoped per user) until the TTL expires. Identical requests
+without a key are only replayed if a fingerprint TTL is configured: by
+default, a deliberate re-run once the first one finished runs again.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .cache import LLMCache, normalize_cache_text
+from .config import LLM_CACHE_PATH, IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_FINGERPRINT_TTL_SECONDS, IDEMPOTENCY_MAX_ROWS
+from .metrics import metrics
+from .models import SuperOutput
+
+logger = logging.getLogger(__name__)
+
+# Longest Idempotency-Key header value accepted
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+idempotency_requests_total = metrics.counter(
+    "resume_matcher_idempotency_requests_total",
+    "Idempotent requests by outcome (executed, coalesced, replayed, conflict).",
+    ("outcome",)
+)
+
+
+class IdempotencyConflict(Exception):
+    """An Idempotency-Key was reused with a different request."""
+
+
+class StoredResult(BaseModel):
+    """A finished result and the fingerprint of the request that produced it."""
+    fingerprint: str
+    result: Dict[str, Any]
+
+
+def request_fingerprint(resume_sha256: str, job_text: str, model: Optional[str], **options: Any) -> str:
+    """Hash the resume content, job text, model and every option that changes the result."""
+    payload = json.dumps({
+        "resume": resume_sha256,
+        "job": hashlib.sha256(normalize_cache_text(job_text).encode("utf-8")).hexdigest(),
+        "model": model,
+        "options": options
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RequestCoalescer:
+    """Runs each distinct request once, sharing in-flight work and replaying stored results."""
+
+    def __init__(self, store: LLMCache, fingerprint_ttl_seconds: int = 0):
+        self.store = store
+        # How long results of requests without an Idempotency-Key are replayed (0: never)
+        self.fingerprint_ttl_seconds = fingerprint_ttl_seconds
+        # key -> (fingerprint, task) for executions still running in this process
+        self._inflight: Dict[str, Tuple[str, "asyncio.Task"]] = {}
+
+    @staticmethod
+    def make_key(fingerprint: str, idempotency_key: Optional[str] = None, user_id: Optional[int] = None) -> str:
+        """Storage key: the client's Idempotency-Key (per user) when given, else the request fingerprint."""
+        if idempotency_key:
+            owner = "-" if user_id is None else user_id
+            return f"key:{owner}:{hashlib.sha256(idempotency_key.encode('utf-8')).hexdigest()}"
+        return f"fp:{fingerprint}"
+
+    def _ttl(self, key: str) -> Optional[int]:
+        """Storage TTL for key's result: None (the store's TTL) for Idempotency-Keys, else the fingerprint TTL (0: not stored)."""
+        return self.fingerprint_ttl_seconds if key.startswith("fp:") else None
+
+    async def _execute(self, key: str, fingerprint: str, execution: Awaitable[SuperOutput]) -> SuperOutput:
+        result = await execution
+        ttl = self._ttl(key)
+        if ttl != 0:
+            stored = StoredResult(fingerprint=fingerprint, result=result.model_dump(mode="json", exclude_unset=True))
+            await asyncio.to_thread(self.store.set, key, stored, ttl)
+        return result
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        factory: Callable[[], Awaitable[SuperOutput]]
+    ) -> Tuple[SuperOutput, str]:
+        """
+        Return (result, outcome) for a request, running factory at most once per key.
+
+        outcome is "executed" for the request that ran the pipeline,
+        "coalesced" for identical requests that awaited it and "replayed" for
+        results served from storage. The execution runs as its own task, so
+        it completes (and is stored for the next retry) even if the client
+        that started it disconnects. factory is called synchronously, right
+        before that task is created, so it can hand request-owned resources
+        (temp files, DB sessions) over to the execution. Raises
+        IdempotencyConflict when the key belongs to a request with a
+        different fingerprint.
+        """
+        inflight = self._inflight.get(key)
+        if inflight is None and self._ttl(key) != 0:
+            stored = await asyncio.to_thread(self.store.get, key, StoredResult)
+            if stored is not None:
+                self._check(stored.fingerprint, fingerprint)
+                idempotency_requests_total.inc(outcome="replayed")
+                return SuperOutput(**stored.result), "replayed"
+            # Another identical request may have started while the store was read
+            inflight = self._inflight.get(key)
+
+        if inflight is not None:
+            self._check(inflight[0], fingerprint)
+            idempotency_requests_total.inc(outcome="coalesced")
+            result = await asyncio.shield(inflight[1])
+            return result.model_copy(deep=True), "coalesced"
+
+        task = asyncio.ensure_future(self._execute(key, fingerprint, factory()))
+        self._inflight[key] = (fingerprint, task)
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        idempotency_requests_total.inc(outcome="executed")
+        return await asyncio.shield(task), "executed"
+
+    def _check(self, stored_fingerprint: str, fingerprint: str) -> None:
+        if stored_fingerprint != fingerprint:
+            idempotency_requests_total.inc(outcome="conflict")
+            raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+
+    def stats(self) -> Dict[str, Any]:
+        """Report in-flight executions and the result store counters."""
+        return {"in_flight": len(self._inflight), "store": self.store.stats()}
+
+
+# Process-wide coalescer; results share the LLM cache's SQLite file in their own table
+request_coalescer = RequestCoalescer(LLMCache(
+    LLM_CACHE_PATH,
+    memory_entries=256,
+    max_rows=IDEMPOTENCY_MAX_ROWS,
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    enabled=IDEMPOTENCY_TTL_SECONDS > 0,
+    table="request_results"
+), fingerprint_ttl_seconds=IDEMPOTENCY_FINGERPRINT_TTL_SECONDS)
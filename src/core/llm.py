@@ -0,0 +1,262 @@
+"""
+Process-wide registry of pooled LLM clients.
+
+ChatOpenAI instances are shared per (model, base_url, temperature) and every
+instance pointing at the same base_url reuses the same pooled httpx clients,
+so keep-alive connections and TLS sessions survive across requests. Async
+clients are bound to an event loop, so those pools are kept per loop.
+"""
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+
+from .config import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, LLM_PROVIDER,
+    LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_KEEPALIVE_EXPIRY,
+    LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES, LLM_SCHEDULER_ENABLED
+)
+from .fake_llm import FakeLLMTransport, fake_transport_from_config
+from .metrics import llm_http_responses_total
+from .scheduler import LLMScheduler, ScheduledTransport, scheduler_from_config
+
+logger = logging.getLogger(__name__)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """Return the running event loop, or None when called from sync code."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _pool_snapshot(client: Any) -> Dict[str, int]:
+    """Summarize the connection pool behind an httpx client."""
+    transport = getattr(client, "_transport", None)
+    pool = getattr(getattr(transport, "inner", transport), "_pool", None)
+    connections = list(getattr(pool, "connections", None) or [])
+    idle = sum(1 for c in connections if c.is_idle())
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+class _ClientPool:
+    """Pooled sync and async HTTP clients for one OpenAI-compatible endpoint."""
+    
+    def __init__(
+        self,
+        base_url: Optional[str],
+        limits: httpx.Limits,
+        timeout: httpx.Timeout,
+        max_retries: int,
+        api_key: Optional[str] = None,
+        transport: Any = None,
+        scheduler: Optional[LLMScheduler] = None
+    ):
+        self.base_url = base_url
+        self.limits = limits
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.api_key = api_key
+        self.transport = transport
+        self.scheduler = scheduler
+        self.requests = {"sync": 0, "async": 0}
+        
+        def count_sync(request: httpx.Request) -> None:
+            self.requests["sync"] += 1
+        
+        def record_sync(response: httpx.Response) -> None:
+            llm_http_responses_total.inc(status=response.status_code)
+        
+        self.http_client = httpx.Client(
+            limits=limits, timeout=timeout, transport=self._transport(httpx.HTTPTransport),
+            event_hooks={"request": [count_sync], "response": [record_sync]}
+        )
+        self.client = openai.OpenAI(
+            api_key=api_key, base_url=base_url, max_retries=max_retries, http_client=self.http_client
+        )
+        self._async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, openai.AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+    
+    def _transport(self, default_cls: Any) -> Any:
+        """The configured transport (or a pooled default), behind the scheduler when there is one."""
+        if self.scheduler is None:
+            return self.transport
+        return ScheduledTransport(self.transport or default_cls(limits=self.limits), self.scheduler)
+    
+    def async_client(self, loop: asyncio.AbstractEventLoop) -> openai.AsyncOpenAI:
+        """Return the pooled async client bound to the given event loop."""
+        entry = self._async.get(loop)
+        if entry is None:
+            async def count_async(request: httpx.Request) -> None:
+                self.requests["async"] += 1
+            
+            async def record_async(response: httpx.Response) -> None:
+                llm_http_responses_total.inc(status=response.status_code)
+            
+            http_async_client = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout, transport=self._transport(httpx.AsyncHTTPTransport),
+                event_hooks={"request": [count_async], "response": [record_async]}
+            )
+            entry = (http_async_client, openai.AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, max_retries=self.max_retries,
+                http_client=http_async_client
+            ))
+            self._async[loop] = entry
+        return entry[1]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url or "default",
+            "requests": dict(self.requests),
+            "sync_pool": _pool_snapshot(self.http_client),
+            "async_pools": [_pool_snapshot(http_async_client) for http_async_client, _ in list(self._async.values())]
+        }
+
+
+class LLMClientRegistry:
+    """Hands out shared ChatOpenAI instances backed by pooled HTTP clients."""
+    
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 120.0,
+        connect_timeout: float = 10.0,
+        max_retries: int = 2,
+        api_key: Optional[str] = None,
+        transport: Any = None,
+        scheduler: Optional[LLMScheduler] = None
+    ):
+        self.base_url = base_url
+        self.api_key = api_key
+        # A custom httpx transport (e.g. the fake LLM) replaces the network for every pool
+        self.transport = transport
+        # Shared by every pool so budgets are per model across endpoints and event loops
+        self.scheduler = scheduler
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self._pools: Dict[Optional[str], _ClientPool] = {}
+        self._models = set()
+        self._sync_llms: Dict[Tuple[str, Optional[str], float], ChatOpenAI] = {}
+        self._loop_llms: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str], float], ChatOpenAI]]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+    
+    def _pool(self, base_url: Optional[str]) -> _ClientPool:
+        pool = self._pools.get(base_url)
+        if pool is None:
+            pool = _ClientPool(
+                base_url, self.limits, self.timeout, self.max_retries,
+                api_key=self.api_key, transport=self.transport, scheduler=self.scheduler
+            )
+            self._pools[base_url] = pool
+            logger.info(f"Created LLM connection pool for {base_url or 'default endpoint'}")
+        return pool
+    
+    def get(self, model: str, temperature: float = 0.0, base_url: Optional[str] = None) -> ChatOpenAI:
+        """Return the shared chat model for (model, base_url, temperature)."""
+        base_url = base_url or self.base_url
+        key = (model, base_url, float(temperature))
+        loop = _running_loop()
+        llms = self._sync_llms if loop is None else self._loop_llms.get(loop)
+        llm = llms.get(key) if llms is not None else None
+        if llm is not None:
+            return llm
+        
+        with self._lock:
+            if loop is None:
+                llms = self._sync_llms
+            else:
+                llms = self._loop_llms.setdefault(loop, {})
+            llm = llms.get(key)
+            if llm is None:
+                pool = self._pool(base_url)
+                llm = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    client=pool.client.chat.completions,
+                    async_client=pool.async_client(loop).chat.completions if loop is not None else None,
+                    openai_api_base=base_url,
+                    openai_api_key=self.api_key,
+                    max_retries=self.max_retries
+                )
+                llms[key] = llm
+                self._models.add(key)
+        return llm
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return pool utilization for every endpoint in use."""
+        with self._lock:
+            pools = list(self._pools.values())
+            models = [{"model": m, "base_url": b or "default", "temperature": t} for (m, b, t) in sorted(self._models, key=str)]
+        stats = {
+            "provider": "fake" if isinstance(self.transport, FakeLLMTransport) else "openai",
+            "limits": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry
+            },
+            "models": models,
+            "pools": [p.stats() for p in pools]
+        }
+        if isinstance(self.transport, FakeLLMTransport):
+            stats["fake"] = self.transport.stats()
+        if self.scheduler is not None:
+            stats["scheduler"] = self.scheduler.stats()
+        return stats
+
+
+# Process-wide registry instance; LLM_PROVIDER=fake serves every call locally
+if LLM_PROVIDER == "fake":
+    logger.warning("LLM_PROVIDER=fake: LLM calls are answered locally by the fake provider")
+elif LLM_PROVIDER != "openai":
+    logger.warning(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}', using 'openai'")
+
+llm_registry = LLMClientRegistry(
+    base_url=OPENAI_BASE_URL,
+    max_connections=LLM_MAX_CONNECTIONS,
+    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    timeout=LLM_TIMEOUT,
+    connect_timeout=LLM_CONNECT_TIMEOUT,
+    max_retries=LLM_MAX_RETRIES,
+    api_key=OPENAI_API_KEY or ("fake" if LLM_PROVIDER == "fake" else None),
+    transport=fake_transport_from_config() if LLM_PROVIDER == "fake" else None,
+    scheduler=scheduler_from_config() if LLM_SCHEDULER_ENABLED else None
+)
+
+
+def get_llm(model: str, temperature: float = 0.0, base_url: Optional[str] = None) -> ChatOpenAI:
+    """Shortcut for llm_registry.get."""
+    return llm_registry.get(model, temperature=temperature, base_url=base_url)
+
+
+_sync_loop: Optional[asyncio.AbstractEventLoop] = None
+_sync_loop_lock = threading.Lock()
+
+
+def run_sync(coro: Any) -> Any:
+    """
+    Run a coroutine to completion from synchronous code.
+    
+    Async connection pools live as long as their event loop, so sync callers
+    share one long-lived background loop instead of creating a new loop (and
+    a cold pool) per call with asyncio.run.
+    """
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="llm-sync-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _sync_loop).result()
@@ -2,8 +2,10 @@
 Matching and scoring logic for resume-job compatibility.
 """
 from typing import Tuple, Dict, List
-from .models import JDStruct, CVStruct, Coverage
-from ..utils.utils import contains_skill
+from .config import RESPONSIBILITY_WEAK_COVERAGE
+from .models import JDStruct, CVStruct, Coverage, ResponsibilityEvidence
+from .evidence_index import get_evidence_index
+from .resume_index import get_resume_index
 
 
 def seniority_fit_score(jd_seniority: str, years: float) -> float:
@@ -32,7 +34,7 @@ def match_and_score(
     jd: JDStruct, 
     cv: CVStruct, 
     resume_text: str
-) -> Tuple[float, Coverage, Dict[str, List[str]], str]:
+) -> Tuple[float, Coverage, Dict[str, List[str]], str, List[ResponsibilityEvidence]]:
     """
     Match job description with CV and calculate compatibility score.
     
@@ -41,32 +43,32 @@ def match_and_score(
         - Coverage breakdown
         - Gaps analysis
         - Rationale explanation
+        - Per-responsibility coverage and best evidence line
     """
-    # Create searchable text blob
-    blob = (resume_text or "") + " " + " | ".join(cv.achievements or [])
+    # Index the resume and achievements once; every lookup below is a set membership test
+    index = get_resume_index((resume_text or "") + " " + " | ".join(cv.achievements or []))
     
     # Calculate must-have skills coverage
     must = jd.must_have_skills or []
     mh_hits, missing, matched = 0, [], []
     for s in must:
-        if s in (cv.tech_stack or []) or contains_skill(blob, s):
+        if s in (cv.tech_stack or []) or index.contains_skill(s):
             mh_hits += 1
             matched.append(s)
         else:
             missing.append(s)
     mh_cov = (mh_hits / max(1, len(must))) * 100.0
 
-    # Calculate responsibilities coverage
+    # Calculate responsibilities coverage: graded BM25 match of each responsibility
+    # against the resume's lines and achievements, averaged
     resp = jd.responsibilities or []
-    resp_hits, weak = 0, []
-    for r in resp:
-        tokens = [t for t in r.lower().split() if len(t) > 3]
-        hit = any(contains_skill(blob, t) for t in tokens)
-        if hit:
-            resp_hits += 1
-        else:
-            weak.append(r)
-    resp_cov = (resp_hits / max(1, len(resp))) * 100.0
+    found = get_evidence_index(resume_text, cv.achievements).search(resp)
+    evidence = [
+        ResponsibilityEvidence(responsibility=r, coverage=e.coverage, evidence=e.line)
+        for r, e in zip(resp, found)
+    ]
+    weak = [e.responsibility for e in evidence if e.coverage < RESPONSIBILITY_WEAK_COVERAGE]
+    resp_cov = sum(e.coverage for e in evidence) / max(1, len(resp))
 
     # Calculate seniority fit
     sen_fit = seniority_fit_score(jd.seniority, cv.years_of_experience)
@@ -87,5 +89,5 @@ def match_and_score(
         "weak_evidence_for_responsibilities": weak
     }
     
-    return round(score, 2), cov, gaps, rationale
+    return round(score, 2), cov, gaps, rationale, evidence
 
@@ -0,0 +1,211 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms live in this process and are served by
+GET /metrics, so no agent, push gateway or client library is needed: any
+Prometheus-compatible scraper (or curl) can read them. With several worker
+processes each worker reports its own series.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds) covering both sub-millisecond local stages and long LLM calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+# Upload size buckets (bytes) from 1KB to the 10MB upload limit
+SIZE_BUCKETS = (1024, 10240, 51200, 102400, 262144, 524288, 1048576, 2097152, 5242880, 10485760)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base class: a named family of series keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(self._series.items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts plus sum and count of observations."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series["counts"]) if series else 0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                le = (("le", _format_value(bound) if bound == float("inf") else repr(float(bound))),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them for GET /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_requests_total = metrics.counter(
+    "resume_matcher_http_requests_total", "HTTP requests by route, method and status code.", ("route", "method", "status")
+)
+http_request_seconds = metrics.histogram(
+    "resume_matcher_http_request_duration_seconds", "HTTP request duration including streamed bodies.", ("route", "method")
+)
+http_in_flight = metrics.gauge(
+    "resume_matcher_http_requests_in_flight", "HTTP requests currently being processed.", ("route",)
+)
+stage_seconds = metrics.histogram(
+    "resume_matcher_stage_duration_seconds", "Pipeline stage wall time.", ("stage", "model")
+)
+llm_errors_total = metrics.counter(
+    "resume_matcher_llm_errors_total", "LLM pipeline stages that raised, by exception type.", ("stage", "model", "error")
+)
+llm_http_responses_total = metrics.counter(
+    "resume_matcher_llm_http_responses_total", "HTTP responses from the LLM provider, retries included.", ("status",)
+)
+upload_size_bytes = metrics.histogram(
+    "resume_matcher_upload_size_bytes", "Size of uploaded resume files.", ("file_type",), buckets=SIZE_BUCKETS
+)
+
+
+@contextmanager
+def track_stage(meta: Optional[Dict[str, Any]], stage: str, model: Optional[str] = None) -> Iterator[None]:
+    """
+    Time a pipeline stage into meta["timings"][stage] (milliseconds) and the stage histogram.
+
+    model labels LLM stages; local stages use "none". Exceptions raised by
+    an LLM stage are counted in llm_errors_total before propagating.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if model:
+            llm_errors_total.inc(stage=stage, model=model, error=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if meta is not None:
+            meta.setdefault("timings", {})[stage] = round(elapsed * 1000.0, 2)
+        stage_seconds.observe(elapsed, stage=stage, model=model or "none")
+
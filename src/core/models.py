@@ -2,7 +2,7 @@
 Pydantic models for the resume-job matcher application.
 """
 from typing import List, Dict, Optional, Any, Union
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, PrivateAttr, validator
 
 
 class JDStruct(BaseModel):
@@ -42,6 +42,12 @@ class CVStruct(BaseModel):
         return v
 
 
+class JDCVStruct(BaseModel):
+    """Job description and CV extracted together in a single LLM call."""
+    jd: JDStruct = Field(..., description="Structured job description")
+    cv: CVStruct = Field(..., description="Structured candidate profile")
+
+
 class Coverage(BaseModel):
     """Coverage metrics for matching."""
     must_have: float = Field(0.0, ge=0.0, le=100.0, description="Must-have skills coverage percentage")
@@ -49,6 +55,13 @@ class Coverage(BaseModel):
     seniority_fit: float = Field(0.0, ge=0.0, le=100.0, description="Seniority fit percentage")
 
 
+class ResponsibilityEvidence(BaseModel):
+    """How well the resume supports one job responsibility."""
+    responsibility: str = Field(..., description="Responsibility from the job description")
+    coverage: float = Field(0.0, ge=0.0, le=100.0, description="Graded coverage percentage (IDF-weighted share of the responsibility's terms in the best line)")
+    evidence: str = Field("", description="Best-matching resume line or achievement, empty when nothing matched")
+
+
 class TailoredResumeStruct(BaseModel):
     """Structured tailored resume for dynamic frontend rendering."""
     contact_info: Dict[str, str] = Field(default_factory=dict, description="Contact information (name, email, phone, location, linkedin)")
@@ -75,17 +88,38 @@ class TailoredOutput(BaseModel):
     recommendations: List[str] = Field(default_factory=list, description="Actionable improvement suggestions")
 
 
+class ParsedInputs(BaseModel):
+    """Extraction results a match was scored from, kept so it can be re-scored without the LLM."""
+    resume_text: str = Field(..., description="Cleaned resume text the CV was parsed from")
+    jd: JDStruct = Field(..., description="Structured job description")
+    cv: CVStruct = Field(..., description="Structured candidate profile")
+
+
 class SuperOutput(BaseModel):
     """Main output structure for the matching pipeline."""
     score: float = Field(..., ge=0.0, le=100.0, description="Overall compatibility score (0-100)")
     coverage: Coverage = Field(..., description="Detailed coverage breakdown")
     gaps: Dict[str, List[str]] = Field(..., description="Analysis of gaps and matches")
     rationale: str = Field(..., description="Explanation of the compatibility score")
-    tailored_resume_text: str = Field(..., description="AI-generated tailored resume")
+    responsibility_evidence: List[ResponsibilityEvidence] = Field(default_factory=list, description="Per-responsibility coverage and best evidence line")
+    tailored_resume_text: str = Field("", description="AI-generated tailored resume")
     structured_resume: Optional[TailoredResumeStruct] = Field(None, description="Structured resume data for dynamic frontend rendering")
     recommendations: List[str] = Field(default_factory=list, description="Actionable improvement suggestions")
     flags: List[str] = Field(default_factory=list, description="Warning flags for potential issues")
     meta: Dict[str, Any] = Field(default_factory=dict, description="Metadata about the processing")
+    
+    # Set by the pipeline; not part of the response, stored with the history entry
+    _inputs: Optional[ParsedInputs] = PrivateAttr(default=None)
+    
+    @property
+    def parsed_inputs(self) -> Optional[ParsedInputs]:
+        """The parsed job description, CV and resume text this result was computed from."""
+        return self._inputs
+    
+    def with_inputs(self, inputs: ParsedInputs) -> "SuperOutput":
+        """Attach the parsed inputs and return self."""
+        self._inputs = inputs
+        return self
 
 
 class MatchRequest(BaseModel):
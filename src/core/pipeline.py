@@ -1,103 +1,613 @@
 """
 Main pipeline orchestrating the resume-job matching process.
 """
-from typing import Optional
-from .models import SuperOutput, EnhancedSuperOutput, ATSValidationResult
-from ..utils.utils import normalize_inputs, validate_education_extraction, safety_scan
-from ..parsers.parsers import parse_jd, parse_cv
+import asyncio
+import heapq
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from .models import SuperOutput, EnhancedSuperOutput, ATSValidationResult, JDStruct, CVStruct, ParsedInputs
+from ..utils.utils import (
+    normalize_inputs, validate_education_extraction, safety_scan, clean_text, load_text_from_bytes
+)
+from ..parsers.parsers import aparse_jd, aparse_cv, aparse_jd_cv
+from ..parsers.fast import fast_parse_jd, fast_parse_cv
 from .matcher import match_and_score
-from .tailor import tailor_resume
+from .tailor import atailor_resume, astream_tailor_resume
 from ..validators.ats_validator import validate_ats_compliance
+from .llm import run_sync
+from .metrics import track_stage, stage_seconds
+from .routing import ModelRoutes, model_routes, call_with_fallback, stream_with_fallback
+from .config import BATCH_MAX_CONCURRENCY, RANK_MAX_CONCURRENCY, RANK_DEFAULT_TOP_K
 
+logger = logging.getLogger(__name__)
 
-def run_pipeline(
+
+# Output fields that can only be filled by running the tailoring LLM call
+# (flags come from the safety and ATS checks on the tailored text)
+TAILORING_FIELDS = {"tailored_resume_text", "structured_resume", "recommendations", "flags"}
+
+# How the job description and CV are extracted:
+# "standard" runs the JD and CV prompts concurrently, "combined" extracts both in one call,
+# "fast" uses the rule-based extractor (no LLM call)
+EXTRACTION_MODES = ("standard", "combined", "fast")
+
+# Shorthands accepted by parse_fields
+FIELD_PRESETS = {
+    "all": set(SuperOutput.model_fields),
+    "score": {"score", "coverage", "gaps", "rationale", "responsibility_evidence"},
+}
+
+
+def needs_llm(mode: str, fields: Optional[Iterable[str]]) -> bool:
+    """Whether a request in this mode, asking for these fields, makes any LLM call."""
+    if mode != "fast":
+        return True
+    return fields is None or bool(set(fields) & TAILORING_FIELDS)
+
+
+async def _parse_jd(job_text: str, routes: ModelRoutes, mode: str, meta: Optional[Dict[str, Any]] = None) -> JDStruct:
+    """Parse one job description with the routed LLM, or locally in fast mode, timing it into meta."""
+    if mode == "fast":
+        with track_stage(meta, "parse_jd"):
+            return fast_parse_jd(job_text)
+    return await call_with_fallback(routes, "parse_jd", meta, lambda model: aparse_jd(job_text, model=model))
+
+
+async def _parse_cv(resume_text: str, routes: ModelRoutes, mode: str, meta: Optional[Dict[str, Any]] = None) -> CVStruct:
+    """Parse one resume with the routed LLM, or locally in fast mode, timing it into meta."""
+    if mode == "fast":
+        with track_stage(meta, "parse_cv"):
+            return fast_parse_cv(resume_text)
+    return await call_with_fallback(routes, "parse_cv", meta, lambda model: aparse_cv(resume_text, model=model))
+
+
+async def _extract(
+    resume_text: Optional[str],
+    job_text: Optional[str],
+    resume_file_path: Optional[str],
+    job_file_path: Optional[str]
+) -> Tuple[str, str, Dict[str, Any]]:
+    """Run normalize_inputs off the event loop (file extraction is blocking), timed as "extract"."""
+    timed: Dict[str, Any] = {}
+    with track_stage(timed, "extract"):
+        r_text, j_text, meta = await asyncio.to_thread(
+            normalize_inputs, resume_text, job_text, resume_file_path, job_file_path
+        )
+    meta.update(timed)
+    return r_text, j_text, meta
+
+
+def _job_meta(meta: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+    """Copy shared meta for one job/candidate so their timings and models do not overwrite each other."""
+    copied = {**meta, "timings": dict(meta.get("timings", {})), **extra}
+    if "models" in meta:
+        copied["models"] = dict(meta["models"])
+    return copied
+
+
+def parse_fields(raw: Optional[str]) -> Optional[Set[str]]:
+    """
+    Parse a comma-separated list of SuperOutput fields or presets.
+    
+    Returns None (meaning every field) for an empty value and raises
+    ValueError on unknown names.
+    """
+    if not raw or not raw.strip():
+        return None
+    
+    fields: Set[str] = set()
+    for name in (n.strip() for n in raw.split(",")):
+        if not name:
+            continue
+        if name in FIELD_PRESETS:
+            fields |= FIELD_PRESETS[name]
+        elif name in SuperOutput.model_fields:
+            fields.add(name)
+        else:
+            valid = sorted(set(FIELD_PRESETS) | set(SuperOutput.model_fields))
+            raise ValueError(f"Unknown field '{name}'. Valid values: {', '.join(valid)}")
+    return fields
+
+
+def _run_ats_validation(jd: JDStruct, tailored_resume_text: str, flags: List[str]) -> Optional[ATSValidationResult]:
+    """Validate the tailored resume for ATS compliance, appending issues to flags."""
+    try:
+        # Extract keywords from job description for ATS validation
+        job_keywords = []
+        if jd.must_have_skills:
+            job_keywords.extend(jd.must_have_skills)
+        if jd.nice_to_have_skills:
+            job_keywords.extend(jd.nice_to_have_skills)
+        if jd.keywords:
+            job_keywords.extend(jd.keywords)
+        
+        ats_result = validate_ats_compliance(tailored_resume_text, job_keywords)
+        ats_validation = ATSValidationResult(
+            compliance_level=ats_result.compliance_level.value,
+            score=ats_result.score,
+            issues=ats_result.issues,
+            recommendations=ats_result.recommendations,
+            keyword_density=ats_result.keyword_density,
+            structure_score=ats_result.structure_score,
+            formatting_score=ats_result.formatting_score
+        )
+        
+        # Add ATS issues to flags if compliance is poor
+        if ats_result.compliance_level.value in ["fair", "poor"]:
+            flags.extend([f"ats_issue: {issue}" for issue in ats_result.issues[:3]])  # Limit to top 3 issues
+        
+        return ats_validation
+    except Exception as e:
+        flags.append(f"ats_validation_error: {str(e)}")
+        return None
+
+
+async def _score_and_tailor(
+    jd: JDStruct,
+    cv: CVStruct,
+    r_text: str,
+    meta: Dict[str, Any],
+    routes: ModelRoutes,
+    include_ats_validation: bool,
+    fields: Optional[Iterable[str]],
+    stream_sections: bool = False,
+    started: Optional[float] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the stages after extraction (steps 4-10), yielding them like stream_pipeline.
+    
+    Each stage's wall time is recorded in meta["timings"] and the model
+    that tailored in meta["models"]; when started (a time.perf_counter()
+    value) is given, the end-to-end time is stored as "total".
+    """
+    wanted = set(SuperOutput.model_fields) if fields is None else set(fields)
+    run_tailoring = bool(wanted & TAILORING_FIELDS)
+    run_checks = "flags" in wanted
+    
+    # Step 4: Validate education extraction
+    with track_stage(meta, "validate_education"):
+        education_flags = validate_education_extraction(cv.education, r_text)
+    
+    # Step 5: Match and score
+    with track_stage(meta, "match_and_score"):
+        score, cov, gaps, rationale, evidence = match_and_score(jd, cv, r_text)
+    yield "scored", {
+        "score": score, "coverage": cov.model_dump(), "gaps": gaps, "rationale": rationale,
+        "responsibility_evidence": [e.model_dump() for e in evidence]
+    }
+    
+    skipped = []
+    output: Dict[str, Any] = {
+        "score": score, "coverage": cov, "gaps": gaps, "rationale": rationale,
+        "responsibility_evidence": evidence, "meta": meta
+    }
+    
+    # Step 6: Generate tailored resume
+    if run_tailoring and stream_sections:
+        async for kind, payload in stream_with_fallback(
+            routes, "tailor", meta,
+            lambda model: astream_tailor_resume(r_text, jd, cv, score, cov.dict(), gaps, model=model, meta=meta)
+        ):
+            if kind == "section":
+                yield "tailored_section", payload
+            else:
+                tailored = payload
+    elif run_tailoring:
+        tailored = await call_with_fallback(
+            routes, "tailor", meta,
+            lambda model: atailor_resume(r_text, jd, cv, score, cov.dict(), gaps, model=model, meta=meta)
+        )
+    if run_tailoring:
+        yield "tailored", tailored.model_dump()
+        for name in ("tailored_resume_text", "structured_resume", "recommendations"):
+            if name in wanted:
+                output[name] = getattr(tailored, name)
+    else:
+        skipped.append("tailor")
+    
+    if run_checks:
+        # Step 7: Safety checks
+        with track_stage(meta, "safety_scan"):
+            flags = safety_scan(tailored.tailored_resume_text, r_text)
+        
+        # Step 8: Add education flags
+        flags.extend(education_flags)
+        yield "safety", {"flags": list(flags)}
+        
+        # Step 9: ATS validation (optional)
+        if include_ats_validation:
+            with track_stage(meta, "ats_validation"):
+                ats_validation = _run_ats_validation(jd, tailored.tailored_resume_text, flags)
+            yield "ats", {
+                "ats_validation": ats_validation.model_dump() if ats_validation else None,
+                "flags": list(flags)
+            }
+        else:
+            skipped.append("ats")
+        output["flags"] = flags
+    else:
+        skipped.extend(["safety", "ats"])
+    
+    if skipped:
+        meta["skipped_stages"] = skipped
+    
+    if started is not None:
+        total = time.perf_counter() - started
+        meta.setdefault("timings", {})["total"] = round(total * 1000.0, 2)
+        # Labelled with the tailoring model, which dominates the end-to-end time
+        stage_seconds.observe(total, stage="total", model=meta.get("models", {}).get("tailor", "none"))
+    
+    # Step 10: Return final result (only the computed fields are set)
+    result = SuperOutput(**output).with_inputs(ParsedInputs(resume_text=r_text, jd=jd, cv=cv))
+    yield "result", result
+
+
+async def stream_pipeline(
     resume_text: Optional[str],
     job_text: Optional[str],
     resume_file_path: Optional[str],
     job_file_path: Optional[str],
-    model: str,
-    include_ats_validation: bool = True
+    model: Optional[str] = None,
+    include_ats_validation: bool = True,
+    fields: Optional[Iterable[str]] = None,
+    mode: str = "standard",
+    stream_sections: bool = False,
+    models: Optional[Dict[str, str]] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Run the matching pipeline, yielding (stage, payload) as each stage completes.
+    
+    Stages, in order: "extracted", "jd_parsed" / "cv_parsed" (whichever LLM
+    call finishes first), "scored", "tailored", "safety", "ats" (when
+    enabled) and finally "result", whose payload is the SuperOutput itself;
+    every other payload is a JSON-serializable dict.
+    
+    When fields is given, stages whose outputs were not requested are skipped
+    and the result only has those fields set (score, coverage, gaps,
+    rationale and meta are always present).
+    
+    mode selects the extraction strategy (see EXTRACTION_MODES); in
+    "combined" mode one LLM call returns both structs and in "fast" mode
+    they are extracted locally, so "jd_parsed" and "cv_parsed" are yielded
+    back to back.
+    
+    With stream_sections, the tailoring call is streamed and a
+    "tailored_section" stage ({"section", "path", "data"}) is yielded as soon
+    as each part of the tailored resume is complete, before "tailored".
+    
+    The wall time of every stage (extract, parse_jd, parse_cv or
+    parse_jd_cv, validate_education, match_and_score, tailor, safety_scan,
+    ats_validation and total) is recorded in milliseconds in
+    meta["timings"] and in the stage duration metrics.
+    
+    Each LLM stage uses the model from the routing table (see routing.py);
+    model pins every stage to one model and models (stage -> model)
+    overrides single stages. The model that answered each LLM stage is
+    recorded in meta["models"].
+    """
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode: {mode}")
+    started = time.perf_counter()
+    routes = model_routes.override(model, models)
+    
+    # Step 1: Normalize inputs
+    r_text, j_text, meta = await _extract(resume_text, job_text, resume_file_path, job_file_path)
+    meta["extraction_mode"] = mode
+    yield "extracted", {**meta, "resume_chars": len(r_text), "job_chars": len(j_text)}
+    
+    if mode in ("combined", "fast"):
+        # Steps 2-3: Parse job description and CV with a single LLM call, or without any
+        if mode == "combined":
+            jd, cv = await call_with_fallback(
+                routes, "parse_jd_cv", meta, lambda model: aparse_jd_cv(j_text, r_text, model=model)
+            )
+        else:
+            jd, cv = await _parse_jd(j_text, routes, mode, meta), await _parse_cv(r_text, routes, mode, meta)
+        yield "jd_parsed", jd.model_dump()
+        yield "cv_parsed", cv.model_dump()
+    else:
+        # Steps 2-3: Parse job description and CV concurrently
+        jd_task = asyncio.ensure_future(_parse_jd(j_text, routes, mode, meta))
+        cv_task = asyncio.ensure_future(_parse_cv(r_text, routes, mode, meta))
+        try:
+            pending = {jd_task, cv_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (t for t in (jd_task, cv_task) if t in done):
+                    parsed = task.result()
+                    yield ("jd_parsed" if task is jd_task else "cv_parsed"), parsed.model_dump()
+        finally:
+            for task in (jd_task, cv_task):
+                task.cancel()
+        jd, cv = jd_task.result(), cv_task.result()
+    
+    async for stage, payload in _score_and_tailor(
+        jd, cv, r_text, meta, routes, include_ats_validation, fields, stream_sections, started
+    ):
+        yield stage, payload
+
+
+async def run_pipeline_async(
+    resume_text: Optional[str],
+    job_text: Optional[str],
+    resume_file_path: Optional[str],
+    job_file_path: Optional[str],
+    model: Optional[str] = None,
+    include_ats_validation: bool = True,
+    fields: Optional[Iterable[str]] = None,
+    mode: str = "standard",
+    models: Optional[Dict[str, str]] = None
 ) -> SuperOutput:
     """
     Run the complete resume-job matching pipeline.
     
+    The job description and the CV are parsed concurrently since the two
+    LLM calls do not depend on each other.
+    
     Args:
         resume_text: Raw resume text
         job_text: Raw job description text
         resume_file_path: Path to resume file
         job_file_path: Path to job description file
-        model: OpenAI model to use
+        model: OpenAI model for every LLM stage (None follows the routing table)
+        include_ats_validation: Whether to run ATS validation on the tailored resume
+        fields: SuperOutput fields to compute (None for all); unrequested
+            stages are skipped
+        mode: Extraction strategy, "standard" (two concurrent calls),
+            "combined" (one call for both) or "fast" (rule-based, no LLM)
+        models: Per-stage model overrides (stage -> model)
         
     Returns:
         SuperOutput with matching results and tailored resume
     """
-    # Step 1: Normalize inputs
-    r_text, j_text, meta = normalize_inputs(
-        resume_text, job_text, resume_file_path, job_file_path
-    )
+    result = None
+    async for stage, payload in stream_pipeline(
+        resume_text, job_text, resume_file_path, job_file_path, model,
+        include_ats_validation=include_ats_validation, fields=fields, mode=mode, models=models
+    ):
+        if stage == "result":
+            result = payload
+    return result
+
+
+async def stream_batch_pipeline(
+    resume_text: Optional[str],
+    resume_file_path: Optional[str],
+    job_texts: List[str],
+    model: Optional[str] = None,
+    include_ats_validation: bool = True,
+    fields: Optional[Iterable[str]] = None,
+    max_concurrency: int = BATCH_MAX_CONCURRENCY,
+    mode: str = "standard",
+    models: Optional[Dict[str, str]] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Match one resume against many job descriptions.
     
-    # Step 2: Parse job description
-    jd = parse_jd(j_text, model=model)
+    The resume is extracted and parsed once; each job is then parsed, scored
+    (and tailored, depending on fields) with at most max_concurrency jobs in
+    flight. Yields "cv_parsed" once, then one "result" ({"index", "result"})
+    or "error" ({"index", "detail"}) per job in completion order.
     
-    # Step 3: Parse CV
-    cv = parse_cv(r_text, model=model)
+    In "fast" mode the resume and jobs are parsed locally; "combined" has no
+    effect here since the resume is only parsed once anyway. model and
+    models override the routing table as in stream_pipeline.
+    """
+    routes = model_routes.override(model, models)
+    r_text, _, meta = await _extract(resume_text, None, resume_file_path, None)
+    meta["extraction_mode"] = mode
+    cv = await _parse_cv(r_text, routes, mode, meta)
+    yield "cv_parsed", {**meta, "cv": cv.model_dump()}
     
-    # Step 4: Validate education extraction
-    education_flags = validate_education_extraction(cv.education, r_text)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
     
-    # Step 5: Match and score
-    score, cov, gaps, rationale = match_and_score(jd, cv, r_text)
+    async def run_job(index: int, job_text: str) -> Tuple[str, Dict[str, Any]]:
+        async with semaphore:
+            try:
+                started = time.perf_counter()
+                job_meta = _job_meta(meta, job_index=index)
+                jd = await _parse_jd(clean_text(job_text or ""), routes, mode, job_meta)
+                result = None
+                async for stage, payload in _score_and_tailor(
+                    jd, cv, r_text, job_meta, routes, include_ats_validation, fields, started=started
+                ):
+                    if stage == "result":
+                        result = payload
+                return "result", {"index": index, "result": result}
+            except Exception as e:
+                logger.error(f"Batch job {index} failed: {e}")
+                return "error", {"index": index, "detail": str(e)}
     
-    # Step 6: Generate tailored resume
-    tailored = tailor_resume(r_text, jd, cv, score, cov.dict(), gaps, model=model)
+    tasks = [asyncio.ensure_future(run_job(i, text)) for i, text in enumerate(job_texts)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def stream_rank_pipeline(
+    job_text: str,
+    resumes: AsyncIterator[Tuple[str, bytes]],
+    model: Optional[str] = None,
+    top_k: int = RANK_DEFAULT_TOP_K,
+    include_ats_validation: bool = True,
+    fields: Optional[Iterable[str]] = None,
+    max_concurrency: int = RANK_MAX_CONCURRENCY,
+    mode: str = "standard",
+    models: Optional[Dict[str, str]] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Rank many resumes against one job description.
     
-    # Step 7: Safety checks
-    flags = safety_scan(tailored.tailored_resume_text, r_text)
+    The job description is parsed once. Resumes are pulled lazily from the
+    (name, file bytes) iterator through a bounded queue and extracted, parsed
+    and scored by max_concurrency workers; only the best top_k are kept in a
+    min-heap, so memory stays flat however many resumes are streamed in.
+    Tailoring and ATS work (per fields) only run for those top_k.
     
-    # Step 8: Add education flags
-    flags.extend(education_flags)
+    Yields "jd_parsed", one "scored" ({"name", "score"}) or "error"
+    ({"name", "detail"}) per resume, then "ranking" with the ordered
+    candidates ({"rank", "name", "result"}, result being a SuperOutput).
     
-    # Step 9: ATS validation (optional)
-    ats_validation = None
-    if include_ats_validation:
+    In "fast" mode the job and every resume are parsed locally, which makes
+    pre-screening large piles of resumes LLM-free (unless top candidates
+    are tailored); "combined" behaves like "standard". model and models
+    override the routing table as in stream_pipeline.
+    """
+    routes = model_routes.override(model, models)
+    jd_meta: Dict[str, Any] = {}
+    jd = await _parse_jd(clean_text(job_text or ""), routes, mode, jd_meta)
+    yield "jd_parsed", jd.model_dump()
+    
+    top_k = max(1, top_k)
+    workers = max(1, max_concurrency)
+    inbox: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+    outbox: asyncio.Queue = asyncio.Queue()
+    # (score, -seq, name, resume_text, cv, meta); -seq makes earlier uploads win ties
+    heap: List[Tuple[float, int, str, str, CVStruct, Dict[str, Any]]] = []
+    
+    async def produce() -> None:
         try:
-            # Extract keywords from job description for ATS validation
-            job_keywords = []
-            if jd.must_have_skills:
-                job_keywords.extend(jd.must_have_skills)
-            if jd.nice_to_have_skills:
-                job_keywords.extend(jd.nice_to_have_skills)
-            if jd.keywords:
-                job_keywords.extend(jd.keywords)
-            
-            ats_result = validate_ats_compliance(tailored.tailored_resume_text, job_keywords)
-            ats_validation = ATSValidationResult(
-                compliance_level=ats_result.compliance_level.value,
-                score=ats_result.score,
-                issues=ats_result.issues,
-                recommendations=ats_result.recommendations,
-                keyword_density=ats_result.keyword_density,
-                structure_score=ats_result.structure_score,
-                formatting_score=ats_result.formatting_score
-            )
-            
-            # Add ATS issues to flags if compliance is poor
-            if ats_result.compliance_level.value in ["fair", "poor"]:
-                flags.extend([f"ats_issue: {issue}" for issue in ats_result.issues[:3]])  # Limit to top 3 issues
-                
-        except Exception as e:
-            flags.append(f"ats_validation_error: {str(e)}")
-    
-    # Step 10: Return final result
-    return SuperOutput(
-        score=score,
-        coverage=cov,
-        gaps=gaps,
-        rationale=rationale,
-        tailored_resume_text=tailored.tailored_resume_text,
-        structured_resume=tailored.structured_resume,
-        recommendations=tailored.recommendations,
-        flags=flags,
-        meta=meta
-    )
+            seq = 0
+            async for name, data in resumes:
+                await inbox.put((seq, name, data))
+                seq += 1
+        finally:
+            for _ in range(workers):
+                await inbox.put(None)
+    
+    async def work() -> None:
+        while True:
+            item = await inbox.get()
+            if item is None:
+                break
+            seq, name, data = item
+            try:
+                loaded: Dict[str, Any] = {}
+                with track_stage(loaded, "load"):
+                    raw = await asyncio.to_thread(load_text_from_bytes, data, name)
+                r_text, _, meta = await _extract(raw, None, None, None)
+                if not r_text:
+                    raise ValueError("no text could be extracted")
+                meta["timings"] = {**jd_meta.get("timings", {}), **loaded["timings"], **meta["timings"]}
+                if "models" in jd_meta:
+                    meta["models"] = dict(jd_meta["models"])
+                meta.update(resume_name=name, extraction_mode=mode)
+                cv = await _parse_cv(r_text, routes, mode, meta)
+                with track_stage(meta, "prescore"):
+                    score, *_ = match_and_score(jd, cv, r_text)
+                entry = (score, -seq, name, r_text, cv, meta)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif entry[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, entry)
+                await outbox.put(("scored", {"name": name, "score": score}))
+            except Exception as e:
+                logger.warning(f"Ranking failed for resume {name}: {e}")
+                await outbox.put(("error", {"name": name, "detail": str(e)}))
+        await outbox.put(None)
+    
+    producer = asyncio.ensure_future(produce())
+    tasks = [asyncio.ensure_future(work()) for _ in range(workers)]
+    try:
+        running = workers
+        while running:
+            event = await outbox.get()
+            if event is None:
+                running -= 1
+            else:
+                yield event
+        await producer
+    finally:
+        for task in [producer, *tasks]:
+            task.cancel()
+    
+    # Only the top_k candidates get the expensive stages
+    top = sorted(heap, reverse=True)
+    semaphore = asyncio.Semaphore(workers)
+    
+    async def finish(entry: Tuple[float, int, str, str, CVStruct, Dict[str, Any]]) -> SuperOutput:
+        _, _, _, r_text, cv, meta = entry
+        async with semaphore:
+            result = None
+            async for stage, payload in _score_and_tailor(
+                jd, cv, r_text, meta, routes, include_ats_validation, fields
+            ):
+                if stage == "result":
+                    result = payload
+            return result
+    
+    results = await asyncio.gather(*(finish(entry) for entry in top))
+    yield "ranking", [
+        {"rank": rank, "name": entry[2], "result": result}
+        for rank, (entry, result) in enumerate(zip(top, results), start=1)
+    ]
+
+
+def rescore(
+    inputs: ParsedInputs,
+    tailored_resume_text: str = "",
+    include_ats_validation: bool = True
+) -> Tuple[SuperOutput, Optional[ATSValidationResult]]:
+    """
+    Re-run the local stages (steps 4-9) on stored parsed inputs, without any LLM call.
+    
+    Scoring uses inputs.jd and inputs.cv as given, so edited structs are
+    scored directly. The safety scan and ATS validation need a tailored
+    resume and only run when tailored_resume_text is non-empty; otherwise
+    they are listed in meta["skipped_stages"].
+    
+    Returns:
+        - The re-scored output
+        - The ATS validation result, or None when it did not run or failed
+    """
+    started = time.perf_counter()
+    jd, cv, r_text = inputs.jd, inputs.cv, inputs.resume_text
+    meta: Dict[str, Any] = {"timings": {}}
+    
+    with track_stage(meta, "validate_education"):
+        education_flags = validate_education_extraction(cv.education, r_text)
+    with track_stage(meta, "match_and_score"):
+        score, cov, gaps, rationale, evidence = match_and_score(jd, cv, r_text)
+    output: Dict[str, Any] = {
+        "score": score, "coverage": cov, "gaps": gaps, "rationale": rationale,
+        "responsibility_evidence": evidence, "meta": meta
+    }
+    ats_validation = None
+    
+    if tailored_resume_text:
+        with track_stage(meta, "safety_scan"):
+            flags = safety_scan(tailored_resume_text, r_text)
+        flags.extend(education_flags)
+        if include_ats_validation:
+            with track_stage(meta, "ats_validation"):
+                ats_validation = _run_ats_validation(jd, tailored_resume_text, flags)
+        else:
+            meta["skipped_stages"] = ["ats"]
+        output["flags"] = flags
+    else:
+        meta["skipped_stages"] = ["safety", "ats"]
+    
+    meta["timings"]["total"] = round((time.perf_counter() - started) * 1000.0, 2)
+    return SuperOutput(**output).with_inputs(inputs), ats_validation
 
+
+def run_pipeline(
+    resume_text: Optional[str],
+    job_text: Optional[str],
+    resume_file_path: Optional[str],
+    job_file_path: Optional[str],
+    model: Optional[str] = None,
+    include_ats_validation: bool = True,
+    fields: Optional[Iterable[str]] = None,
+    mode: str = "standard",
+    models: Optional[Dict[str, str]] = None
+) -> SuperOutput:
+    """Synchronous wrapper around run_pipeline_async for scripts and workers."""
+    return run_sync(run_pipeline_async(
+        resume_text, job_text, resume_file_path, job_file_path, model,
+        include_ats_validation=include_ats_validation, fields=fields, mode=mode, models=models
+    ))
@@ -0,0 +1,253 @@
+"""
+Token accounting and compaction for LLM prompt sections.
+
+Token counts use tiktoken when its encoding is available and fall back to a
+~4 characters per token estimate otherwise (e.g. offline, where tiktoken
+cannot download its encoding files).
+
+Loading an encoding may download it, so it never happens on the caller's
+thread: the API loads the encodings of its routed models at startup in a
+worker thread (load_encodings), and an encoding first needed later is
+loaded in a background thread while counts are estimated.
+"""
+import json
+import logging
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Set, Tuple, Type, get_args
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken ships with langchain-openai
+    tiktoken = None
+
+# Rough average for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "\n[...truncated]"
+
+
+# Encoding name -> loaded encoding, or None when it could not be loaded
+_encodings: Dict[str, Any] = {}
+# Encodings being loaded in the background
+_loading: Set[str] = set()
+_loading_lock = threading.Lock()
+
+
+@lru_cache(maxsize=64)
+def _encoding_name(model: str) -> str:
+    try:
+        return tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        return "cl100k_base"
+
+
+def _load_encoding(name: str) -> None:
+    """Load one encoding (blocking, may download it) and record the outcome."""
+    try:
+        _encodings[name] = tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"tiktoken encoding {name} unavailable, estimating tokens: {e}")
+        _encodings[name] = None
+    finally:
+        with _loading_lock:
+            _loading.discard(name)
+
+
+def load_encodings(models: Iterable[str]) -> None:
+    """Load the encodings of these models, blocking; call it off the event loop."""
+    if tiktoken is None:
+        return
+    for name in {_encoding_name(model) for model in models}:
+        with _loading_lock:
+            if name in _encodings or name in _loading:
+                continue
+            _loading.add(name)
+        _load_encoding(name)
+
+
+def _encoding(model: str):
+    """
+    Return the tiktoken encoding for a model, or None (estimate) while it is unavailable.
+
+    Never blocks: an encoding that was not loaded yet starts loading in a
+    background thread and the caller estimates meanwhile.
+    """
+    if tiktoken is None:
+        return None
+    name = _encoding_name(model)
+    if name in _encodings:
+        return _encodings[name]
+    with _loading_lock:
+        if name not in _loading:
+            _loading.add(name)
+            threading.Thread(target=_load_encoding, args=(name,), name=f"tiktoken-{name}", daemon=True).start()
+    return None
+
+
+def has_encoding(model: str) -> bool:
+    """Whether token counts for model are exact (its encoding is loaded) rather than estimated."""
+    return _encoding(model) is not None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count the tokens in text for the given model."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Cut text to at most max_tokens tokens (marker included), keeping the beginning."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    keep = max(0, max_tokens - count_tokens(TRUNCATION_MARKER, model))
+    encoding = _encoding(model)
+    if encoding is None:
+        head = text[:keep * CHARS_PER_TOKEN]
+    else:
+        head = encoding.decode(encoding.encode(text, disallowed_special=())[:keep])
+    return head.rstrip() + TRUNCATION_MARKER
+
+
+def strip_empty(value: Any) -> Any:
+    """Recursively drop None, empty strings and empty containers."""
+    if isinstance(value, dict):
+        stripped = {k: strip_empty(v) for k, v in value.items()}
+        return {k: v for k, v in stripped.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        stripped = [strip_empty(v) for v in value]
+        return [v for v in stripped if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _squash(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip().casefold()
+
+
+def dedupe_against_text(value: Dict[str, Any], text: str, fields: Iterable[str], min_chars: int = 20) -> Dict[str, Any]:
+    """
+    Drop list items of the given fields that already appear verbatim in text.
+    
+    Only items of at least min_chars are considered, so short normalized
+    terms (skills, degrees) stay in the struct as useful signals.
+    """
+    haystack = _squash(text)
+    out = dict(value)
+    for field in fields:
+        items = out.get(field)
+        if isinstance(items, list):
+            out[field] = [
+                item for item in items
+                if not (isinstance(item, str) and len(item) >= min_chars and _squash(item) in haystack)
+            ]
+    return out
+
+
+def compact_json(value: Any) -> str:
+    """Serialize a value as JSON without insignificant whitespace."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def strip_schema(schema: Any) -> Any:
+    """
+    Remove titles, defaults and model docstrings from a JSON schema, keeping field descriptions.
+
+    Keys of a "properties" map are field names, not schema keywords, so they
+    are always kept (a field may well be called "title").
+    """
+    if isinstance(schema, dict):
+        drop = {"title", "default"} | ({"description"} if "properties" in schema else set())
+        out = {}
+        for k, v in schema.items():
+            if k == "properties" and isinstance(v, dict):
+                out[k] = {name: strip_schema(prop) for name, prop in v.items()}
+            elif k not in drop:
+                out[k] = strip_schema(v)
+        return out
+    if isinstance(schema, list):
+        return [strip_schema(v) for v in schema]
+    return schema
+
+
+def _nested_models(annotation: Any) -> Iterable[Type[BaseModel]]:
+    """Models inside a field annotation (JDStruct, Optional[TailoredResumeStruct], ...)."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        yield annotation
+    for arg in get_args(annotation):
+        yield from _nested_models(arg)
+
+
+def check_schema_fields(model_cls: Type[BaseModel], schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Raise ValueError if the compacted schema lost a field of model_cls or of
+    a nested model in $defs, so a model is never asked for a schema that
+    cannot validate.
+    """
+    models = [(model_cls, schema)]
+    for cls, _ in models:
+        for field in cls.model_fields.values():
+            for nested in _nested_models(field.annotation):
+                if all(nested is not seen for seen, _ in models):
+                    models.append((nested, schema.get("$defs", {}).get(nested.__name__, {})))
+    for cls, part in models:
+        missing = set(cls.model_fields) - set(part.get("properties", {}))
+        if missing:
+            raise ValueError(f"Compacted schema of {cls.__name__} is missing fields: {', '.join(sorted(missing))}")
+    return schema
+
+
+def compact_format_instructions(model_cls: Type[BaseModel]) -> str:
+    """Shorter replacement for PydanticOutputParser.get_format_instructions()."""
+    schema = check_schema_fields(model_cls, strip_schema(model_cls.model_json_schema()))
+    return f"Output a JSON object conforming to this JSON schema:\n{compact_json(schema)}"
+
+
+def fit_to_budget(
+    sections: Dict[str, str],
+    model: str,
+    budget: int,
+    fixed_tokens: int = 0,
+    shrinkable: Optional[str] = None
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """
+    Fit prompt sections into a token budget.
+    
+    When the total (sections plus fixed_tokens for the template itself) is
+    over budget, the shrinkable section is truncated to make room.
+    
+    Returns:
+        - The (possibly truncated) sections
+        - A report with per-section token counts, total, budget and truncation
+    """
+    # Taken first: if the encoding finishes loading midway, some counts are estimates
+    exact = has_encoding(model)
+    counts = {name: count_tokens(text, model) for name, text in sections.items()}
+    total = fixed_tokens + sum(counts.values())
+    truncated = False
+    
+    if total > budget and shrinkable in sections:
+        room = budget - (total - counts[shrinkable])
+        sections = dict(sections)
+        sections[shrinkable] = truncate_to_tokens(sections[shrinkable], max(0, room), model)
+        counts[shrinkable] = count_tokens(sections[shrinkable], model)
+        total = fixed_tokens + sum(counts.values())
+        truncated = True
+    
+    report = {
+        "sections": {"template": fixed_tokens, **counts},
+        "total": total,
+        "budget": budget,
+        "truncated": truncated,
+        "exact": exact
+    }
+    return sections, report
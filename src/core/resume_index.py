@@ -0,0 +1,187 @@
+"""
+Precomputed index over a resume for skill, education and year lookups.
+
+Built once per text: the text is casefolded and accent-folded ("Développement"
+matches "developpement") and split into tokens, and the position of every
+token is recorded. A phrase matches when its tokens appear consecutively, so
+matches respect word boundaries ("java" does not match "javascript", "ms"
+does not match "teams") while punctuation between words is ignored
+("node.js" matches "Node JS"). A lookup is a dictionary hit on each token
+plus a comparison at each position of the rarest one, instead of a scan of
+the whole text; skills also match through their taxonomy variants, whose
+expansion is cached per skill and taxonomy version.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Set, Tuple
+
+from .taxonomy import Taxonomy, get_taxonomy, register_compiler
+
+# Indexes kept by get_resume_index (a batch or rescore reuses the same resume text)
+INDEX_CACHE_SIZE = 32
+
+_TOKEN = re.compile(r"[\w+#]+")
+_COMBINING = re.compile(r"[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+_YEAR = re.compile(r"(?:19|20)\d{2}")
+
+
+def fold(text: str) -> str:
+    """Casefold and strip accents."""
+    folded = unicodedata.normalize("NFKD", (text or "").casefold())
+    return folded if folded.isascii() else _COMBINING.sub("", folded)
+
+
+def tokenize(text: str) -> List[str]:
+    """Folded word tokens; '+' and '#' are word characters so 'c++' and 'c#' stay whole."""
+    return _TOKEN.findall(fold(text))
+
+
+def phrase_key(text: str) -> str:
+    """Normalized form of a phrase as stored in the index: its tokens joined by single spaces."""
+    return " ".join(tokenize(text))
+
+
+# (name tokens, variant phrase keys) of variant entries, by the first token of the name
+_VariantIndex = Mapping[str, Tuple[Tuple[Tuple[str, ...], Tuple[str, ...]], ...]]
+
+
+def _variant_index(variants: Mapping[str, Tuple[str, ...]]) -> _VariantIndex:
+    index: Dict[str, list] = {}
+    for name, spellings in variants.items():
+        tokens = tuple(tokenize(name))
+        if tokens:
+            index.setdefault(tokens[0], []).append((tokens, tuple(phrase_key(v) for v in spellings)))
+    return {first: tuple(entries) for first, entries in index.items()}
+
+
+@register_compiler
+@lru_cache(maxsize=2)
+def _variant_indexes(taxonomy: Taxonomy) -> Tuple[_VariantIndex, _VariantIndex]:
+    """Skill and education variant indexes of a taxonomy."""
+    return _variant_index(taxonomy.skill_variants), _variant_index(taxonomy.education_variants)
+
+
+def _contained_variants(tokens: Tuple[str, ...], index: _VariantIndex) -> Set[str]:
+    """Variant keys of every entry whose name appears in tokens as whole words."""
+    found: Set[str] = set()
+    for i, token in enumerate(tokens):
+        for name, variants in index.get(token, ()):
+            if tokens[i:i + len(name)] == name:
+                found.update(variants)
+    return found
+
+
+def skill_alternatives(skill: str) -> FrozenSet[str]:
+    """
+    Phrase keys that count as evidence for a skill: the skill itself plus the
+    variants of every taxonomy skill it contains as whole words
+    (e.g. "React Native" also accepts "reactjs").
+    """
+    return _skill_alternatives(get_taxonomy(), skill)
+
+
+@lru_cache(maxsize=4096)
+def _skill_alternatives(taxonomy: Taxonomy, skill: str) -> FrozenSet[str]:
+    key = phrase_key(skill)
+    if not key:
+        return frozenset()
+    return frozenset({key} | _contained_variants(tuple(key.split(" ")), _variant_indexes(taxonomy)[0]))
+
+
+def education_alternatives(degree: str) -> FrozenSet[str]:
+    """Phrase keys of the taxonomy's education variants for the degrees a string names."""
+    return _education_alternatives(get_taxonomy(), degree)
+
+
+@lru_cache(maxsize=1024)
+def _education_alternatives(taxonomy: Taxonomy, degree: str) -> FrozenSet[str]:
+    return frozenset(_contained_variants(tuple(tokenize(degree)), _variant_indexes(taxonomy)[1]))
+
+
+class ResumeIndex:
+    """Tokens and token positions of one text; see the module docstring for the matching rules."""
+
+    __slots__ = ("tokens", "positions")
+
+    def __init__(self, text: str):
+        self.tokens: List[str] = tokenize(text)
+        self.positions: Dict[str, List[int]] = {}
+        for i, token in enumerate(self.tokens):
+            self.positions.setdefault(token, []).append(i)
+
+    def has_key(self, key: str) -> bool:
+        """Whether a phrase key (see phrase_key) appears."""
+        if not key:
+            return False
+        if " " not in key:
+            return key in self.positions
+        needle = key.split(" ")
+        starts = self.positions.get(needle[0])
+        if starts is None:
+            return False
+        # Anchor on the rarest token of the phrase; a missing token rules it out at once
+        anchor = 0
+        for offset in range(1, len(needle)):
+            found = self.positions.get(needle[offset])
+            if found is None:
+                return False
+            if len(found) < len(starts):
+                anchor, starts = offset, found
+        n, tokens = len(needle), self.tokens
+        return any(tokens[i - anchor:i - anchor + n] == needle for i in starts if i >= anchor)
+
+    def has_phrase(self, phrase: str) -> bool:
+        """Whether the phrase's tokens appear consecutively in the text."""
+        return self.has_key(phrase_key(phrase))
+
+    def has_any(self, phrases: Iterable[str]) -> bool:
+        """Whether any of the given phrase keys (see phrase_key) appears."""
+        return any(self.has_key(key) for key in phrases)
+
+    def contains_skill(self, skill: str) -> bool:
+        """Whether the skill, or a known variant of it, appears as whole words."""
+        return self.has_any(skill_alternatives(skill))
+
+    def mentions_degree(self, degree: str) -> bool:
+        """Whether a degree string appears verbatim, or one of its abbreviations does."""
+        return self.has_phrase(degree) or self.has_any(education_alternatives(degree))
+
+    def years(self) -> Set[str]:
+        """Four-digit years (1900-2099) mentioned in the text."""
+        return {t for t in self.positions if _YEAR.fullmatch(t)}
+
+
+class PhraseKeys:
+    """
+    A fixed set of phrase keys, grouped so that the keys present in a
+    ResumeIndex are found from the resume's tokens, without checking every
+    key of the set.
+    """
+
+    __slots__ = ("single", "multi")
+
+    def __init__(self, keys: Iterable[str]):
+        keys = {key for key in keys if key}
+        self.single: FrozenSet[str] = frozenset(key for key in keys if " " not in key)
+        multi: Dict[str, List[str]] = {}
+        for key in keys - self.single:
+            multi.setdefault(key.split(" ", 1)[0], []).append(key)
+        # Multi-token keys by their first token
+        self.multi: Dict[str, Tuple[str, ...]] = {token: tuple(group) for token, group in multi.items()}
+
+    def __len__(self) -> int:
+        return len(self.single) + sum(map(len, self.multi.values()))
+
+    def found_in(self, index: ResumeIndex) -> Set[str]:
+        """The keys that appear in an indexed text."""
+        found = set(index.positions.keys() & self.single)
+        for token in index.positions.keys() & self.multi.keys():
+            found.update(key for key in self.multi[token] if index.has_key(key))
+        return found
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def get_resume_index(text: str) -> ResumeIndex:
+    """The index of a text, built once and reused while it stays in the cache."""
+    return ResumeIndex(text)
@@ -0,0 +1,205 @@
+"""
+Per-stage model routing.
+
+Each LLM stage (parse_jd, parse_cv, parse_jd_cv, tailor) maps to an
+ordered list of models: the first one is used and the others are
+fallbacks, tried in turn when a call fails. The table is read from
+MODEL_ROUTES (inline JSON) or MODEL_ROUTES_FILE (a JSON file); stages it
+does not list use its "default" entry, which itself defaults to
+DEFAULT_MODEL. Requests can pin one model for every stage or override
+single stages; the configured fallbacks still apply after the override.
+"""
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional, TypeVar, Union
+
+from .config import DEFAULT_MODEL, MODEL_ROUTES, MODEL_ROUTES_FILE
+from .metrics import metrics, track_stage
+
+logger = logging.getLogger(__name__)
+
+# Stages that call the LLM and can be routed
+LLM_STAGES = ("parse_jd", "parse_cv", "parse_jd_cv", "tailor")
+
+model_fallbacks_total = metrics.counter(
+    "resume_matcher_model_fallbacks_total",
+    "LLM stage calls that failed over to the next model in their route.",
+    ("stage", "model")
+)
+
+T = TypeVar("T")
+
+
+def _as_chain(value: Union[str, List[str]]) -> List[str]:
+    """Normalize a route value (a model name or a list of them) to a list without duplicates."""
+    models = [value] if isinstance(value, str) else list(value)
+    chain: List[str] = []
+    for model in models:
+        if not isinstance(model, str) or not model.strip():
+            raise ValueError(f"Invalid model name: {model!r}")
+        if model.strip() not in chain:
+            chain.append(model.strip())
+    if not chain:
+        raise ValueError("A route needs at least one model")
+    return chain
+
+
+class ModelRoutes:
+    """An immutable stage -> [model, fallback, ...] table."""
+
+    def __init__(self, table: Optional[Mapping[str, Union[str, List[str]]]] = None, default: str = DEFAULT_MODEL):
+        table = dict(table or {})
+        unknown = set(table) - set(LLM_STAGES) - {"default"}
+        if unknown:
+            raise ValueError(
+                f"Unknown stage(s) in model routes: {', '.join(sorted(unknown))}. "
+                f"Valid stages: {', '.join(LLM_STAGES + ('default',))}"
+            )
+        self.default = _as_chain(table.pop("default", default))
+        self._routes: Dict[str, List[str]] = {
+            stage: _as_chain(table[stage]) if stage in table else list(self.default) for stage in LLM_STAGES
+        }
+
+    def chain(self, stage: str) -> List[str]:
+        """Models to try for a stage, in order."""
+        return list(self._routes.get(stage, self.default))
+
+    def primary(self, stage: str) -> str:
+        """The model a stage uses when nothing fails."""
+        return self._routes.get(stage, self.default)[0]
+
+    def override(self, model: Optional[str] = None, stage_models: Optional[Mapping[str, str]] = None) -> "ModelRoutes":
+        """
+        Return a copy with request overrides applied.
+
+        model pins every stage; stage_models (stage -> model) takes
+        precedence for the stages it names. The overriding model goes first
+        and the stage's configured models stay behind it as fallbacks.
+        """
+        if not model and not stage_models:
+            return self
+        table: Dict[str, List[str]] = {"default": ([model] if model else []) + self.default}
+        for stage in LLM_STAGES:
+            preferred = (stage_models or {}).get(stage) or model
+            table[stage] = ([preferred] if preferred else []) + self._routes[stage]
+        return ModelRoutes(table)
+
+    def describe(self) -> Dict[str, List[str]]:
+        """The table as plain data, for logs and GET /stats."""
+        return {**{stage: list(chain) for stage, chain in self._routes.items()}, "default": list(self.default)}
+
+
+def parse_stage_models(raw: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Parse per-stage overrides written as "stage=model,stage=model".
+
+    Returns None for an empty value and raises ValueError on unknown stages
+    or malformed pairs.
+    """
+    if not raw or not raw.strip():
+        return None
+    overrides: Dict[str, str] = {}
+    for pair in (p.strip() for p in raw.split(",")):
+        if not pair:
+            continue
+        stage, sep, model = (part.strip() for part in pair.partition("="))
+        if not sep or not stage or not model:
+            raise ValueError(f"Invalid model override '{pair}', expected stage=model")
+        if stage not in LLM_STAGES:
+            raise ValueError(f"Unknown stage '{stage}'. Valid stages: {', '.join(LLM_STAGES)}")
+        overrides[stage] = model
+    return overrides or None
+
+
+def load_model_routes() -> ModelRoutes:
+    """Build the routing table from MODEL_ROUTES_FILE or MODEL_ROUTES, falling back to DEFAULT_MODEL."""
+    try:
+        if MODEL_ROUTES_FILE:
+            with open(MODEL_ROUTES_FILE, "r", encoding="utf-8") as f:
+                table = json.load(f)
+        else:
+            table = json.loads(MODEL_ROUTES) if MODEL_ROUTES else {}
+        if not isinstance(table, dict):
+            raise ValueError("model routes must be a JSON object")
+        routes = ModelRoutes(table)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring invalid model routes, using {DEFAULT_MODEL} for every stage: {e}")
+        routes = ModelRoutes()
+    logger.info(f"Model routes: {routes.describe()}")
+    return routes
+
+
+async def call_with_fallback(
+    routes: ModelRoutes,
+    stage: str,
+    meta: Optional[Dict[str, Any]],
+    call: Callable[[str], Awaitable[T]]
+) -> T:
+    """
+    Run call(model) for each model of the stage's route until one succeeds.
+
+    Each attempt is timed in the stage metrics under its own model; the
+    stage's wall time across attempts goes to meta["timings"] and the model
+    that answered to meta["models"]. The last model's error propagates.
+    """
+    chain = routes.chain(stage)
+    started = time.perf_counter()
+    try:
+        for attempt, model in enumerate(chain, start=1):
+            try:
+                with track_stage(None, stage, model):
+                    result = await call(model)
+            except Exception as e:
+                if attempt == len(chain):
+                    raise
+                model_fallbacks_total.inc(stage=stage, model=model)
+                logger.warning(f"{stage} failed with {model} ({type(e).__name__}: {e}), falling back to {chain[attempt]}")
+                continue
+            if meta is not None:
+                meta.setdefault("models", {})[stage] = model
+            return result
+    finally:
+        if meta is not None:
+            meta.setdefault("timings", {})[stage] = round((time.perf_counter() - started) * 1000.0, 2)
+
+
+async def stream_with_fallback(
+    routes: ModelRoutes,
+    stage: str,
+    meta: Optional[Dict[str, Any]],
+    call: Callable[[str], AsyncIterator[T]]
+) -> AsyncIterator[T]:
+    """
+    Streaming counterpart of call_with_fallback.
+
+    A model is only abandoned for the next one while it has not yielded
+    anything yet; errors after the first item propagate, since the caller
+    has already seen partial output.
+    """
+    chain = routes.chain(stage)
+    started = time.perf_counter()
+    try:
+        for attempt, model in enumerate(chain, start=1):
+            streamed = False
+            try:
+                with track_stage(None, stage, model):
+                    async for item in call(model):
+                        streamed = True
+                        yield item
+            except Exception as e:
+                if streamed or attempt == len(chain):
+                    raise
+                model_fallbacks_total.inc(stage=stage, model=model)
+                logger.warning(f"{stage} failed with {model} ({type(e).__name__}: {e}), falling back to {chain[attempt]}")
+                continue
+            if meta is not None:
+                meta.setdefault("models", {})[stage] = model
+            return
+    finally:
+        if meta is not None:
+            meta.setdefault("timings", {})[stage] = round((time.perf_counter() - started) * 1000.0, 2)
+
+
+# Process-wide table built from the environment
+model_routes = load_model_routes()
@@ -0,0 +1,458 @@
+"""
+Process-wide scheduler for outbound LLM calls.
+
+Every chat completion request goes through ScheduledTransport, which asks
+the scheduler for a permit before it is sent. For each model the scheduler
+keeps:
+
+- token buckets for requests and tokens per minute (RPM/TPM); a request's
+  token cost is estimated from its prompt plus the completion budget before
+  it is sent, so bursts are smoothed out instead of rejected with 429s
+- an AIMD concurrency limit: it grows by ~1 per round trip while calls
+  succeed, and halves on a 429 (pausing for Retry-After) or shrinks when
+  latency per token rises well above its long-run average
+- per-flow FIFO queues served round-robin, so one large batch or ranking
+  request cannot starve a single /match/upload; the flow is taken from the
+  llm_flow context variable (one per HTTP request or background job)
+
+Calls wait in the queue rather than fail. Queue depth, wait time, in-flight
+calls and the current limits are exported as metrics and in GET /stats.
+State is guarded by a thread lock, so the scheduler serves every event loop
+(API, sync wrappers, job workers) and sync clients alike.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+
+from .config import (
+    LLM_RPM_LIMIT, LLM_TPM_LIMIT, LLM_MODEL_LIMITS, LLM_MIN_CONCURRENCY, LLM_INITIAL_CONCURRENCY,
+    LLM_MAX_CONCURRENCY, LLM_LATENCY_BACKOFF_FACTOR, LLM_COMPLETION_TOKENS_ESTIMATE, LLM_QUEUE_TIMEOUT
+)
+from .metrics import metrics, LATENCY_BUCKETS
+from .prompt_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Fairness group of the current outbound call (set per HTTP request / job)
+llm_flow: contextvars.ContextVar[str] = contextvars.ContextVar("llm_flow", default="default")
+
+# Bucket capacity, in seconds of refill: how large a burst is allowed after an idle period
+BURST_SECONDS = 10.0
+# Multiplicative decreases on a 429 and on latency growth
+THROTTLE_BACKOFF = 0.5
+LATENCY_BACKOFF = 0.8
+# EWMA weights for the short- and long-run latency averages
+FAST_EWMA = 0.3
+SLOW_EWMA = 0.02
+# Latency samples needed before latency growth can shrink the limit
+MIN_LATENCY_SAMPLES = 10
+# Longest a waiter sleeps before re-checking the buckets itself
+MAX_POLL_INTERVAL = 1.0
+
+queue_depth = metrics.gauge("resume_matcher_llm_queue_depth", "LLM calls waiting for a scheduler permit.", ("model",))
+in_flight = metrics.gauge("resume_matcher_llm_in_flight", "LLM calls currently sent to the provider.", ("model",))
+concurrency_limit = metrics.gauge("resume_matcher_llm_concurrency_limit", "Current AIMD concurrency limit.", ("model",))
+queue_wait_seconds = metrics.histogram(
+    "resume_matcher_llm_queue_wait_seconds", "Time LLM calls waited for a scheduler permit.", ("model",),
+    buckets=(0.0,) + LATENCY_BUCKETS
+)
+throttled_total = metrics.counter("resume_matcher_llm_throttled_total", "429 responses seen by the scheduler.", ("model",))
+
+
+class TokenBucket:
+    """Refills at rate_per_minute / 60 per second up to BURST_SECONDS worth of capacity."""
+
+    def __init__(self, rate_per_minute: float, now: float):
+        self.rate = max(rate_per_minute, 1.0) / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount (capped at capacity) is available; 0 if it already is."""
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    """A queued call; woken through its event loop or a threading.Event."""
+
+    __slots__ = ("cost", "flow", "enqueued", "granted", "loop", "future", "event")
+
+    def __init__(self, cost: int, flow: str, loop: Optional[asyncio.AbstractEventLoop]):
+        self.cost = cost
+        self.flow = flow
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+
+    def wake(self) -> None:
+        if self.loop is None:
+            self.event.set()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class _ModelState:
+    """Buckets, AIMD limit and fair queues for one model."""
+
+    def __init__(self, model: str, rpm: float, tpm: float, now: float):
+        self.model = model
+        self.requests = TokenBucket(rpm, now)
+        self.tokens = TokenBucket(tpm, now)
+        self.limit = float(max(LLM_MIN_CONCURRENCY, min(LLM_INITIAL_CONCURRENCY, LLM_MAX_CONCURRENCY)))
+        self.in_flight = 0
+        self.queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self.waiting = 0
+        self.paused_until = 0.0
+        self.fast_latency: Optional[float] = None
+        self.slow_latency: Optional[float] = None
+        self.samples = 0
+        self.last_decrease = 0.0
+        self.counts = {"granted": 0, "throttled": 0, "decreases": 0, "timeouts": 0}
+
+    def enqueue(self, waiter: _Waiter) -> None:
+        self.queues.setdefault(waiter.flow, deque()).append(waiter)
+        self.waiting += 1
+
+    def remove(self, waiter: _Waiter) -> None:
+        queue = self.queues.get(waiter.flow)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self.waiting -= 1
+            if not queue:
+                del self.queues[waiter.flow]
+
+    def _decrease(self, factor: float, now: float) -> None:
+        # At most one decrease per round trip, like TCP congestion control
+        if now - self.last_decrease < max(1.0, self.fast_latency or 0.0):
+            return
+        self.limit = max(float(LLM_MIN_CONCURRENCY), self.limit * factor)
+        self.last_decrease = now
+        self.counts["decreases"] += 1
+
+    def on_response(self, status: int, latency: float, cost: int, retry_after: Optional[float], now: float) -> None:
+        """Adjust the concurrency limit from one response."""
+        if status == 429:
+            self.counts["throttled"] += 1
+            throttled_total.inc(model=self.model)
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            self._decrease(THROTTLE_BACKOFF, now)
+            return
+        if status >= 500:
+            return
+        per_token = latency / max(cost, 1)
+        if self.fast_latency is None:
+            self.fast_latency = self.slow_latency = per_token
+        else:
+            self.fast_latency += FAST_EWMA * (per_token - self.fast_latency)
+            self.slow_latency += SLOW_EWMA * (per_token - self.slow_latency)
+        self.samples += 1
+        if self.samples >= MIN_LATENCY_SAMPLES and self.fast_latency > LLM_LATENCY_BACKOFF_FACTOR * self.slow_latency:
+            self._decrease(LATENCY_BACKOFF, now)
+        elif self.in_flight + 1 >= int(self.limit):
+            # Only grow while the limit is actually the bottleneck
+            self.limit = min(float(LLM_MAX_CONCURRENCY), self.limit + 1.0 / self.limit)
+
+    def dispatch(self, now: float) -> Optional[float]:
+        """
+        Grant queued waiters round-robin across flows while the budgets allow.
+
+        Returns how long to wait for the buckets (or a Retry-After pause) when
+        they are the blocker, None when waiting on a free concurrency slot.
+        """
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        while self.queues:
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.limit):
+                return None
+            flow, queue = next(iter(self.queues.items()))
+            waiter = queue[0]
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(waiter.cost))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(waiter.cost)
+            self.in_flight += 1
+            self.counts["granted"] += 1
+            queue.popleft()
+            self.waiting -= 1
+            if queue:
+                self.queues.move_to_end(flow)
+            else:
+                del self.queues[flow]
+            waiter.granted = True
+            waiter.wake()
+        return None
+
+    def export(self) -> None:
+        queue_depth.set(self.waiting, model=self.model)
+        in_flight.set(self.in_flight, model=self.model)
+        concurrency_limit.set(round(self.limit, 2), model=self.model)
+
+
+class Permit:
+    """Granted right to send one call; release it once the response is consumed."""
+
+    __slots__ = ("state", "cost", "sent_at", "released")
+
+    def __init__(self, state: _ModelState, cost: int):
+        self.state = state
+        self.cost = cost
+        self.sent_at = time.monotonic()
+        self.released = False
+
+
+class LLMScheduler:
+    """Admits outbound LLM calls per model under RPM/TPM budgets and an adaptive concurrency limit."""
+
+    def __init__(self, model_limits: Optional[Dict[str, Dict[str, float]]] = None, rpm: float = LLM_RPM_LIMIT, tpm: float = LLM_TPM_LIMIT):
+        self.model_limits = model_limits or {}
+        self.rpm = rpm
+        self.tpm = tpm
+        self._states: Dict[str, _ModelState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, model: str, now: float) -> _ModelState:
+        state = self._states.get(model)
+        if state is None:
+            limits = self.model_limits.get(model, {})
+            state = _ModelState(model, limits.get("rpm", self.rpm), limits.get("tpm", self.tpm), now)
+            self._states[model] = state
+        return state
+
+    def _enqueue(self, model: str, waiter: _Waiter) -> Tuple[_ModelState, Optional[float]]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(model, now)
+            state.enqueue(waiter)
+            hint = state.dispatch(now)
+            state.export()
+        return state, hint
+
+    def _poll(self, state: _ModelState, waiter: _Waiter) -> Optional[float]:
+        """Re-run dispatch after a wait; raise once the waiter has queued too long."""
+        with self._lock:
+            if waiter.granted:
+                return None
+            now = time.monotonic()
+            if LLM_QUEUE_TIMEOUT and now - waiter.enqueued > LLM_QUEUE_TIMEOUT:
+                state.remove(waiter)
+                state.counts["timeouts"] += 1
+                state.export()
+                raise httpx.PoolTimeout(f"Waited more than {LLM_QUEUE_TIMEOUT}s for an LLM scheduler permit ({state.model})")
+            hint = state.dispatch(now)
+            state.export()
+            return hint
+
+    def _abandon(self, state: _ModelState, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter.granted:
+                state.in_flight -= 1
+                state.dispatch(time.monotonic())
+            else:
+                state.remove(waiter)
+            state.export()
+
+    def _granted(self, state: _ModelState, waiter: _Waiter) -> Permit:
+        queue_wait_seconds.observe(time.monotonic() - waiter.enqueued, model=state.model)
+        return Permit(state, waiter.cost)
+
+    async def acquire(self, model: str, cost: int) -> Permit:
+        """Wait (fairly, per llm_flow) until a call to model costing cost tokens may be sent."""
+        waiter = _Waiter(cost, llm_flow.get(), asyncio.get_running_loop())
+        state, hint = self._enqueue(model, waiter)
+        try:
+            while not waiter.granted:
+                await asyncio.wait({waiter.future}, timeout=min(hint or MAX_POLL_INTERVAL, MAX_POLL_INTERVAL))
+                hint = self._poll(state, waiter)
+        except BaseException:
+            self._abandon(state, waiter)
+            raise
+        return self._granted(state, waiter)
+
+    def acquire_sync(self, model: str, cost: int) -> Permit:
+        """Blocking variant of acquire for sync clients."""
+        waiter = _Waiter(cost, llm_flow.get(), None)
+        state, hint = self._enqueue(model, waiter)
+        try:
+            while not waiter.granted:
+                waiter.event.wait(min(hint or MAX_POLL_INTERVAL, MAX_POLL_INTERVAL))
+                hint = self._poll(state, waiter)
+        except BaseException:
+            self._abandon(state, waiter)
+            raise
+        return self._granted(state, waiter)
+
+    def release(self, permit: Permit, status: Optional[int] = None, latency: Optional[float] = None, retry_after: Optional[float] = None) -> None:
+        """Return a permit, feeding the response status and latency into the AIMD limit."""
+        with self._lock:
+            if permit.released:
+                return
+            permit.released = True
+            state = permit.state
+            state.in_flight -= 1
+            now = time.monotonic()
+            if status is not None:
+                state.on_response(status, latency if latency is not None else now - permit.sent_at, permit.cost, retry_after, now)
+            state.dispatch(now)
+            state.export()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-model queue, concurrency and bucket state."""
+        with self._lock:
+            return {
+                model: {
+                    "queued": state.waiting,
+                    "flows_waiting": len(state.queues),
+                    "in_flight": state.in_flight,
+                    "concurrency_limit": round(state.limit, 2),
+                    "request_bucket": round(state.requests.level, 2),
+                    "token_bucket": round(state.tokens.level, 1),
+                    "paused_for": round(max(0.0, state.paused_until - time.monotonic()), 2),
+                    **state.counts
+                }
+                for model, state in self._states.items()
+            }
+
+
+def estimate_request(request: httpx.Request) -> Optional[Tuple[str, int]]:
+    """Return (model, estimated prompt + completion tokens) for a chat completion request, else None."""
+    if request.method != "POST" or not request.url.path.endswith("/chat/completions"):
+        return None
+    try:
+        body = json.loads(request.content)
+    except Exception:
+        return None
+    model = body.get("model") or "default"
+    parts = []
+    for message in body.get("messages") or []:
+        content = message.get("content")
+        parts.append(content if isinstance(content, str) else json.dumps(content))
+    if body.get("tools"):
+        parts.append(json.dumps(body["tools"]))
+    # A few tokens of framing per message
+    prompt_tokens = count_tokens("\n".join(parts), model) + 4 * len(body.get("messages") or [])
+    completion_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or LLM_COMPLETION_TOKENS_ESTIMATE
+    return model, prompt_tokens + int(completion_tokens)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                continue
+    return None
+
+
+class _ReleasingStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Response body wrapper that releases the permit when the body is closed."""
+
+    def __init__(self, stream: Any, release: Any):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class ScheduledTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """httpx transport that holds every chat completion call for a scheduler permit."""
+
+    def __init__(self, inner: Any, scheduler: LLMScheduler):
+        self.inner = inner
+        self.scheduler = scheduler
+
+    def _wrap(self, response: httpx.Response, permit: Permit) -> httpx.Response:
+        # Feedback uses time to response headers; the slot is held until the body is consumed
+        status, latency, retry_after = response.status_code, time.monotonic() - permit.sent_at, _retry_after(response)
+        if isinstance(response.stream, httpx.ByteStream):
+            # Body already in memory: httpx never closes these streams, so release now
+            self.scheduler.release(permit, status, latency, retry_after)
+            return response
+        response.stream = _ReleasingStream(
+            response.stream, lambda: self.scheduler.release(permit, status, latency, retry_after)
+        )
+        return response
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        estimate = estimate_request(request)
+        if estimate is None:
+            return self.inner.handle_request(request)
+        permit = self.scheduler.acquire_sync(*estimate)
+        try:
+            response = self.inner.handle_request(request)
+        except BaseException:
+            self.scheduler.release(permit)
+            raise
+        return self._wrap(response, permit)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        estimate = estimate_request(request)
+        if estimate is None:
+            return await self.inner.handle_async_request(request)
+        permit = await self.scheduler.acquire(*estimate)
+        try:
+            response = await self.inner.handle_async_request(request)
+        except BaseException:
+            self.scheduler.release(permit)
+            raise
+        return self._wrap(response, permit)
+
+    def close(self) -> None:
+        self.inner.close()
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+def scheduler_from_config() -> LLMScheduler:
+    """Build the scheduler from the LLM_* rate limit settings."""
+    try:
+        model_limits = json.loads(LLM_MODEL_LIMITS) if LLM_MODEL_LIMITS else {}
+    except ValueError as e:
+        logger.warning(f"Ignoring invalid LLM_MODEL_LIMITS: {e}")
+        model_limits = {}
+    return LLMScheduler(model_limits)
@@ -0,0 +1,391 @@
+"""
+Structured LLM output without PydanticOutputParser.
+
+With the "tools" backend the schema is sent as a forced function call, so
+prompts carry no format instructions; the "prompt" backend keeps the schema
+in the prompt for endpoints without tool support. Either way the reply is
+validated locally and, when it is not valid JSON, repaired locally instead of
+being sent back to the LLM.
+"""
+import ast
+import json
+import logging
+import re
+import threading
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type, Union
+
+from langchain.schema import AIMessage, OutputParserException
+from langchain.schema.runnable import Runnable, RunnableLambda
+from pydantic import BaseModel, ValidationError
+
+from .config import STRUCTURED_OUTPUT_BACKEND
+from .metrics import metrics
+from .prompt_budget import check_schema_fields, compact_json, strip_schema
+
+logger = logging.getLogger(__name__)
+
+STRUCTURED_OUTPUT_BACKENDS = ("tools", "prompt")
+if STRUCTURED_OUTPUT_BACKEND not in STRUCTURED_OUTPUT_BACKENDS:
+    logger.warning(f"Unknown STRUCTURED_OUTPUT_BACKEND '{STRUCTURED_OUTPUT_BACKEND}', using 'tools'")
+    STRUCTURED_OUTPUT_BACKEND = "tools"
+
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+_PY_LITERALS = {"true": "True", "false": "False", "null": "None"}
+
+
+def close_json(text: str) -> str:
+    """
+    Close an unterminated JSON document.
+
+    Open strings are terminated, a dangling key, colon or comma is dropped and
+    the missing brackets are appended in the right order. Also used to parse
+    partial output while it is still streaming.
+    """
+    stack = []
+    in_string = escaped = False
+    # Position just after the last complete value, where it is safe to cut
+    last_safe = 0
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+                last_safe = i + 1
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            last_safe = i + 1
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            last_safe = i + 1
+        elif not ch.isspace() and ch not in ",:":
+            last_safe = i + 1
+
+    if in_string:
+        text = text[:-1] if escaped else text
+        text += '"'
+    else:
+        text = text[:last_safe]
+    text = text.rstrip()
+
+    # A key without a value (or a dangling separator) cannot be closed as is
+    while True:
+        stripped = text.rstrip(" \t\r\n,")
+        if stripped.endswith(":"):
+            stripped = stripped[:-1].rstrip()
+            key_start = stripped.rfind('"', 0, len(stripped) - 1)
+            stripped = stripped[:key_start] if key_start >= 0 else stripped
+            text = stripped
+            continue
+        if stack and stack[-1] == "}" and stripped.endswith('"'):
+            # A string directly inside an object is a key with no value yet
+            body = stripped[:stripped.rfind('"', 0, len(stripped) - 1)].rstrip()
+            if body.endswith(("{", ",")):
+                text = body
+                continue
+        text = stripped
+        break
+    return text + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> Any:
+    """
+    Best-effort parse of almost-JSON returned by an LLM.
+
+    Handles code fences, prose around the object, smart quotes, trailing
+    commas, truncated output and Python-style literals. Raises ValueError when
+    nothing can be recovered.
+    """
+    text = _FENCE.sub("", (text or "").strip()).translate(_SMART_QUOTES)
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError("No JSON object found in LLM output")
+    text = text[start:]
+    end = max(text.rfind("}"), text.rfind("]"))
+
+    candidates = []
+    if end >= 0:
+        candidates.append(text[:end + 1])
+    candidates.append(close_json(text))
+    for candidate in candidates:
+        candidate = _TRAILING_COMMA.sub(r"\1", candidate)
+        try:
+            return json.loads(candidate, strict=False)
+        except ValueError:
+            pass
+        try:
+            literal = re.sub(r"\b(true|false|null)\b", lambda m: _PY_LITERALS[m.group(1)], candidate)
+            return ast.literal_eval(literal)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+    raise ValueError("Could not repair LLM output as JSON")
+
+
+class IncrementalJSONParser:
+    """
+    Incremental scanner that reports JSON values as soon as they are complete.
+
+    Feed text chunks as they arrive; feed() returns (path, value) for every
+    value completed by the chunk that sits at most max_depth keys/indexes
+    below the root, where path is a tuple of object keys and array indexes.
+    Each character is scanned once, so the cost is linear in the output size.
+    """
+
+    def __init__(self, max_depth: int = 2):
+        self.max_depth = max_depth
+        self.buffer = ""
+        # One frame per open container: [kind, start, key_or_index, expecting_key]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escaped = False
+        self._token_start: Optional[int] = None
+        self._pos = 0
+        self.done = False
+
+    def _path(self) -> Tuple[Union[str, int], ...]:
+        return tuple(frame[2] for frame in self._stack)
+
+    def _complete(self, start: int, end: int, found: list) -> None:
+        """Record a finished value in the innermost open container (or the root)."""
+        path = self._path()
+        if len(path) <= self.max_depth:
+            try:
+                found.append((path, json.loads(self.buffer[start:end], strict=False)))
+            except ValueError:
+                # Tolerate odd primitives (e.g. a bare word); repair happens on the full output
+                pass
+
+    def _end_token(self, end: int, found: list) -> None:
+        if self._token_start is not None:
+            self._complete(self._token_start, end, found)
+            self._token_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[Tuple[Union[str, int], ...], Any]]:
+        """Consume a chunk and return the values it completed, innermost first."""
+        found: list = []
+        self.buffer += chunk
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self.done:
+                break
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    frame = self._stack[-1] if self._stack else None
+                    if frame and frame[0] == "{" and frame[3]:
+                        frame[2] = json.loads(buf[self._token_start:i + 1], strict=False)
+                        self._token_start = None
+                    else:
+                        self._end_token(i + 1, found)
+                continue
+            if not self._stack and ch not in "{[":
+                # Prose or code fences before the root value
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._token_start = i
+            elif ch in "{[":
+                self._stack.append([ch, i, None if ch == "{" else 0, ch == "{"])
+            elif ch in "}]":
+                self._end_token(i, found)
+                start = self._stack.pop()[1]
+                self._complete(start, i + 1, found)
+                if not self._stack:
+                    self.done = True
+            elif ch == ":":
+                self._stack[-1][3] = False
+            elif ch == ",":
+                self._end_token(i, found)
+                frame = self._stack[-1]
+                if frame[0] == "[":
+                    frame[2] += 1
+                else:
+                    frame[3] = True
+            elif ch.isspace():
+                self._end_token(i, found)
+            elif self._token_start is None:
+                self._token_start = i
+        self._pos = len(buf)
+        return found
+
+
+structured_outputs_total = metrics.counter(
+    "resume_matcher_structured_outputs_total",
+    "Structured LLM replies by schema and parse outcome (first_try, repaired, failed).",
+    ("schema", "outcome")
+)
+
+
+class StructuredOutputStats:
+    """Thread-safe per-schema counters for structured output parsing, also exported to /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, schema: str, outcome: str) -> None:
+        """Count one parse outcome: "first_try", "repaired" or "failed"."""
+        with self._lock:
+            counts = self._counts.setdefault(schema, {"first_try": 0, "repaired": 0, "failed": 0})
+            counts[outcome] += 1
+        structured_outputs_total.inc(schema=schema, outcome=outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report counts and first-try success rate per schema and overall."""
+        with self._lock:
+            schemas = {name: dict(counts) for name, counts in self._counts.items()}
+        totals = {"first_try": 0, "repaired": 0, "failed": 0}
+        for counts in schemas.values():
+            calls = sum(counts.values())
+            counts["calls"] = calls
+            counts["first_try_rate"] = round(counts["first_try"] / calls, 4) if calls else None
+            for outcome in totals:
+                totals[outcome] += counts[outcome]
+        calls = sum(totals.values())
+        return {
+            "backend": STRUCTURED_OUTPUT_BACKEND,
+            "calls": calls,
+            **totals,
+            "first_try_rate": round(totals["first_try"] / calls, 4) if calls else None,
+            "schemas": schemas
+        }
+
+
+structured_stats = StructuredOutputStats()
+
+
+@lru_cache(maxsize=None)
+def tool_spec(model_cls: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenAI tool definition whose parameters are the model's (compacted) JSON schema."""
+    return {
+        "type": "function",
+        "function": {
+            "name": model_cls.__name__,
+            "description": (model_cls.__doc__ or model_cls.__name__).strip(),
+            "parameters": check_schema_fields(model_cls, strip_schema(model_cls.model_json_schema()))
+        }
+    }
+
+
+def format_instructions(model_cls: Type[BaseModel], prompt_instructions: str) -> str:
+    """
+    Text for a prompt's {format_instructions} slot.
+
+    With the tools backend the schema travels with the function definition,
+    so only a short pointer to it is returned; otherwise prompt_instructions.
+    """
+    if STRUCTURED_OUTPUT_BACKEND == "tools":
+        return f"Provided as the parameters of the `{model_cls.__name__}` function; call it with the result."
+    return prompt_instructions
+
+
+def schema_overhead(model_cls: Type[BaseModel]) -> str:
+    """Text sent alongside the prompt for this schema (the tool definition), for token accounting."""
+    if STRUCTURED_OUTPUT_BACKEND == "tools":
+        return compact_json(tool_spec(model_cls))
+    return ""
+
+
+def _text_delta(chunk: Any) -> str:
+    """Structured payload text carried by one streamed message chunk."""
+    tool_calls = (getattr(chunk, "additional_kwargs", None) or {}).get("tool_calls") or []
+    arguments = "".join((call.get("function") or {}).get("arguments") or "" for call in tool_calls)
+    return arguments or getattr(chunk, "content", "") or ""
+
+
+def _raw_output(message: Any) -> Tuple[str, str]:
+    """Return (source, text) of the structured payload in an LLM reply."""
+    tool_calls = (getattr(message, "additional_kwargs", None) or {}).get("tool_calls") or []
+    for call in tool_calls:
+        arguments = (call.get("function") or {}).get("arguments")
+        if arguments:
+            return "tool_call", arguments
+    return "content", getattr(message, "content", message) or ""
+
+
+def parse_structured(message: Any, model_cls: Type[BaseModel]) -> BaseModel:
+    """
+    Validate an LLM reply against model_cls, repairing malformed JSON locally.
+
+    Raises OutputParserException when the reply cannot be repaired.
+    """
+    name = model_cls.__name__
+    source, text = _raw_output(message)
+    try:
+        parsed = model_cls.model_validate_json(text)
+        structured_stats.record(name, "first_try")
+        return parsed
+    except ValidationError as e:
+        first_error = e
+
+    try:
+        data = repair_json(text)
+        # Some models wrap the object in the function name or echo a "properties" envelope
+        if isinstance(data, dict) and len(data) == 1:
+            (key, inner), = data.items()
+            if key in (name, "properties", "arguments") and isinstance(inner, dict):
+                data = inner
+        parsed = model_cls.model_validate(data)
+    except (ValueError, ValidationError) as e:
+        structured_stats.record(name, "failed")
+        logger.error(f"Unrepairable {name} output from {source}: {e}")
+        raise OutputParserException(f"Failed to parse {name} from LLM output: {first_error}", llm_output=text)
+
+    structured_stats.record(name, "repaired")
+    logger.warning(f"Repaired malformed {name} output from {source}: {str(first_error).splitlines()[0]}")
+    return parsed
+
+
+def structured_chain(prompt: Runnable, llm: Any, model_cls: Type[BaseModel], backend: Optional[str] = None) -> Runnable:
+    """Build prompt | llm | parser for model_cls using the configured backend."""
+    backend = backend or STRUCTURED_OUTPUT_BACKEND
+    if backend == "tools":
+        llm = llm.bind(
+            tools=[tool_spec(model_cls)],
+            tool_choice={"type": "function", "function": {"name": model_cls.__name__}}
+        )
+    return prompt | llm | RunnableLambda(lambda message: parse_structured(message, model_cls))
+
+
+async def astream_structured(
+    prompt: Runnable,
+    llm: Any,
+    model_cls: Type[BaseModel],
+    inputs: Dict[str, Any],
+    max_depth: int = 2,
+    backend: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Stream a structured LLM call.
+
+    Yields ("partial", (path, value)) for each value up to max_depth levels
+    deep as soon as the model has finished writing it, then ("final", parsed)
+    with the validated (and, if needed, repaired) model_cls instance.
+    """
+    backend = backend or STRUCTURED_OUTPUT_BACKEND
+    if backend == "tools":
+        llm = llm.bind(
+            tools=[tool_spec(model_cls)],
+            tool_choice={"type": "function", "function": {"name": model_cls.__name__}}
+        )
+    scanner = IncrementalJSONParser(max_depth=max_depth)
+    async for chunk in (prompt | llm).astream(inputs):
+        delta = _text_delta(chunk)
+        if delta:
+            for path, value in scanner.feed(delta):
+                yield "partial", (path, value)
+    yield "final", parse_structured(AIMessage(content=scanner.buffer), model_cls)
+
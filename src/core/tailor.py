@@ -1,16 +1,27 @@
 """
 Resume tailoring functionality using LLM.
 """
-from typing import Dict, List
+import json
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 from langchain.prompts import ChatPromptTemplate
-from langchain.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
 
 from .models import JDStruct, CVStruct, TailoredOutput, TailoredResumeStruct
+from .cache import llm_cache
+from .llm import get_llm
+from .structured import structured_chain, astream_structured, format_instructions, schema_overhead
+from .config import TAILOR_PROMPT_TOKEN_BUDGET
+from .prompt_budget import (
+    count_tokens, strip_empty, dedupe_against_text, compact_json,
+    compact_format_instructions, fit_to_budget, has_encoding
+)
+
+
+# Bump whenever Tail_prompt changes so cached tailoring results are invalidated
+TAILOR_PROMPT_VERSION = "2"
 
 
 # Tailored Resume Parser
-Tail_parser = PydanticOutputParser(pydantic_object=TailoredOutput)
 Tail_prompt = ChatPromptTemplate.from_template("""
 You are a professional resume tailor. Create a tailored resume using ONLY facts from the original resume, optimized for the job description. Return ONLY valid JSON according to the schema.
 
@@ -79,10 +90,22 @@ PROJECTS SECTION:
 - Ensure project technologies align with the job requirements when possible
 
 Return ONLY the JSON object, no additional text.
-""").partial(format_instructions=Tail_parser.get_format_instructions())
+""").partial(format_instructions=format_instructions(TailoredOutput, compact_format_instructions(TailoredOutput)))
 
 
-def tailor_resume(
+@lru_cache(maxsize=16)
+def _template_tokens(model: str, exact: bool) -> int:
+    """
+    Tokens used by Tail_prompt itself (and the tool schema), with every variable left empty.
+
+    exact (has_encoding(model)) is part of the cache key, so an estimate made
+    while the tokenizer was still loading is not reused once it has loaded.
+    """
+    empty = {name: "" for name in Tail_prompt.input_variables}
+    return count_tokens(Tail_prompt.format(**empty) + schema_overhead(TailoredOutput), model)
+
+
+def _tailor_inputs(
     resume_text: str,
     jd: JDStruct,
     cv: CVStruct,
@@ -90,17 +113,145 @@ def tailor_resume(
     coverage: Dict,
     gaps: Dict,
     model: str
+) -> Tuple[Dict, Dict[str, Any]]:
+    """
+    Build compacted prompt variables for the tailoring chain.
+    
+    Empty fields are stripped, CV achievements already quoted verbatim in the
+    resume text are not sent twice, structs are sent as compact JSON and the
+    resume text is truncated if the prompt would exceed
+    TAILOR_PROMPT_TOKEN_BUDGET.
+    
+    Returns:
+        - Prompt variables
+        - Token report (per section, total, budget, truncation)
+    """
+    cv_data = dedupe_against_text(strip_empty(cv.model_dump()), resume_text, ("achievements", "education"))
+    sections = {
+        "resume_text": resume_text or "",
+        "jd_struct": compact_json(strip_empty(jd.model_dump())),
+        "cv_struct": compact_json(strip_empty(cv_data)),
+        "score": f"{score:.1f}",
+        "coverage": compact_json({k: round(v, 1) for k, v in (coverage or {}).items()}),
+        "gaps": compact_json(strip_empty(gaps or {}))
+    }
+    return fit_to_budget(
+        sections, model, TAILOR_PROMPT_TOKEN_BUDGET,
+        fixed_tokens=_template_tokens(model, has_encoding(model)), shrinkable="resume_text"
+    )
+
+
+def _tailor_cache_key(inputs: Dict, model: str) -> str:
+    """Cache key covering every variable that goes into the tailoring prompt."""
+    text = json.dumps(inputs, sort_keys=True, default=str, ensure_ascii=False)
+    return llm_cache.make_key("tailor", text, model, TAILOR_PROMPT_VERSION)
+
+
+def tailor_resume(
+    resume_text: str,
+    jd: JDStruct,
+    cv: CVStruct,
+    score: float,
+    coverage: Dict,
+    gaps: Dict,
+    model: str,
+    meta: Optional[Dict[str, Any]] = None
+) -> TailoredOutput:
+    """
+    Generate a tailored resume based on job requirements.
+    
+    If meta is given, the prompt token report is stored in meta["prompt_tokens"]["tailor"].
+    """
+    inputs, report = _tailor_inputs(resume_text, jd, cv, score, coverage, gaps, model)
+    if meta is not None:
+        meta.setdefault("prompt_tokens", {})["tailor"] = report
+    key = _tailor_cache_key(inputs, model)
+    tailored = llm_cache.get(key, TailoredOutput)
+    if tailored is None:
+        llm = get_llm(model)
+        chain = structured_chain(Tail_prompt, llm, TailoredOutput)
+        tailored = chain.invoke(inputs)
+        llm_cache.set(key, tailored)
+    
+    return tailored
+
+
+async def atailor_resume(
+    resume_text: str,
+    jd: JDStruct,
+    cv: CVStruct,
+    score: float,
+    coverage: Dict,
+    gaps: Dict,
+    model: str,
+    meta: Optional[Dict[str, Any]] = None
 ) -> TailoredOutput:
-    """Generate a tailored resume based on job requirements."""
-    llm = ChatOpenAI(model=model, temperature=0)
-    chain = Tail_prompt | llm | Tail_parser
+    """Async variant of tailor_resume."""
+    inputs, report = _tailor_inputs(resume_text, jd, cv, score, coverage, gaps, model)
+    if meta is not None:
+        meta.setdefault("prompt_tokens", {})["tailor"] = report
+    key = _tailor_cache_key(inputs, model)
+    tailored = await llm_cache.aget(key, TailoredOutput)
+    if tailored is None:
+        llm = get_llm(model)
+        chain = structured_chain(Tail_prompt, llm, TailoredOutput)
+        tailored = await chain.ainvoke(inputs)
+        await llm_cache.aset(key, tailored)
+    
+    return tailored
+
+
+def _section_event(path: Tuple, value: Any) -> Optional[Dict[str, Any]]:
+    """Describe a completed TailoredOutput value as a section, or None if it is not one."""
+    if path and path[0] == "structured_resume" and len(path) == 2:
+        return {"section": path[1], "path": f"structured_resume.{path[1]}", "data": value}
+    if len(path) == 1 and path[0] in ("tailored_resume_text", "recommendations"):
+        return {"section": path[0], "path": path[0], "data": value}
+    return None
+
+
+async def astream_tailor_resume(
+    resume_text: str,
+    jd: JDStruct,
+    cv: CVStruct,
+    score: float,
+    coverage: Dict,
+    gaps: Dict,
+    model: str,
+    meta: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of atailor_resume.
+    
+    Yields ("section", {"section", "path", "data"}) as soon as each
+    structured_resume section, the resume text or the recommendations are
+    complete in the LLM output, then ("tailored", TailoredOutput). Cached
+    results are replayed section by section.
+    """
+    inputs, report = _tailor_inputs(resume_text, jd, cv, score, coverage, gaps, model)
+    if meta is not None:
+        meta.setdefault("prompt_tokens", {})["tailor"] = report
+    key = _tailor_cache_key(inputs, model)
+    tailored = await llm_cache.aget(key, TailoredOutput)
+    if tailored is not None:
+        data = tailored.model_dump()
+        for name, value in data.items():
+            if name == "structured_resume" and value:
+                for section, section_value in value.items():
+                    yield "section", _section_event((name, section), section_value)
+            elif name != "structured_resume":
+                yield "section", _section_event((name,), value)
+        yield "tailored", tailored
+        return
     
-    return chain.invoke({
-        "resume_text": resume_text,
-        "jd_struct": jd.dict(),
-        "cv_struct": cv.dict(),
-        "score": score,
-        "coverage": coverage,
-        "gaps": gaps
-    })
+    llm = get_llm(model)
+    async for kind, payload in astream_structured(Tail_prompt, llm, TailoredOutput, inputs):
+        if kind == "partial":
+            event = _section_event(*payload)
+            if event is not None:
+                yield "section", event
+        else:
+            tailored = payload
+    await llm_cache.aset(key, tailored)
+    yield "tailored", tailored
 
@@ -0,0 +1,319 @@
+"""
+Skill taxonomy: normalization aliases, skill variants and education variants.
+
+The taxonomy is a versioned JSON file (TAXONOMY_FILE, src/core/taxonomy.json
+by default):
+
+    {
+      "version": "1.0.0",
+      "aliases": {"seniority": {...}, "roles": {...}, "tech": {...}, "skills": {...}, "education": {...}},
+      "skill_variants": {"javascript": ["javascript", "js", "node.js"], ...},
+      "education_variants": {"master of science": ["m.s.", "ms", "master of science"], ...},
+      "ambiguous_terms": ["rest", "ms", ...]
+    }
+
+It is compiled once into an immutable Taxonomy. The maps are read-only
+views with lowercased keys, and the merged tech + skills map the parsers
+normalize with is built up front. PhraseMatchers find multi-word terms in
+text with one dictionary lookup per word, whatever the number of terms.
+
+Modules that derive their own tables from the taxonomy cache them per
+Taxonomy object (lru_cache keyed on the snapshot), so a new taxonomy
+invalidates them without any bookkeeping; they register those functions
+with register_compiler so the tables are built before the taxonomy is
+used.
+
+get_taxonomy() returns the current taxonomy. reload_taxonomy() compiles
+the file again and swaps it in atomically. If the reload fails (missing
+file, invalid JSON or schema errors), the current taxonomy stays in place.
+Callers take one snapshot per operation, so a parse never mixes two
+versions. SIGHUP (see install_reload_signal) and POST
+/admin/taxonomy/reload trigger a reload without a restart.
+"""
+import hashlib
+import json
+import logging
+import re
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple, TypeVar
+
+from .config import TAXONOMY_FILE
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Alias categories every taxonomy file must define
+ALIAS_CATEGORIES = ("seniority", "roles", "tech", "skills", "education")
+
+taxonomy_reloads_total = metrics.counter(
+    "resume_matcher_taxonomy_reloads_total",
+    "Skill taxonomy reloads by outcome (ok, error).",
+    ("outcome",)
+)
+
+
+F = TypeVar("F", bound=Callable[["Taxonomy"], Any])
+
+
+class TaxonomyError(ValueError):
+    """A taxonomy file that cannot be read or does not match the schema."""
+
+
+# Where a term may start, and the run of word characters it starts with (its head)
+_HEAD = re.compile(r"(?<![\w+#/.-])\S[\w+#]*")
+_TERM_HEAD = re.compile(r".[\w+#]*", re.DOTALL)
+# Where a term may end
+_TERM_END = re.compile(r"(?![\w+#]|\.\w)")
+
+
+class PhraseMatcher:
+    """
+    Finds a fixed set of terms (single or multi-word) in text, case-insensitively.
+
+    Matches follow word boundaries: a term cannot start right after a word
+    character or one of "/.-" and cannot end before a word character or
+    ".<letter>", so "java" does not match "javascript" and "node" does not
+    match "node.js". At each position the longest term wins and matches do
+    not overlap, as with a longest-first regex alternation.
+
+    Since a term cannot end inside a word, its first character and the word
+    characters after it (its head, "node" for "node.js") are a whole word
+    of the text. Each word of the text is looked up once in a dict of
+    heads, and only the terms sharing its head are compared, so the cost
+    depends on the text, not on the number of terms.
+    """
+
+    __slots__ = ("terms", "_heads")
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: FrozenSet[str] = frozenset(t.strip().lower() for t in terms if t and t.strip())
+        heads: Dict[str, set] = {}
+        for term in self.terms:
+            heads.setdefault(_TERM_HEAD.match(term).group(0), set()).add(len(term))
+        # Head -> lengths of the terms starting with it, longest first
+        self._heads: Dict[str, Tuple[int, ...]] = {
+            head: tuple(sorted(lengths, reverse=True)) for head, lengths in heads.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def find(self, text: str) -> List[str]:
+        """The matched spans of text, in their original case, in order."""
+        found: List[str] = []
+        if not text or not self.terms:
+            return found
+        terms, heads, pos = self.terms, self._heads, 0
+        for m in _HEAD.finditer(text):
+            start = m.start()
+            if start < pos:
+                continue
+            lengths = heads.get(m.group(0).lower())
+            if lengths is None:
+                continue
+            for length in lengths:
+                end = start + length
+                span = text[start:end]
+                if span.lower() in terms and _TERM_END.match(text, end):
+                    found.append(span)
+                    pos = end
+                    break
+        return found
+
+
+def _check_map(value: Any, where: str) -> Dict[str, str]:
+    """A {term: canonical} object with lowercased, stripped keys."""
+    if not isinstance(value, dict):
+        raise TaxonomyError(f"{where} must be an object of term -> canonical name")
+    table: Dict[str, str] = {}
+    for term, canonical in value.items():
+        if not isinstance(canonical, str) or not term.strip() or not canonical.strip():
+            raise TaxonomyError(f"{where}: invalid entry {term!r}: {canonical!r}")
+        table[term.strip().lower()] = canonical.strip()
+    return table
+
+
+def _check_variants(value: Any, where: str) -> Dict[str, Tuple[str, ...]]:
+    """A {name: [variant, ...]} object with lowercased names and variants."""
+    if not isinstance(value, dict):
+        raise TaxonomyError(f"{where} must be an object of name -> list of variants")
+    table: Dict[str, Tuple[str, ...]] = {}
+    for name, variants in value.items():
+        if not name.strip() or not isinstance(variants, list) or not all(isinstance(v, str) and v.strip() for v in variants):
+            raise TaxonomyError(f"{where}: invalid entry {name!r}: {variants!r}")
+        table[name.strip().lower()] = tuple(dict.fromkeys(v.strip().lower() for v in variants))
+    return table
+
+
+@dataclass(frozen=True, eq=False)
+class Taxonomy:
+    """A compiled, read-only taxonomy; see the module docstring."""
+    version: str
+    source: str
+    checksum: str
+    loaded_at: float
+    aliases: Mapping[str, Mapping[str, str]]
+    skill_variants: Mapping[str, Tuple[str, ...]]
+    education_variants: Mapping[str, Tuple[str, ...]]
+    ambiguous_terms: FrozenSet[str]
+    # aliases["tech"] and aliases["skills"] in one map (skills win), for skill lists
+    skill_aliases: Mapping[str, str]
+    # aliases["education"] terms, for degree normalization
+    education_matcher: PhraseMatcher
+
+    @property
+    def entries(self) -> int:
+        """Number of terms: aliases, variant names and variants."""
+        return (
+            sum(map(len, self.aliases.values()))
+            + sum(1 + len(v) for v in self.skill_variants.values())
+            + sum(1 + len(v) for v in self.education_variants.values())
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        """Version and provenance, for logs and GET /stats."""
+        return {
+            "version": self.version,
+            "source": self.source,
+            "checksum": self.checksum,
+            "entries": self.entries,
+            "loaded_at": self.loaded_at
+        }
+
+
+def compile_taxonomy(data: Any, source: str = "<memory>", checksum: str = "") -> Taxonomy:
+    """Validate a parsed taxonomy document and compile it; raises TaxonomyError."""
+    if not isinstance(data, dict):
+        raise TaxonomyError("taxonomy must be a JSON object")
+    version = data.get("version")
+    if not isinstance(version, (str, int, float)) or not str(version).strip():
+        raise TaxonomyError("taxonomy needs a non-empty \"version\"")
+    raw_aliases = data.get("aliases")
+    if not isinstance(raw_aliases, dict):
+        raise TaxonomyError("taxonomy needs an \"aliases\" object")
+    missing = [c for c in ALIAS_CATEGORIES if c not in raw_aliases]
+    if missing:
+        raise TaxonomyError(f"aliases is missing categories: {', '.join(missing)}")
+    aliases = {category: _check_map(table, f"aliases.{category}") for category, table in raw_aliases.items()}
+    ambiguous = data.get("ambiguous_terms", [])
+    if not isinstance(ambiguous, list) or not all(isinstance(t, str) for t in ambiguous):
+        raise TaxonomyError("ambiguous_terms must be a list of strings")
+
+    return Taxonomy(
+        version=str(version).strip(),
+        source=source,
+        checksum=checksum,
+        loaded_at=time.time(),
+        aliases=MappingProxyType({c: MappingProxyType(t) for c, t in aliases.items()}),
+        skill_variants=MappingProxyType(_check_variants(data.get("skill_variants", {}), "skill_variants")),
+        education_variants=MappingProxyType(_check_variants(data.get("education_variants", {}), "education_variants")),
+        ambiguous_terms=frozenset(t.strip().lower() for t in ambiguous if t.strip()),
+        skill_aliases=MappingProxyType({**aliases["tech"], **aliases["skills"]}),
+        education_matcher=PhraseMatcher(aliases["education"])
+    )
+
+
+def load_taxonomy(path: str = TAXONOMY_FILE) -> Taxonomy:
+    """Read and compile a taxonomy file; raises TaxonomyError."""
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw.decode("utf-8"))
+    except (OSError, ValueError) as e:
+        raise TaxonomyError(f"cannot read taxonomy {path}: {e}") from e
+    return compile_taxonomy(data, source=path, checksum=hashlib.sha256(raw).hexdigest()[:12])
+
+
+_lock = threading.Lock()
+_current: Optional[Taxonomy] = None
+# Functions deriving per-taxonomy tables, run on each taxonomy before it becomes current
+_compilers: List[Callable[[Taxonomy], Any]] = []
+
+
+def register_compiler(compile_fn: F) -> F:
+    """
+    Decorator for a function building tables from a Taxonomy (cached per
+    taxonomy, e.g. with lru_cache(maxsize=2) so the current and the
+    incoming one both fit): it is run on every loaded taxonomy before the
+    swap, and its errors fail the load.
+    """
+    _compilers.append(compile_fn)
+    if _current is not None:
+        compile_fn(_current)
+    return compile_fn
+
+
+def _compile_all(taxonomy: Taxonomy) -> Taxonomy:
+    for compile_fn in _compilers:
+        try:
+            compile_fn(taxonomy)
+        except Exception as e:
+            raise TaxonomyError(f"{compile_fn.__module__}.{compile_fn.__name__} failed on taxonomy {taxonomy.version}: {e}") from e
+    return taxonomy
+
+
+def get_taxonomy() -> Taxonomy:
+    """The current taxonomy, loaded from TAXONOMY_FILE on first use."""
+    taxonomy = _current
+    if taxonomy is None:
+        with _lock:
+            if _current is None:
+                _swap(_compile_all(load_taxonomy()))
+            taxonomy = _current
+    return taxonomy
+
+
+def _swap(taxonomy: Taxonomy) -> None:
+    global _current
+    previous, _current = _current, taxonomy
+    logger.info(
+        f"Taxonomy {taxonomy.version} ({taxonomy.entries} entries, {taxonomy.checksum or 'no checksum'}) "
+        f"loaded from {taxonomy.source}" + (f", replacing {previous.version}" if previous else "")
+    )
+
+
+def reload_taxonomy(path: Optional[str] = None) -> Taxonomy:
+    """
+    Compile the taxonomy file again and make it current.
+
+    The new taxonomy is fully compiled before the swap, so readers see
+    either the old or the new one. On TaxonomyError the current taxonomy is
+    kept and the error propagates.
+    """
+    with _lock:
+        try:
+            taxonomy = _compile_all(load_taxonomy(path or (_current.source if _current else TAXONOMY_FILE)))
+        except TaxonomyError as e:
+            taxonomy_reloads_total.inc(outcome="error")
+            logger.error(f"Taxonomy reload failed, keeping {_current.version if _current else 'none'}: {e}")
+            raise
+        _swap(taxonomy)
+        taxonomy_reloads_total.inc(outcome="ok")
+        return taxonomy
+
+
+def _reload_quietly() -> None:
+    try:
+        reload_taxonomy()
+    except TaxonomyError:
+        pass  # logged by reload_taxonomy
+
+
+def install_reload_signal() -> bool:
+    """
+    Reload the taxonomy on SIGHUP, in a background thread so the signal
+    never blocks the event loop. Returns False where that is not possible
+    (no SIGHUP on the platform, or not called from the main thread).
+    """
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(
+        signal.SIGHUP,
+        lambda signum, frame: threading.Thread(target=_reload_quietly, name="taxonomy-reload", daemon=True).start()
+    )
+    logger.info("Taxonomy reloads on SIGHUP")
+    return True
@@ -0,0 +1,3 @@
+"""
+Background job queue for long-running analyses.
+"""
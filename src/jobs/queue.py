@@ -0,0 +1,343 @@
+"""
+Durable, database-backed job queue and worker pool for pipeline runs.
+
+Jobs live in the analysis_jobs table, so they survive restarts and can be
+drained by workers in any process sharing the database. A claimed job is
+leased until its visibility timeout; if the worker dies, the job becomes
+visible again and is retried, up to max_attempts, after which it fails and
+its webhook is called like for any other failure. Outcomes are recorded
+only by the worker still holding the lease (same attempt, still running),
+so a worker that overran its lease cannot finish or reset the job twice.
+Finished jobs keep their result but not their inputs (the resume text).
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import and_
+
+from ..auth.database import SessionLocal
+from ..auth.models import AnalysisJob
+from ..auth.service import HistoryService
+from ..core.config import (
+    JOB_WORKER_COUNT, JOB_MAX_ATTEMPTS, JOB_VISIBILITY_TIMEOUT,
+    JOB_RETRY_BACKOFF, JOB_POLL_INTERVAL, JOB_WEBHOOK_TIMEOUT
+)
+from ..core.pipeline import run_pipeline_async
+from ..core.scheduler import llm_flow
+from .schemas import JobResponse
+from .webhooks import WebhookURLError, check_webhook_url
+
+logger = logging.getLogger(__name__)
+
+# Stored in place of a finished job's inputs, so resume texts are not kept after the job ends
+CLEARED_PAYLOAD = "{}"
+
+
+class JobQueue:
+    """SQLite/SQL-backed queue with leases, retries and webhook callbacks."""
+    
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        worker_count: int = 2,
+        max_attempts: int = 3,
+        visibility_timeout: float = 600.0,
+        retry_backoff: float = 30.0,
+        poll_interval: float = 1.0,
+        webhook_timeout: float = 10.0
+    ):
+        self.session_factory = session_factory
+        self.worker_count = worker_count
+        self.max_attempts = max_attempts
+        self.visibility_timeout = visibility_timeout
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.webhook_timeout = webhook_timeout
+        self._workers: List[asyncio.Task] = []
+    
+    def enqueue(self, payload: Dict[str, Any], user_id: Optional[int] = None, webhook_url: Optional[str] = None) -> AnalysisJob:
+        """Persist a new job and return it."""
+        db = self.session_factory()
+        try:
+            job = AnalysisJob(
+                id=uuid.uuid4().hex,
+                user_id=user_id,
+                status="queued",
+                payload=json.dumps(payload),
+                attempts=0,
+                max_attempts=self.max_attempts,
+                available_at=time.time(),
+                webhook_url=webhook_url
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return job
+        finally:
+            db.close()
+    
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        """Fetch a job by ID."""
+        db = self.session_factory()
+        try:
+            return db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        finally:
+            db.close()
+    
+    def expire_leases(self) -> List[AnalysisJob]:
+        """
+        Fail running jobs whose lease expired on their last attempt, returning them.
+        
+        Like claim, each update is conditional on the row being unchanged, so
+        a job is failed (and its webhook sent) by one worker only.
+        """
+        now = time.time()
+        db = self.session_factory()
+        try:
+            expired = db.query(AnalysisJob.id, AnalysisJob.attempts)\
+                .filter(
+                    AnalysisJob.status == "running",
+                    AnalysisJob.available_at <= now,
+                    AnalysisJob.attempts >= AnalysisJob.max_attempts
+                )\
+                .limit(10)\
+                .all()
+            failed = []
+            for job_id, attempts in expired:
+                updated = db.query(AnalysisJob).filter(self._leased(job_id, attempts)).update({
+                    "status": "failed",
+                    "error": "Job timed out (visibility timeout exceeded)",
+                    "payload": CLEARED_PAYLOAD
+                }, synchronize_session=False)
+                db.commit()
+                if updated:
+                    failed.append(db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first())
+            return failed
+        finally:
+            db.close()
+    
+    def claim(self) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        """
+        Lease the next visible job, returning (job_id, payload, attempt).
+        
+        Visible jobs are queued jobs whose retry delay has passed and running
+        jobs whose lease has expired. The update is conditional on the row
+        being unchanged, so concurrent workers never claim the same job twice.
+        """
+        now = time.time()
+        db = self.session_factory()
+        try:
+            candidates = db.query(AnalysisJob.id, AnalysisJob.status, AnalysisJob.attempts, AnalysisJob.max_attempts)\
+                .filter(AnalysisJob.status.in_(["queued", "running"]), AnalysisJob.available_at <= now)\
+                .order_by(AnalysisJob.available_at)\
+                .limit(10)\
+                .all()
+            
+            for job_id, status, attempts, max_attempts in candidates:
+                unchanged = and_(
+                    AnalysisJob.id == job_id,
+                    AnalysisJob.status == status,
+                    AnalysisJob.attempts == attempts
+                )
+                if status == "running" and attempts >= max_attempts:
+                    continue  # Lease expired on the last attempt: failed by expire_leases
+                
+                updated = db.query(AnalysisJob).filter(unchanged).update({
+                    "status": "running",
+                    "attempts": attempts + 1,
+                    "available_at": now + self.visibility_timeout
+                }, synchronize_session=False)
+                db.commit()
+                if updated:
+                    payload = db.query(AnalysisJob.payload).filter(AnalysisJob.id == job_id).scalar()
+                    return job_id, json.loads(payload), attempts + 1
+            return None
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _leased(job_id: str, attempt: int):
+        """Filter matching a job only while it is still leased by the worker that claimed this attempt."""
+        return and_(AnalysisJob.id == job_id, AnalysisJob.status == "running", AnalysisJob.attempts == attempt)
+    
+    def complete(self, job_id: str, attempt: int, result: Any) -> Optional[AnalysisJob]:
+        """
+        Mark a job as succeeded, storing its result and saving it to history.
+        
+        Returns None (and records nothing) when the worker lost its lease:
+        the job was re-claimed by another worker or already finished.
+        """
+        db = self.session_factory()
+        try:
+            # Read before the update clears it
+            payload = db.query(AnalysisJob.payload).filter(AnalysisJob.id == job_id).scalar()
+            updated = db.query(AnalysisJob).filter(self._leased(job_id, attempt)).update({
+                "status": "succeeded",
+                "result": json.dumps(result.model_dump(exclude_unset=True)),
+                "error": None,
+                "payload": CLEARED_PAYLOAD
+            }, synchronize_session=False)
+            db.commit()
+            if not updated:
+                return None
+            
+            job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            if job.user_id:
+                try:
+                    HistoryService.save_analysis(db, job.user_id, json.loads(payload)["job_text"], result)
+                except Exception as e:
+                    logger.error(f"Failed to save job {job_id} to history: {str(e)}")
+                    db.rollback()
+            
+            db.refresh(job)
+            return job
+        finally:
+            db.close()
+    
+    def fail(self, job_id: str, attempt: int, error: str) -> Optional[AnalysisJob]:
+        """
+        Record a failed attempt, re-queueing the job with backoff while attempts remain.
+        
+        Returns None (and records nothing) when the worker lost its lease.
+        """
+        db = self.session_factory()
+        try:
+            max_attempts = db.query(AnalysisJob.max_attempts).filter(AnalysisJob.id == job_id).scalar()
+            if max_attempts is not None and attempt < max_attempts:
+                changes = {
+                    "status": "queued",
+                    "error": error,
+                    "available_at": time.time() + self.retry_backoff * (2 ** (attempt - 1))
+                }
+            else:
+                changes = {"status": "failed", "error": error, "payload": CLEARED_PAYLOAD}
+            updated = db.query(AnalysisJob).filter(self._leased(job_id, attempt)).update(changes, synchronize_session=False)
+            db.commit()
+            if not updated:
+                return None
+            return db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+        finally:
+            db.close()
+    
+    def _set_webhook_status(self, job_id: str, webhook_status: str) -> None:
+        db = self.session_factory()
+        try:
+            db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(
+                {"webhook_status": webhook_status}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+    
+    async def _notify(self, job: AnalysisJob) -> None:
+        """POST the final job state to its webhook URL, retrying a few times (redirects are not followed)."""
+        body = job_to_response(job).model_dump(mode="json")
+        async with httpx.AsyncClient(timeout=self.webhook_timeout, follow_redirects=False) as client:
+            for attempt in range(3):
+                try:
+                    # Checked again at delivery: the host may resolve elsewhere than when the job was queued
+                    await asyncio.to_thread(check_webhook_url, job.webhook_url)
+                    response = await client.post(job.webhook_url, json=body)
+                    if response.status_code < 300:
+                        await asyncio.to_thread(self._set_webhook_status, job.id, "delivered")
+                        return
+                    logger.warning(f"Webhook for job {job.id} returned {response.status_code}")
+                except WebhookURLError as e:
+                    logger.warning(f"Webhook for job {job.id} refused: {str(e)}")
+                    break
+                except Exception as e:
+                    logger.warning(f"Webhook for job {job.id} failed: {str(e)}")
+                await asyncio.sleep(2 ** attempt)
+        await asyncio.to_thread(self._set_webhook_status, job.id, "failed")
+    
+    async def process(self, job_id: str, payload: Dict[str, Any], attempt: int) -> None:
+        """Run the pipeline for one claimed job and record the outcome."""
+        logger.info(f"Processing job {job_id} (attempt {attempt})")
+        # Each job is its own flow for the LLM scheduler's fair queueing
+        llm_flow.set(f"job-{job_id}")
+        try:
+            result = await run_pipeline_async(
+                payload["resume_text"], payload["job_text"], None, None, payload["model"],
+                include_ats_validation=payload.get("include_ats", True),
+                fields=payload.get("fields"),
+                mode=payload.get("mode", "standard"),
+                models=payload.get("models")
+            )
+            job = await asyncio.to_thread(self.complete, job_id, attempt, result)
+            if job is not None:
+                logger.info(f"Job {job_id} succeeded - Score: {result.score}")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed on attempt {attempt}: {str(e)}")
+            job = await asyncio.to_thread(self.fail, job_id, attempt, str(e))
+        
+        if job is None:
+            # Ran past its visibility timeout: another worker owns the job now
+            logger.warning(f"Job {job_id} attempt {attempt} lost its lease; discarding its outcome")
+            return
+        if job.status in ("succeeded", "failed") and job.webhook_url:
+            await self._notify(job)
+    
+    async def _worker(self, index: int) -> None:
+        """Claim and process jobs until cancelled."""
+        while True:
+            try:
+                for job in await asyncio.to_thread(self.expire_leases):
+                    logger.error(f"Job {job.id} timed out on its last attempt")
+                    if job.webhook_url:
+                        await self._notify(job)
+                claimed = await asyncio.to_thread(self.claim)
+                if claimed is None:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                await self.process(*claimed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} error: {str(e)}", exc_info=True)
+                await asyncio.sleep(self.poll_interval)
+    
+    def start(self) -> None:
+        """Start the worker pool on the running event loop."""
+        if self._workers:
+            return
+        self._workers = [asyncio.ensure_future(self._worker(i)) for i in range(self.worker_count)]
+        if self._workers:
+            logger.info(f"Started {len(self._workers)} job workers")
+    
+    async def stop(self) -> None:
+        """Cancel the worker pool; leased jobs are retried once their lease expires."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+def job_to_response(job: AnalysisJob) -> JobResponse:
+    """Serialize a job for API responses and webhooks."""
+    return JobResponse(
+        job_id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        result=json.loads(job.result) if job.result else None,
+        error=job.error if job.status == "failed" else None,
+        webhook_status=job.webhook_status,
+        created_at=job.created_at,
+        updated_at=job.updated_at
+    )
+
+
+# Process-wide queue instance
+job_queue = JobQueue(
+    worker_count=JOB_WORKER_COUNT,
+    max_attempts=JOB_MAX_ATTEMPTS,
+    visibility_timeout=JOB_VISIBILITY_TIMEOUT,
+    retry_backoff=JOB_RETRY_BACKOFF,
+    poll_interval=JOB_POLL_INTERVAL,
+    webhook_timeout=JOB_WEBHOOK_TIMEOUT
+)
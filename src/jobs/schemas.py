@@ -0,0 +1,18 @@
+"""
+Pydantic schemas for background jobs.
+"""
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+class JobResponse(BaseModel):
+    """Schema for job status responses and webhook payloads."""
+    job_id: str
+    status: str  # queued, running, succeeded, failed
+    attempts: int
+    max_attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    webhook_status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
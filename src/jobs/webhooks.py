@@ -0,0 +1,59 @@
+"""
+Webhook URL checks for job callbacks.
+
+POST /jobs is unauthenticated, so a webhook URL must not let callers make
+the server POST to itself or to its network (localhost, private ranges,
+cloud metadata addresses). A URL is accepted when its host is listed in
+WEBHOOK_ALLOWED_HOSTS, or, when that list is empty, when every address the
+host resolves to is a public one. URLs are checked when the job is queued
+and again right before each delivery, since DNS may have changed since.
+Deliveries never follow redirects.
+"""
+import ipaddress
+import socket
+from typing import List, Union
+from urllib.parse import urlsplit
+
+from ..core.config import WEBHOOK_ALLOWED_HOSTS
+
+
+class WebhookURLError(ValueError):
+    """A webhook URL the server refuses to call."""
+
+
+def _addresses(host: str, port: int) -> List[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]:
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        raise WebhookURLError(f"webhook_url host {host!r} does not resolve") from e
+    addresses = []
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        # ::ffff:127.0.0.1 and friends are checked as the IPv4 address they map to
+        addresses.append(getattr(address, "ipv4_mapped", None) or address)
+    return addresses
+
+
+def check_webhook_url(url: str) -> None:
+    """
+    Raise WebhookURLError unless url is an http(s) URL the server may POST to.
+
+    Resolves the host (blocking), so call it from a thread in async code.
+    """
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError as e:
+        raise WebhookURLError(f"webhook_url is not a valid URL: {e}") from e
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise WebhookURLError("webhook_url must be an http(s) URL")
+    host = parts.hostname.lower().rstrip(".")
+
+    if WEBHOOK_ALLOWED_HOSTS:
+        if host not in WEBHOOK_ALLOWED_HOSTS:
+            raise WebhookURLError(f"webhook_url host {host!r} is not in WEBHOOK_ALLOWED_HOSTS")
+        return
+
+    for address in _addresses(host, port):
+        if not address.is_global or address.is_multicast:
+            raise WebhookURLError(f"webhook_url host {host!r} resolves to a non-public address ({address})")
@@ -0,0 +1,319 @@
+"""
+Rule-based extraction of job descriptions and CVs, without any LLM call.
+
+Builds JDStruct and CVStruct straight from the text using the skill
+taxonomy and DATE_RANGE: a PhraseMatcher over every known spelling finds
+the skills in a single pass, section headers split the text into
+responsibilities / requirements / achievements blocks and years of
+experience come from merged date ranges. Less thorough than the LLM parsers,
+but deterministic and fast enough for pre-screening and offline use.
+"""
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+
+from ..core.models import JDStruct, CVStruct
+from ..core.config import DATE_RANGE
+from ..core.taxonomy import PhraseMatcher, Taxonomy, get_taxonomy, register_compiler
+from .parsers import _normalize_jd, _normalize_cv
+
+
+SOFT_SKILLS = {
+    "communication": "communication", "leadership": "leadership", "teamwork": "teamwork",
+    "team player": "teamwork", "problem solving": "problem solving", "problem-solving": "problem solving",
+    "collaboration": "collaboration", "autonomy": "autonomy", "autonomie": "autonomy",
+    "adaptability": "adaptability", "time management": "time management", "mentoring": "mentoring",
+    "esprit d'équipe": "teamwork", "travail en équipe": "teamwork", "rigueur": "rigor"
+}
+
+SPOKEN_LANGUAGES = {
+    "english": "English", "anglais": "English", "french": "French", "français": "French",
+    "spanish": "Spanish", "espagnol": "Spanish", "german": "German", "allemand": "German",
+    "arabic": "Arabic", "arabe": "Arabic", "italian": "Italian", "italien": "Italian",
+    "portuguese": "Portuguese", "portugais": "Portuguese", "chinese": "Chinese", "mandarin": "Chinese",
+    "japanese": "Japanese", "japonais": "Japanese", "dutch": "Dutch", "néerlandais": "Dutch"
+}
+
+# Section headers, matched against whole (short) lines
+SECTION_HEADERS = {
+    "responsibilities": r"responsibilities|key responsibilities|duties|what you('ll| will) do|your role|the role|missions?|vos missions|your missions",
+    "requirements": r"requirements|qualifications|must[- ]haves?|what we('re| are) looking for|required skills|profil( recherché)?|compétences requises|your profile|who you are",
+    "nice_to_have": r"nice[- ]to[- ]haves?|bonus( points)?|preferred( qualifications| skills)?|a plus|pluses|souhaité|atouts?",
+    "experience": r"(professional |work )?experiences?|employment( history)?|work history|expériences?( professionnelles?)?|parcours",
+    "achievements": r"achievements|accomplishments|key achievements|réalisations",
+    "education": r"education|academic background|formations?|diplômes?|études",
+    "skills": r"(technical )?skills|compétences( techniques)?|tech(nical)? stack|technologies",
+    "languages": r"languages|langues",
+    "projects": r"projects|projets",
+    "other": r"summary|profile|about( me| us)?|objective|interests|hobbies|certifications?|references|contact|benefits|what we offer|avantages",
+}
+_HEADER = re.compile(
+    r"^\s*#*\s*(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in SECTION_HEADERS.items()) + r")\s*:?\s*$",
+    re.IGNORECASE
+)
+_INLINE_HEADER = re.compile(
+    r"^\s*(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in SECTION_HEADERS.items()) + r")\s*:\s*(?P<rest>.+)$",
+    re.IGNORECASE
+)
+_BULLET = re.compile(r"^\s*(?:[-*+>]|\d{1,2}[.)])\s+(.*\S)")
+_NICE_HINT = re.compile(r"\b(nice to have|nice-to-have|bonus|a plus|preferred|is a plus|souhaité|apprécié)\b", re.IGNORECASE)
+_TITLE_LINE = re.compile(r"^\s*(?:job title|title|position|poste|intitulé)\s*[:\-]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_YEARS_REQUIRED = re.compile(r"(\d{1,2})\s*\+?\s*(?:years?|yrs?|ans|années)", re.IGNORECASE)
+_YEARS_STATED = re.compile(
+    r"(\d{1,2}(?:[.,]\d)?)\s*\+?\s*(?:years?|yrs?|ans|années)\s+(?:of\s+|d['’]\s*)?(?:professional\s+)?(?:experience|expérience)",
+    re.IGNORECASE
+)
+_ACHIEVEMENT_HINT = re.compile(
+    r"\d+\s*%|\b\d+(?:[.,]\d+)?\s*[kKmMxX]\b|\b(increased|reduced|improved|decreased|cut|saved|grew|launched|delivered|led|won|awarded|"
+    r"augment|réduit|amélior|livré|lancé)\w*",
+    re.IGNORECASE
+)
+_DATE_RANGE = re.compile(DATE_RANGE, re.IGNORECASE)
+# DATE_RANGE needs a month on the end date; also accept "2019 - 2021" and "Jan 2019 - Mar 2021"
+_MONTHS = {
+    "jan": 1, "feb": 2, "fév": 2, "fev": 2, "mar": 3, "apr": 4, "avr": 4, "may": 5, "mai": 5, "jun": 6, "juin": 6,
+    "jul": 7, "juil": 7, "aug": 8, "aoû": 8, "aou": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12, "déc": 12
+}
+_MONTH_NAME = r"(?:jan|feb|fév|fev|mar|apr|avr|may|mai|jun|juin|jul|juil|aug|aoû|aou|sep|oct|nov|dec|déc)[a-zéû]*\.?"
+_EXTRA_DATE_RANGE = re.compile(
+    rf"\b((?:{_MONTH_NAME}\s+)?(?:19|20)\d{{2}})\s*-\s*((?:{_MONTH_NAME}\s+)?(?:19|20)\d{{2}}\b|present\b|présent\b|now\b|current\b|aujourd'hui)",
+    re.IGNORECASE
+)
+
+
+def _build_skill_table(taxonomy: Taxonomy) -> Dict[str, str]:
+    """Map every known spelling of a technical skill to its canonical name."""
+    tech = taxonomy.aliases["tech"]
+    table = dict(tech)
+    for base, variants in taxonomy.skill_variants.items():
+        canonical = tech.get(base, base)
+        for variant in variants:
+            table.setdefault(variant, canonical)
+    return table
+
+
+class _Tables(NamedTuple):
+    """Term tables and their matchers, compiled once per taxonomy."""
+    skills: Dict[str, str]
+    skill_matcher: PhraseMatcher
+    competencies: Dict[str, str]
+    competency_matcher: PhraseMatcher
+    education_matcher: PhraseMatcher
+    seniority: Mapping[str, str]
+    seniority_matcher: PhraseMatcher
+    # Aliases that are also everyday words or abbreviations; they only count when
+    # not written all-lowercase (e.g. "REST" or "Node", but not "the rest")
+    ambiguous: FrozenSet[str]
+
+
+@register_compiler
+@lru_cache(maxsize=2)
+def _tables(taxonomy: Taxonomy) -> _Tables:
+    """The fast parser's term tables for a taxonomy."""
+    skills = _build_skill_table(taxonomy)
+    competencies = {**taxonomy.aliases["skills"], **SOFT_SKILLS}
+    education = set(taxonomy.aliases["education"]) | {v for variants in taxonomy.education_variants.values() for v in variants}
+    return _Tables(
+        skills=skills,
+        skill_matcher=PhraseMatcher(skills),
+        competencies=competencies,
+        competency_matcher=PhraseMatcher(competencies),
+        education_matcher=PhraseMatcher(education),
+        seniority=taxonomy.aliases["seniority"],
+        seniority_matcher=PhraseMatcher(taxonomy.aliases["seniority"]),
+        ambiguous=taxonomy.ambiguous_terms
+    )
+
+
+_LANGUAGE_MATCHER = PhraseMatcher(SPOKEN_LANGUAGES)
+
+
+def _find_terms(matcher: PhraseMatcher, table: Mapping[str, str], text: str, ambiguous: FrozenSet[str] = frozenset()) -> List[str]:
+    """Canonical names of the table terms found in text, in order of first appearance."""
+    found, seen = [], set()
+    for raw in matcher.find(text or ""):
+        key = raw.lower()
+        if key in ambiguous and raw.islower():
+            continue
+        canonical = table.get(key, key)
+        if canonical not in seen:
+            seen.add(canonical)
+            found.append(canonical)
+    return found
+
+
+def _split_sections(text: str) -> Dict[str, List[str]]:
+    """Group lines under the section header that precedes them ("preamble" before any header)."""
+    sections: Dict[str, List[str]] = {"preamble": []}
+    current = "preamble"
+    for line in (text or "").splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if len(stripped) <= 60:
+            m = _HEADER.match(stripped)
+            if m:
+                current = next(name for name in SECTION_HEADERS if m.group(name))
+                sections.setdefault(current, [])
+                continue
+            m = _INLINE_HEADER.match(stripped)
+            if m:
+                current = next(name for name in SECTION_HEADERS if m.group(name))
+                sections.setdefault(current, []).append(m.group("rest").strip())
+                continue
+        sections.setdefault(current, []).append(stripped)
+    return sections
+
+
+def _bullets(lines: List[str]) -> List[str]:
+    """Bullet items from lines, or the lines themselves when none are bulleted."""
+    items = [m.group(1).strip() for m in map(_BULLET.match, lines) if m]
+    return items or [line for line in lines if len(line.split()) >= 3]
+
+
+def _month_index(value: str, is_end: bool, today: date) -> Optional[int]:
+    """Convert '03/2020', 'Mar 2020', '2020' or 'Present' to a month count."""
+    value = value.strip().lower()
+    if value.startswith(("present", "présent", "now", "current", "aujourd")):
+        return today.year * 12 + today.month - 1
+    year = re.search(r"(19|20)\d{2}", value)
+    if not year:
+        return None
+    month = None
+    numeric = re.match(r"(\d{1,2})[/.-]", value)
+    if numeric:
+        month = int(numeric.group(1))
+    else:
+        name = re.match(r"[a-zéû]+", value)
+        if name:
+            month = next((n for prefix, n in _MONTHS.items() if name.group(0).startswith(prefix)), None)
+    if not month or not 1 <= month <= 12:
+        # A bare year covers the whole year
+        month = 12 if is_end else 1
+    return int(year.group(0)) * 12 + month - 1
+
+
+def years_from_date_ranges(text: str, today: Optional[date] = None) -> float:
+    """Total years covered by the date ranges in text, counting overlapping periods once."""
+    today = today or date.today()
+    intervals: List[Tuple[int, int]] = []
+    for pattern in (_DATE_RANGE, _EXTRA_DATE_RANGE):
+        for m in pattern.finditer(text or ""):
+            start = _month_index(m.group(1), False, today)
+            end = _month_index(m.group(2), True, today)
+            if start is not None and end is not None and end >= start:
+                intervals.append((start, end + 1))
+
+    total, current_start, current_end = 0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return round(total / 12, 1)
+
+
+def _seniority(tables: _Tables, title: str, text: str) -> str:
+    """Seniority from keywords (title first) or the years of experience asked for."""
+    for source in (title, text):
+        levels = _find_terms(tables.seniority_matcher, tables.seniority, source, tables.ambiguous)
+        if levels:
+            return levels[0]
+    years = [int(y) for y in _YEARS_REQUIRED.findall(text or "") if int(y) <= 30]
+    if years:
+        required = min(years)
+        return "junior" if required < 2 else "mid" if required < 5 else "senior"
+    return "mid"
+
+
+def fast_parse_jd(job_text: str) -> JDStruct:
+    """Extract a job description without an LLM."""
+    tables = _tables(get_taxonomy())
+    sections = _split_sections(job_text)
+
+    m = _TITLE_LINE.search(job_text or "")
+    if m:
+        title = m.group(1).strip()
+    else:
+        title = next((line for line in sections["preamble"] if not _BULLET.match(line)), "")
+    title = title[:100]
+
+    # Skills in the nice-to-have section, or on lines flagged as optional, are nice to have
+    nice_lines = list(sections.get("nice_to_have", []))
+    must_lines = []
+    for name, lines in sections.items():
+        if name == "nice_to_have":
+            continue
+        for line in lines:
+            (nice_lines if _NICE_HINT.search(line) else must_lines).append(line)
+    must = _find_terms(tables.skill_matcher, tables.skills, "\n".join(must_lines), tables.ambiguous)
+    nice = [s for s in _find_terms(tables.skill_matcher, tables.skills, "\n".join(nice_lines), tables.ambiguous) if s not in must]
+
+    responsibilities = _bullets(sections.get("responsibilities", []))
+    if not responsibilities:
+        # No header: bullet points outside the requirement sections are usually duties
+        responsibilities = [
+            m.group(1).strip()
+            for name in ("preamble", "other")
+            for m in map(_BULLET.match, sections.get(name, [])) if m
+        ]
+
+    # Keywords: skills ordered by how often the posting mentions them
+    counts: Dict[str, int] = {}
+    for raw in tables.skill_matcher.find(job_text or ""):
+        canonical = tables.skills.get(raw.lower())
+        if canonical:
+            counts[canonical] = counts.get(canonical, 0) + 1
+    keywords = sorted(must + nice, key=lambda s: -counts.get(s, 0))[:12]
+
+    jd = JDStruct(
+        title=title or "unknown",
+        seniority=_seniority(tables, title, job_text),
+        must_have_skills=must,
+        nice_to_have_skills=nice,
+        responsibilities=responsibilities[:10],
+        keywords=keywords
+    )
+    return _normalize_jd(jd)
+
+
+def fast_parse_cv(resume_text: str) -> CVStruct:
+    """Extract a candidate profile without an LLM."""
+    tables = _tables(get_taxonomy())
+    sections = _split_sections(resume_text)
+
+    experience_text = "\n".join(sections.get("experience", [])) or resume_text or ""
+    years = years_from_date_ranges(experience_text)
+    stated = [float(y.replace(",", ".")) for y in _YEARS_STATED.findall(resume_text or "")]
+    if stated:
+        years = max(years, max(stated))
+
+    achievements = _bullets(sections.get("achievements", []))
+    if not achievements:
+        # Quantified or result-oriented bullets from the experience section
+        achievements = [
+            m.group(1).strip()
+            for m in map(_BULLET.match, sections.get("experience", [])) if m and _ACHIEVEMENT_HINT.search(m.group(1))
+        ]
+
+    education_lines = sections.get("education") or (resume_text or "").splitlines()
+    education = []
+    for line in education_lines:
+        line = line.strip(" -*\t")
+        if _find_terms(tables.education_matcher, {}, line, tables.ambiguous):
+            education.append(line[:150])
+
+    cv = CVStruct(
+        years_of_experience=min(50.0, years),
+        tech_stack=_find_terms(tables.skill_matcher, tables.skills, resume_text, tables.ambiguous),
+        soft_skills=_find_terms(tables.competency_matcher, tables.competencies, resume_text, tables.ambiguous),
+        achievements=achievements[:10],
+        education=education,
+        languages=_find_terms(_LANGUAGE_MATCHER, SPOKEN_LANGUAGES, resume_text, tables.ambiguous)
+    )
+    return _normalize_cv(cv)
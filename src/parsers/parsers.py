@@ -1,16 +1,23 @@
 """
 Parsing logic for job descriptions and CVs using LLM.
 """
-from typing import List
+from typing import List, Tuple
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
 
-from ..core.models import JDStruct, CVStruct
-from ..core.config import ALIASES
+from ..core.models import JDStruct, CVStruct, JDCVStruct
+from ..core.cache import llm_cache
+from ..core.llm import get_llm
+from ..core.structured import structured_chain, format_instructions
+from ..core.taxonomy import get_taxonomy
 from ..utils.utils import normalize_list, norm_one
 
 
+# Bump these whenever a prompt changes so cached extractions are invalidated
+JD_PROMPT_VERSION = "1"
+CV_PROMPT_VERSION = "1"
+COMBINED_PROMPT_VERSION = "1"
+
 # Job Description Parser
 JD_parser = PydanticOutputParser(pydantic_object=JDStruct)
 JD_prompt = ChatPromptTemplate.from_template("""
@@ -31,7 +38,7 @@ Rules:
 - Nice-to-have skills: ONLY specific technical skills, optional technologies (e.g., "GraphQL", "Kubernetes", "MongoDB"). NO full sentences.
 - Responsibilities: action sentences, 3–10 items.
 - Extract 6–12 specific technical keywords for ATS (e.g., "JavaScript", "Node.js", "PostgreSQL").
-""").partial(format_instructions=JD_parser.get_format_instructions())
+""").partial(format_instructions=format_instructions(JDStruct, JD_parser.get_format_instructions()))
 
 
 def clean_skills_list(skills_list: List[str]) -> List[str]:
@@ -66,32 +73,52 @@ def clean_skills_list(skills_list: List[str]) -> List[str]:
     return cleaned
 
 
-def parse_jd(job_text: str, model: str) -> JDStruct:
-    """Parse job description text into structured format."""
-    llm = ChatOpenAI(model=model, temperature=0)
-    chain = JD_prompt | llm | JD_parser
-    jd = chain.invoke({"job_text": job_text})
-    
-    # Normalize the parsed data
-    tech_map, skills_map = ALIASES["tech"], ALIASES["skills"]
-    jd.title = norm_one(jd.title, ALIASES["roles"]) or jd.title
-    jd.seniority = ALIASES["seniority"].get(jd.seniority.lower(), jd.seniority.lower())
+def _normalize_jd(jd: JDStruct) -> JDStruct:
+    """Normalize a freshly parsed job description in place."""
+    taxonomy = get_taxonomy()
+    aliases = taxonomy.aliases
+    jd.title = norm_one(jd.title, aliases["roles"]) or jd.title
+    jd.seniority = aliases["seniority"].get(jd.seniority.lower(), jd.seniority.lower())
     
     # Clean and normalize skills lists
     jd.must_have_skills = clean_skills_list(jd.must_have_skills)
-    jd.must_have_skills = normalize_list(jd.must_have_skills, {**tech_map, **skills_map})
+    jd.must_have_skills = normalize_list(jd.must_have_skills, taxonomy.skill_aliases)
     
     jd.nice_to_have_skills = clean_skills_list(jd.nice_to_have_skills)
-    jd.nice_to_have_skills = normalize_list(jd.nice_to_have_skills, {**tech_map, **skills_map})
+    jd.nice_to_have_skills = normalize_list(jd.nice_to_have_skills, taxonomy.skill_aliases)
     
     jd.keywords = clean_skills_list(jd.keywords)
-    jd.keywords = normalize_list(jd.keywords, {**tech_map, **skills_map})
+    jd.keywords = normalize_list(jd.keywords, taxonomy.skill_aliases)
     
     jd.responsibilities = [s.strip() for s in jd.responsibilities if s and s.strip()]
     
     return jd
 
 
+def parse_jd(job_text: str, model: str) -> JDStruct:
+    """Parse job description text into structured format."""
+    key = llm_cache.make_key("jd", job_text, model, JD_PROMPT_VERSION)
+    jd = llm_cache.get(key, JDStruct)
+    if jd is None:
+        llm = get_llm(model)
+        chain = structured_chain(JD_prompt, llm, JDStruct)
+        jd = chain.invoke({"job_text": job_text})
+        llm_cache.set(key, jd)
+    return _normalize_jd(jd)
+
+
+async def aparse_jd(job_text: str, model: str) -> JDStruct:
+    """Async variant of parse_jd."""
+    key = llm_cache.make_key("jd", job_text, model, JD_PROMPT_VERSION)
+    jd = await llm_cache.aget(key, JDStruct)
+    if jd is None:
+        llm = get_llm(model)
+        chain = structured_chain(JD_prompt, llm, JDStruct)
+        jd = await chain.ainvoke({"job_text": job_text})
+        await llm_cache.aset(key, jd)
+    return _normalize_jd(jd)
+
+
 # CV Parser
 CV_parser = PydanticOutputParser(pydantic_object=CVStruct)
 CV_prompt = ChatPromptTemplate.from_template("""
@@ -114,19 +141,15 @@ CRITICAL RULES:
 - languages: as explicitly present.
 - ABSOLUTELY NO INVENTION. If information is not explicitly stated, use empty list or 0.
 - DO NOT suggest or recommend additional education that is not mentioned in the resume.
-""").partial(format_instructions=CV_parser.get_format_instructions())
+""").partial(format_instructions=format_instructions(CVStruct, CV_parser.get_format_instructions()))
 
 
-def parse_cv(resume_text: str, model: str) -> CVStruct:
-    """Parse resume text into structured format."""
-    llm = ChatOpenAI(model=model, temperature=0)
-    chain = CV_prompt | llm | CV_parser
-    cv = chain.invoke({"resume_text": resume_text})
-    
-    # Normalize the parsed data
-    tech_map, skills_map, education_map = ALIASES["tech"], ALIASES["skills"], ALIASES["education"]
-    cv.tech_stack = normalize_list(cv.tech_stack, {**tech_map, **skills_map})
-    cv.soft_skills = normalize_list(cv.soft_skills, skills_map)
+def _normalize_cv(cv: CVStruct) -> CVStruct:
+    """Normalize a freshly parsed CV in place."""
+    taxonomy = get_taxonomy()
+    education_map = taxonomy.aliases["education"]
+    cv.tech_stack = normalize_list(cv.tech_stack, taxonomy.skill_aliases)
+    cv.soft_skills = normalize_list(cv.soft_skills, taxonomy.aliases["skills"])
     
     # Normalize education with robust approach and avoid duplicates
     normalized_education = []
@@ -137,20 +160,16 @@ def parse_cv(resume_text: str, model: str) -> CVStruct:
             continue
             
         edu_clean = edu.strip()
-        edu_lower = edu_clean.lower()
-        
-        # Look for degree abbreviations in the text
-        found_normalization = False
-        for abbrev, full_name in education_map.items():
-            if abbrev.lower() in edu_lower:
-                # Check if we already have this normalized degree
-                if full_name not in seen_degrees:
-                    normalized_education.append(full_name)
-                    seen_degrees.add(full_name)
-                found_normalization = True
-                break
         
-        if not found_normalization:
+        # The first degree name or abbreviation the entry mentions, as whole words
+        found = taxonomy.education_matcher.find(edu_clean)
+        if found:
+            full_name = education_map[found[0].lower()]
+            # Check if we already have this normalized degree
+            if full_name not in seen_degrees:
+                normalized_education.append(full_name)
+                seen_degrees.add(full_name)
+        else:
             # If no abbreviation found, keep original if not already present
             if edu_clean not in seen_degrees:
                 normalized_education.append(edu_clean)
@@ -161,3 +180,93 @@ def parse_cv(resume_text: str, model: str) -> CVStruct:
     
     return cv
 
+
+def parse_cv(resume_text: str, model: str) -> CVStruct:
+    """Parse resume text into structured format."""
+    key = llm_cache.make_key("cv", resume_text, model, CV_PROMPT_VERSION)
+    cv = llm_cache.get(key, CVStruct)
+    if cv is None:
+        llm = get_llm(model)
+        chain = structured_chain(CV_prompt, llm, CVStruct)
+        cv = chain.invoke({"resume_text": resume_text})
+        llm_cache.set(key, cv)
+    return _normalize_cv(cv)
+
+
+async def aparse_cv(resume_text: str, model: str) -> CVStruct:
+    """Async variant of parse_cv."""
+    key = llm_cache.make_key("cv", resume_text, model, CV_PROMPT_VERSION)
+    cv = await llm_cache.aget(key, CVStruct)
+    if cv is None:
+        llm = get_llm(model)
+        chain = structured_chain(CV_prompt, llm, CVStruct)
+        cv = await chain.ainvoke({"resume_text": resume_text})
+        await llm_cache.aset(key, cv)
+    return _normalize_cv(cv)
+
+
+# Combined Parser (job description and CV in one call)
+Combined_parser = PydanticOutputParser(pydantic_object=JDCVStruct)
+Combined_prompt = ChatPromptTemplate.from_template("""
+You are an assistant that extracts structured information from BOTH a job description and a resume in one pass.
+Return ONLY valid JSON according to the schema below, with the job description under "jd" and the candidate profile under "cv". No commentary.
+
+Job description:
+---
+{job_text}
+---
+
+Resume:
+---
+{resume_text}
+---
+
+Schema:
+{format_instructions}
+
+Rules for "jd":
+- Seniority mapping: junior/entry-level → junior; confirmé/intermédiaire/mid-level → mid; senior/lead/principal/expert/staff → senior.
+- Must-have skills: ONLY specific technical skills, programming languages, frameworks, tools (e.g., "Python", "React", "AWS", "Docker"). NO full sentences or requirements.
+- Nice-to-have skills: ONLY specific technical skills, optional technologies (e.g., "GraphQL", "Kubernetes", "MongoDB"). NO full sentences.
+- Responsibilities: action sentences, 3–10 items.
+- Extract 6–12 specific technical keywords for ATS (e.g., "JavaScript", "Node.js", "PostgreSQL").
+
+Rules for "cv" (use ONLY facts explicitly present in the resume, never the job description):
+- years_of_experience: infer from roles/dates if possible, else approximate conservatively.
+- tech_stack: technologies, frameworks, tools, databases, clouds EXACTLY as mentioned.
+- soft_skills: concise set if explicitly mentioned.
+- achievements: keep only bullets already present; quantify if numbers exist.
+- education: extract ONLY degrees, certifications, and educational qualifications EXPLICITLY mentioned. Include exact abbreviations like B.S., M.S., MBA, PhD, etc. DO NOT infer or suggest missing education.
+- languages: as explicitly present.
+- ABSOLUTELY NO INVENTION. If information is not explicitly stated, use empty list or 0.
+""").partial(format_instructions=format_instructions(JDCVStruct, Combined_parser.get_format_instructions()))
+
+
+def _combined_cache_key(job_text: str, resume_text: str, model: str) -> str:
+    """Cache key for a combined extraction; the separator keeps the two texts apart."""
+    return llm_cache.make_key("jd_cv", f"{job_text}\x1e{resume_text}", model, COMBINED_PROMPT_VERSION)
+
+
+def parse_jd_cv(job_text: str, resume_text: str, model: str) -> Tuple[JDStruct, CVStruct]:
+    """Parse job description and resume text with a single LLM call."""
+    key = _combined_cache_key(job_text, resume_text, model)
+    parsed = llm_cache.get(key, JDCVStruct)
+    if parsed is None:
+        llm = get_llm(model)
+        chain = structured_chain(Combined_prompt, llm, JDCVStruct)
+        parsed = chain.invoke({"job_text": job_text, "resume_text": resume_text})
+        llm_cache.set(key, parsed)
+    return _normalize_jd(parsed.jd), _normalize_cv(parsed.cv)
+
+
+async def aparse_jd_cv(job_text: str, resume_text: str, model: str) -> Tuple[JDStruct, CVStruct]:
+    """Async variant of parse_jd_cv."""
+    key = _combined_cache_key(job_text, resume_text, model)
+    parsed = await llm_cache.aget(key, JDCVStruct)
+    if parsed is None:
+        llm = get_llm(model)
+        chain = structured_chain(Combined_prompt, llm, JDCVStruct)
+        parsed = await chain.ainvoke({"job_text": job_text, "resume_text": resume_text})
+        await llm_cache.aset(key, parsed)
+    return _normalize_jd(parsed.jd), _normalize_cv(parsed.cv)
+
@@ -1,6 +1,7 @@
 """
 Utility functions for text processing and normalization.
 """
+import io
 import re
 from typing import List, Dict, Optional, Tuple, Any
 from pypdf import PdfReader
@@ -8,9 +9,9 @@ from docx import Document as DocxDocument
 from langdetect import detect
 
 from ..core.config import (
-    BULLET_PATTERN, MULTISPACE, MULTINEWLINE, DASHES, DATE_RANGE,
-    ALIASES, SKILL_VARIANTS, EDUCATION_VARIANTS
+    BULLET_PATTERN, MULTISPACE, MULTINEWLINE, DASHES, DATE_RANGE
 )
+from ..core.resume_index import get_resume_index
 
 
 def norm_one(term: str, maps: Dict[str, str]) -> str:
@@ -60,6 +61,18 @@ def load_text_auto(path: str) -> str:
     return load_text_from_txt(path)
 
 
+def load_text_from_bytes(data: bytes, filename: str) -> str:
+    """Load text content from in-memory file bytes, using the filename to detect the type."""
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        reader = PdfReader(io.BytesIO(data))
+        return "\n".join((p.extract_text() or "") for p in reader.pages)
+    if name.endswith(".docx"):
+        doc = DocxDocument(io.BytesIO(data))
+        return "\n".join(p.text for p in doc.paragraphs)
+    return data.decode("utf-8", errors="ignore")
+
+
 def clean_text(raw: str) -> str:
     """Clean and normalize text content."""
     t = raw
@@ -92,25 +105,10 @@ def normalize_inputs(
 
 
 def contains_skill(text: str, skill: str) -> bool:
-    """Check if a skill is present in the text with improved logic."""
+    """Check if a skill (or one of its taxonomy variants) appears in the text as whole words."""
     if not text or not skill:
         return False
-    
-    text_lower = text.lower()
-    skill_lower = skill.lower()
-    
-    # Direct check
-    if skill_lower in text_lower:
-        return True
-    
-    # Check variants
-    for base_skill, variants in SKILL_VARIANTS.items():
-        if base_skill in skill_lower:
-            for variant in variants:
-                if variant in text_lower:
-                    return True
-    
-    return False
+    return get_resume_index(text).contains_skill(skill)
 
 
 def validate_education_extraction(cv_education: List[str], original_resume_text: str) -> List[str]:
@@ -119,26 +117,12 @@ def validate_education_extraction(cv_education: List[str], original_resume_text:
     if not cv_education:
         return flags
     
-    original_lower = original_resume_text.lower()
-    
+    index = get_resume_index(original_resume_text or "")
     for edu in cv_education:
-        edu_lower = edu.lower()
-        # Check if the extracted degree is mentioned in the original CV
-        if edu_lower not in original_lower:
-            # Check common variants with stricter logic
-            found_variant = False
-            for full_name, variants in EDUCATION_VARIANTS.items():
-                if full_name in edu_lower:
-                    # Check that one of the exact variants is present
-                    for variant in variants:
-                        if variant in original_lower:
-                            found_variant = True
-                            break
-                    if found_variant:
-                        break
-            
-            if not found_variant:
-                flags.append(f"education_hallucination: '{edu}' not found in original resume")
+        # The degree must be in the original CV, verbatim or as one of its
+        # taxonomy education variants (whole words only: "ms" is not "teams")
+        if not index.mentions_degree(edu):
+            flags.append(f"education_hallucination: '{edu}' not found in original resume")
     
     return flags
 
@@ -148,9 +132,7 @@ def safety_scan(tailored_resume_text: str, original_resume_text: str) -> List[st
     flags = []
     
     # Check for new years that weren't in the original
-    years_new = set(re.findall(r"\b(19|20)\d{2}\b", tailored_resume_text)) - set(
-        re.findall(r"\b(19|20)\d{2}\b", original_resume_text)
-    )
+    years_new = get_resume_index(tailored_resume_text or "").years() - get_resume_index(original_resume_text or "").years()
     if years_new:
         flags.append("hallucination_suspected")
     